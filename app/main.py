@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import StringVar
 import sys
 import os
+import multiprocessing
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from modules.core.file_operations import ask_and_open_file, open_analysis_item, on_extract
@@ -35,4 +36,6 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    # 打包成執行檔時，AICc 平行計算的子程序需要這一行
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
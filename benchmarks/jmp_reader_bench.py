@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+JMP 讀取效能測試
+產生指定列數、欄數與欄位型別組合的 JMP 11 格式測試檔，量測 header 解析、各型別欄位解碼與完整 DataFrame 建立的時間，
+以 MB/s 與 rows/s 報告，並可儲存 / 比對基準結果 (JSON)，用來確認每次讀取最佳化的效果
+
+範例:
+    python benchmarks/jmp_reader_bench.py --rows 1000000 --cols 50 --save baseline.json
+    python benchmarks/jmp_reader_bench.py --rows 1000000 --cols 50 --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from modules.utils import jmptools
+
+# 欄位型別: (JMP data type, format type, 每列位元組數)
+COLUMN_TYPES = {
+    "double": (1, 0x00, 8),
+    "int1": (0xFF, 0x00, 1),
+    "int2": (0xFE, 0x00, 2),
+    "int4": (0xFC, 0x00, 4),
+    "rowstate": (3, 0x00, 2),
+    "datetime": (1, 0x69, 8),
+    "char": (2, 0x00, 10),
+    "listcheck": (2, 0x00, 1),
+}
+DEFAULT_MIX = "double=6,int4=1,datetime=1,char=1,listcheck=1"
+
+LIST_CHECK_ITEMS = [b"LOT_A", b"LOT_B", b"LOT_C", b"LOT_D"]
+
+
+def parse_mix(mix_text):
+    """解析欄位型別比例，例如 "double=6,char=1" -> {"double": 6, "char": 1}"""
+    mix = {}
+    for item in mix_text.split(","):
+        type_name, _, weight = item.partition("=")
+        type_name = type_name.strip()
+        if type_name not in COLUMN_TYPES:
+            raise ValueError(f"未知的欄位型別: {type_name} (可用: {', '.join(COLUMN_TYPES)})")
+        mix[type_name] = int(weight or 1)
+    return mix
+
+
+def column_type_plan(n_cols, mix):
+    """依比例決定每一欄的型別 (依權重輪流分配，確保每種型別都出現)"""
+    pattern = [type_name for type_name, weight in mix.items() for _ in range(weight)]
+    return [pattern[i % len(pattern)] for i in range(n_cols)]
+
+
+def _column_payload(type_name, n_rows, rng):
+    """產生單一欄位的原始資料 (含 JMP 的空白值)"""
+    if type_name == "double":
+        values = rng.normal(10.0, 2.0, n_rows)
+        values[::50] = np.nan
+        return values.astype("<f8").tobytes()
+    if type_name == "int1":
+        values = rng.integers(-126, 128, n_rows).astype("<i1")
+        values[::50] = -127
+        return values.tobytes()
+    if type_name == "int2":
+        values = rng.integers(-32766, 32768, n_rows).astype("<i2")
+        values[::50] = -32767
+        return values.tobytes()
+    if type_name == "int4":
+        values = rng.integers(-10 ** 9, 10 ** 9, n_rows).astype("<i4")
+        values[::50] = -2147483647
+        return values.tobytes()
+    if type_name == "rowstate":
+        return rng.integers(0, 4, n_rows).astype("<u2").tobytes()
+    if type_name == "datetime":
+        values = rng.uniform(3.5e9, 3.8e9, n_rows).round()
+        values[::50] = np.nan
+        return values.astype("<f8").tobytes()
+    if type_name == "char":
+        # 短字串格式: 第一個位元組是長度，後面補 0 到固定寬度
+        lengths = rng.integers(0, 10, n_rows).astype("u1")
+        raw = np.zeros((n_rows, 10), dtype="u1")
+        raw[:, 0] = lengths
+        letters = rng.integers(ord("A"), ord("Z") + 1, (n_rows, 9)).astype("u1")
+        raw[:, 1:] = np.where(np.arange(9) < lengths[:, None], letters, 0)
+        return raw.tobytes()
+    # listcheck: 每列一個位元組的索引，0xFF 代表空白
+    values = rng.integers(0, len(LIST_CHECK_ITEMS), n_rows).astype("u1")
+    values[::50] = 0xFF
+    return values.tobytes()
+
+
+def _column_descriptor(name, type_name):
+    """產生欄位描述區塊 (名稱、型別、欄位格式與額外欄位)"""
+    data_type, format_type, bytes_per_row = COLUMN_TYPES[type_name]
+    fields = []
+    if type_name == "listcheck":
+        list_field = struct.pack("<H", len(LIST_CHECK_ITEMS))
+        list_field += b"".join(struct.pack("B", len(x)) + x.ljust(8, b"\x00") for x in LIST_CHECK_ITEMS)
+        fields.append((0x04, list_field))
+    name_bytes = name.encode()
+    descriptor = struct.pack("B", len(name_bytes)) + name_bytes + b"\x00" * (31 - len(name_bytes))
+    descriptor += struct.pack("BBBB", data_type, 0, 12, format_type) + struct.pack("<H", bytes_per_row) + b"\x00\x00"
+    descriptor += struct.pack("<H", len(fields) + 1) + b"\x00" * 12
+    for tag, data in fields:
+        descriptor += struct.pack("<HI", tag, len(data)) + data
+    return descriptor
+
+
+def write_synthetic_jmp(file_path, n_rows, type_plan, seed=0):
+    """寫出 JMP 11 格式的測試檔 (逐欄寫入，不需要把整個檔案放在記憶體中)，回傳資料區的位元組數"""
+    rng = np.random.default_rng(seed)
+    header = bytes.fromhex("FF FF 00 00 03 00 00 00") + struct.pack("<II", n_rows, len(type_plan)) + b"\x00" * 12
+    header += b"\x06\x00" + struct.pack("<I", 5) + b"utf-8"
+    header += b"\x07\x00" + struct.pack("<I", 4) + b"time"
+    header += b"\xFF\xFF" + struct.pack("<I", 0)
+    header += b"\x04\x00"
+
+    names = [f"{type_name}_{i:04d}" for i, type_name in enumerate(type_plan)]
+    descriptors = [_column_descriptor(name, type_name) for name, type_name in zip(names, type_plan)]
+    payload_sizes = [n_rows * COLUMN_TYPES[type_name][2] for type_name in type_plan]
+
+    offsets = []
+    address = len(header) + 4 * len(type_plan)
+    for descriptor, payload_size in zip(descriptors, payload_sizes):
+        offsets.append(address)
+        address += len(descriptor) + payload_size
+
+    with open(file_path, "wb") as f:
+        f.write(header)
+        f.write(b"".join(struct.pack("<I", x) for x in offsets))
+        for descriptor, type_name in zip(descriptors, type_plan):
+            f.write(descriptor)
+            f.write(_column_payload(type_name, n_rows, rng))
+    return sum(payload_sizes)
+
+
+def _best_time(function, repeat):
+    """重複執行 repeat 次，回傳最短時間 (秒)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _rate(seconds, n_bytes, n_rows):
+    """換算成 MB/s 與 rows/s"""
+    return {"seconds": seconds,
+            "mb_per_s": n_bytes / 1e6 / seconds if seconds > 0 else float("inf"),
+            "rows_per_s": n_rows / seconds if seconds > 0 else float("inf")}
+
+
+def run_benchmark(file_path, n_rows, type_plan, data_bytes, repeat=3):
+    """量測 header 解析、各型別欄位解碼與完整讀取，回傳結果 dict"""
+    results = {}
+    file_bytes = os.path.getsize(file_path)
+
+    def parse_header():
+        with jmptools.JMPReader(file_path) as reader:
+            reader.column_infos()
+    results["header"] = {"seconds": _best_time(parse_header, repeat)}
+
+    for memory_map in (False, True):
+        with jmptools.JMPReader(file_path, memory_map=memory_map) as reader:
+            for type_name in sorted(set(type_plan)):
+                names = [x["name"] for x in reader.column_infos() if x["name"].startswith(type_name + "_")]
+                type_bytes = n_rows * COLUMN_TYPES[type_name][2] * len(names)
+                seconds = _best_time(lambda: reader.read(columns=names), repeat)
+                results[f"decode/{type_name}" + ("/mmap" if memory_map else "")] = _rate(seconds, type_bytes, n_rows)
+
+    for memory_map in (False, True):
+        seconds = _best_time(lambda: jmptools.readjmp(file_path, memory_map=memory_map), repeat)
+        results["readjmp" + ("/mmap" if memory_map else "")] = _rate(seconds, file_bytes, n_rows)
+
+    return {
+        "config": {"rows": n_rows, "cols": len(type_plan), "file_bytes": file_bytes, "data_bytes": data_bytes,
+                   "type_counts": {x: type_plan.count(x) for x in sorted(set(type_plan))}},
+        "environment": {"python": platform.python_version(), "numpy": np.__version__,
+                        "platform": platform.platform(), "reader_version": jmptools.version},
+        "results": results,
+    }
+
+
+def print_report(report, baseline=None):
+    """輸出結果表格；有基準結果時一併列出速度比 (>1 代表比基準快)"""
+    config = report["config"]
+    print(f"rows={config['rows']:,}  cols={config['cols']}  file={config['file_bytes'] / 1e6:,.1f} MB  "
+          f"types={config['type_counts']}")
+    print(f"{'step':<24}{'time (ms)':>12}{'MB/s':>12}{'rows/s':>16}{'vs base':>10}")
+    for step, result in report["results"].items():
+        line = f"{step:<24}{result['seconds'] * 1e3:>12.2f}"
+        if "mb_per_s" in result:
+            line += f"{result['mb_per_s']:>12,.0f}{result['rows_per_s']:>16,.0f}"
+        else:
+            line += f"{'':>12}{'':>16}"
+        if baseline is not None and step in baseline["results"]:
+            line += f"{baseline['results'][step]['seconds'] / result['seconds']:>9.2f}x"
+        print(line)
+    if baseline is not None and baseline["config"] != config:
+        print("⚠️ 基準結果的測試設定不同，比較僅供參考")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JMP 讀取效能測試")
+    parser.add_argument("--rows", type=int, default=200_000, help="列數")
+    parser.add_argument("--cols", type=int, default=20, help="欄數")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"欄位型別比例 (預設: {DEFAULT_MIX})")
+    parser.add_argument("--repeat", type=int, default=3, help="每個步驟重複次數 (取最短時間)")
+    parser.add_argument("--seed", type=int, default=0, help="亂數種子")
+    parser.add_argument("--file", help="測試檔路徑 (預設寫到暫存資料夾，結束後刪除)")
+    parser.add_argument("--save", help="把結果存成基準 JSON 檔")
+    parser.add_argument("--compare", help="與基準 JSON 檔比較")
+    args = parser.parse_args()
+
+    type_plan = column_type_plan(args.cols, parse_mix(args.mix))
+    tmpdir = None if args.file else tempfile.mkdtemp()
+    file_path = args.file or os.path.join(tmpdir, "jmp_reader_bench.jmp")
+    try:
+        data_bytes = write_synthetic_jmp(file_path, args.rows, type_plan, args.seed)
+        report = run_benchmark(file_path, args.rows, type_plan, data_bytes, args.repeat)
+    finally:
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"基準結果已儲存: {args.save}")
+
+
+if __name__ == "__main__":
+    main()
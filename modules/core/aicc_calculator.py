@@ -1,214 +1,954 @@
 #!/usr/bin/env python3
 import pandas as pd
 import numpy as np
-from scipy import stats
+from scipy import stats, special
 from scipy.optimize import minimize
+import os
+import hashlib
+import json
+import logging
+import threading
+import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from modules.core import aicc_kernels
+from modules.core.fit_cache import get_default_fit_cache, hash_array
 warnings.filterwarnings('ignore')
 
-def simple_em_mixture(data, n_components=2, max_iter=100, tol=1e-6):
+# 配適過程的警告訊息只送到 logging (預設不輸出，需要時由程式設定 handler)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# 計算邏輯改變 (會影響配適結果) 時要更新版本，讓配適結果快取失效
+CALCULATOR_VERSION = "1.3"
+
+# calculate_all_distributions 計算的分布 (依此順序)
+DISTRIBUTION_NAMES = [
+    "Normal", "LogNormal", "Exponential", "Gamma", "Weibull",
+    "Johnson Sb", "SHASH", "Mixture of 2 Normals", "Mixture of 3 Normals"
+]
+
+# 啟發式篩選模式 (calculate_screened_distributions): 由快到慢的計算順序，以及需要先做部分配適篩選的 (較慢) 分布
+SCREENING_ORDER = [
+    "Normal", "LogNormal", "Exponential", "Gamma", "Weibull",
+    "Johnson Sb", "Mixture of 2 Normals", "SHASH", "Mixture of 3 Normals"
+]
+SCREENED_DISTRIBUTIONS = {"Johnson Sb": 4, "SHASH": 4, "Mixture of 2 Normals": 5, "Mixture of 3 Normals": 8}
+PRUNE_AICC_MARGIN = 10.0  # 部分配適的AICc超過目前最佳值 + 此容許值時略過完整配適
+SCREEN_MAX_ITER = 20  # 部分配適的迭代次數
+
+GAMMA_ROOT_TOL = 1e-8  # gamma_shape_mle 收斂時方程式殘差 (相對於右側常數) 的上限
+
+SHASH_BOUNDS = [(-np.inf, np.inf), (0.001, np.inf), (-5, 5), (0.001, 5)]
+# Johnson Sb 的 log(上下界與數據的距離 / spread) 在下限 (-log n) 的此範圍內時視為退化解
+SB_BOUNDARY_TOL = 1e-3
+
+# 配適結果與欄位名稱有關的分布 (Gamma 的 JMP 修正依欄位名稱而定)，其餘分布的快取鍵不含欄位名稱
+COLUMN_NAME_DISTRIBUTIONS = {"Gamma"}
+
+# 可以用先前的參數熱啟動 (fit 方法接受 init) 的分布；其餘分布有封閉解，只需要充分統計量
+WARM_START_DISTRIBUTIONS = {
+    "Gamma", "Weibull", "Johnson Sb", "SHASH", "Mixture of 2 Normals", "Mixture of 3 Normals"
+}
+INCREMENTAL_STATE_VERSION = 1
+DEFAULT_INCREMENTAL_STATE_DIR = os.path.join(os.path.expanduser("~"), ".data_analysis_tools", "incremental_state")
+
+# batched EM: 每批工作陣列的記憶體上限 (約可放進 CPU 快取，批次再大反而較慢)，以及同一批數據長度的最大倍數差距
+EM_BATCH_MAX_BYTES = 4 * 1024**2
+EM_BATCH_PAD_RATIO = 1.25
+# 多起點 EM (AICcCalculator(em_starts=N)): 額外初始值 (k-means++ / 隨機分位數) 的亂數種子 (固定，讓結果可重現)、
+# 每個種子的短程迭代次數，以及短程後繼續迭代到收斂的種子數
+EM_MULTI_START_SEED = 0
+EM_SHORT_RUN_ITER = 10
+EM_MULTI_START_KEEP = 4
+
+# 混合常態分布: 組件數對應的分布名稱與最少點數
+MIXTURE_DISTRIBUTIONS = {2: "Mixture of 2 Normals", 3: "Mixture of 3 Normals"}
+MIXTURE_MIN_POINTS = {2: 10, 3: 15}
+# 直方圖近似模式 (AICcCalculator(binned=True)): 點數達 BINNED_MIN_POINTS 的欄位，需要迭代的分布改在 BINNED_N_BINS 組的直方圖上配適
+BINNED_DISTRIBUTIONS = {"Weibull", "Johnson Sb", "SHASH", "Mixture of 2 Normals", "Mixture of 3 Normals"}
+BINNED_N_BINS = 4096
+BINNED_MIN_POINTS = 200000
+
+COLUMNS_PER_TASK = 32  # calculate_columns_parallel 每個工作最多包含的欄位數 (同一工作內的混合分布一起計算)
+PARALLEL_MIN_WORK = 1000000  # 總點數 × 分布數低於此值時 calculate_columns_parallel 不使用程序池
+
+# bootstrap 排名穩定性 (AICcCalculator.bootstrap_distributions): 最多重抽樣次數、亂數種子、每個工作的重抽樣次數
+# (以及每個工作最多的數據點數)，至少 BOOTSTRAP_MIN_REPLICATES 次後，最佳分布勝出比例的標準誤小於 BOOTSTRAP_FREQ_TOL 時提早停止
+BOOTSTRAP_REPLICATES = 200
+BOOTSTRAP_SEED = 0
+BOOTSTRAP_BATCH = 25
+BOOTSTRAP_MAX_BATCH_POINTS = 5000000
+BOOTSTRAP_MIN_REPLICATES = 50
+BOOTSTRAP_FREQ_TOL = 0.04
+
+def _weighted_sum(values, weights=None):
+    """加權總和 (weights 為 None 時為一般總和)"""
+    return np.sum(values) if weights is None else np.dot(weights, values)
+
+def _weighted_mean_std(values, weights=None):
+    """加權平均值與母體標準差 (weights 為 None 時與 np.mean / np.std 相同)"""
+    if weights is None:
+        return np.mean(values), np.std(values)
+    mean = np.average(values, weights=weights)
+    return mean, np.sqrt(np.average((values - mean)**2, weights=weights))
+
+def weighted_quantile(values, q, weights=None):
+    """分位數；有 weights 時 values 必須已排序 (例如直方圖各組的平均值)，以累積權重內插"""
+    if weights is None:
+        return np.quantile(values, q)
+    cdf = (np.cumsum(weights) - 0.5 * weights) / np.sum(weights)
+    return np.interp(q, cdf, values)
+
+def bin_column(clean_data, n_bins, data_min=None, data_max=None):
+    """
+    把數據分成 n_bins 個等寬的組，回傳 (各組的平均值, 各組的點數)，只包含有數據的組 (依數值排序)
+    以組內平均值 (而不是組中點) 代表每一組，加權後的一次動差與原始數據完全相同
+    """
+    data_min = np.min(clean_data) if data_min is None else data_min
+    data_max = np.max(clean_data) if data_max is None else data_max
+    width = (data_max - data_min) / n_bins
+    if not width > 0:
+        return np.array([data_min]), np.array([float(len(clean_data))])
+    index = np.minimum(((clean_data - data_min) / width).astype(np.intp), n_bins - 1)
+    counts = np.bincount(index, minlength=n_bins).astype(float)
+    sums = np.bincount(index, weights=clean_data, minlength=n_bins)
+    used = counts > 0
+    return sums[used] / counts[used], counts[used]
+
+def _kernel(numpy_function, backend="numpy"):
+    """依 backend 回傳 NumPy 版本的函式或 aicc_kernels 中同名的編譯核心 (backend 為 resolve_backend 的結果)"""
+    if backend == "numba":
+        return getattr(aicc_kernels, numpy_function.__name__)
+    return numpy_function
+
+def _mixture_log_likelihood_terms(data, w, mu, sigma):
+    """
+    計算混合常態在目前參數下每個點的對數混合機率 (log-sum-exp)，一次處理多個問題
+    data 為 (問題, 點)，w / mu / sigma 為 (問題, 組件)，中間陣列以 (問題, 組件, 點) 排列
+    回傳 (未正規化的後驗 e, 每點的 e 總和, 每點的對數混合機率)，後驗概率 = e / e總和
+    """
+    log_dens = (-0.5 * ((data[:, np.newaxis, :] - mu[:, :, np.newaxis]) / sigma[:, :, np.newaxis])**2 +
+                (np.log(w) - np.log(sigma) - 0.5 * np.log(2 * np.pi))[:, :, np.newaxis])
+    log_max = np.max(log_dens, axis=1)
+    e = np.exp(log_dens - log_max[:, np.newaxis, :])
+    e_sum = np.sum(e, axis=1)
+    return e, e_sum, log_max + np.log(e_sum)
+
+def mixture_log_likelihood(data, weights, means, stds):
+    """混合常態在指定參數下的對數似然 (精確計算，供直方圖近似的結果回到原始數據驗證)"""
+    params = [np.asarray(x, dtype=float)[np.newaxis, :] for x in (weights, means, stds)]
+    return np.sum(_mixture_log_likelihood_terms(np.asarray(data, dtype=float)[np.newaxis, :], *params)[2])
+
+def _em_seed_strategies(data, n_components, n_seeds, weights=None, seed=EM_MULTI_START_SEED):
+    """
+    多起點 EM 的額外初始值 [(weights, means, stds), ...]: k-means++ 與隨機分位數兩種種子輪流產生，共 n_seeds 組
+    亂數產生器每次都以固定的 seed 建立，同樣的數據一定得到同樣的初始值；weights: 數據為直方圖時各組的點數
+    """
+    rng = np.random.default_rng(seed)
+    _, std_data = _weighted_mean_std(data, weights)
+    point_weights = np.ones(len(data)) if weights is None else np.asarray(weights, dtype=float)
+    strategies = []
+    for i in range(n_seeds):
+        if i % 2 == 1:
+            # 隨機分位數: 在 5% ~ 95% 之間隨機取 n_components 個分位數作為均值
+            levels = np.sort(rng.uniform(0.05, 0.95, n_components))
+            strategies.append((np.ones(n_components) / n_components, list(weighted_quantile(data, levels, weights)),
+                               np.full(n_components, std_data / 2)))
+            continue
+        
+        # k-means++: 第一個中心依權重隨機選取，之後依 (權重 x 與最近中心的距離平方) 的比例選取
+        centers = [data[rng.choice(len(data), p=point_weights / np.sum(point_weights))]]
+        distance = (data - centers[0])**2
+        for _ in range(n_components - 1):
+            score = point_weights * distance
+            index = rng.choice(len(data), p=score / np.sum(score)) if np.sum(score) > 0 else rng.integers(len(data))
+            centers.append(data[index])
+            distance = np.minimum(distance, (data - data[index])**2)
+        means = np.sort(centers)
+        
+        # 以最近中心分群，各組件的權重與標準差取自所屬的點 (空群或標準差太小時改用整體標準差的一半)
+        labels = np.argmin(np.abs(data[:, np.newaxis] - means[np.newaxis, :]), axis=1)
+        counts = np.bincount(labels, weights=point_weights, minlength=n_components)
+        stds = np.full(n_components, std_data / 2)
+        for j in np.flatnonzero(counts > 0):
+            std_j = _weighted_mean_std(data[labels == j], point_weights[labels == j])[1]
+            if std_j > std_data / 20:
+                stds[j] = std_j
+        fractions = np.maximum(counts / np.sum(counts), 0.5 / n_components)
+        strategies.append((fractions / np.sum(fractions), list(means), stds))
+    return strategies
+
+def _em_init_strategies(data, n_components, init=None, weights=None):
+    """
+    EM 的初始化策略 [(weights, means, stds), ...]: 分位數與平均值 ± 標準差兩種，指定 init (熱啟動) 時另外排在最前面
+    熱啟動只是多一個起點，不取代固定策略，避免停在先前結果的局部最佳解；weights: 數據為直方圖時各組的點數
+    """
+    warm_start = [] if init is None else [init]
+    equal_weights = np.ones(n_components) / n_components
+    mean_data, std_data = _weighted_mean_std(data, weights)
+    half_std = np.full(n_components, std_data / 2)
+    if n_components == 2:
+        return warm_start + [(equal_weights, list(weighted_quantile(data, [0.33, 0.67], weights)), half_std),
+                             (equal_weights, [mean_data - 0.5 * std_data, mean_data + 0.5 * std_data], half_std)]
+    # n_components == 3
+    return warm_start + [(equal_weights, list(weighted_quantile(data, [0.25, 0.5, 0.75], weights)), half_std),
+                         (equal_weights, [mean_data - std_data, mean_data, mean_data + std_data], half_std)]
+
+def _em_batch(datasets, strategies, max_iter, tol, point_weights=None):
+    """
+    對一批 (數據集, 初始值) 問題同時執行 EM，數據補齊到相同長度並以權重 0 排除補齊的位置
+    point_weights: 每個數據集各點的權重 (直方圖的點數) 或 None (每點權重 1)
+    每個問題的停止條件與單獨執行時相同，已停止的問題不再參與計算；回傳每個問題的結果 dict 或 None
+    """
+    n_problems = len(datasets)
+    point_weights = point_weights or [None] * n_problems
+    lengths = np.array([len(x) for x in datasets])
+    data = np.zeros((n_problems, lengths.max()))
+    for i, values in enumerate(datasets):
+        data[i, :lengths[i]] = values
+    # 長度都相同且沒有權重時不需要遮罩 / 權重矩陣
+    mask = weight = None
+    if lengths.min() < lengths.max() or any(x is not None for x in point_weights):
+        mask = np.arange(lengths.max()) < lengths[:, np.newaxis]
+        weight = mask.astype(float)
+        for i, values in enumerate(point_weights):
+            if values is not None:
+                weight[i, :lengths[i]] = values
+    n = np.array([len(x) if w is None else np.sum(w) for x, w in zip(datasets, point_weights)])
+    variance_floor = np.array([_weighted_mean_std(x, w)[1] for x, w in zip(datasets, point_weights)])[:, np.newaxis] / 100
+    
+    w = np.array([x[0] for x in strategies], dtype=float)
+    mu = np.array([x[1] for x in strategies], dtype=float)
+    sigma = np.array([x[2] for x in strategies], dtype=float)
+    ll = np.full(n_problems, np.nan)
+    prev_ll = np.full(n_problems, -np.inf)
+    last_iteration = np.full(n_problems, -1)
+    # 混合機率 <= 1e-10 視為數值不穩定
+    log_prob_floor = np.log(1e-10)
+    
+    # 目前仍在計算的問題 (rows) 與其數據、遮罩、權重及目前參數下的密度項
+    active = {"rows": np.arange(n_problems), "x": data, "mask": mask, "weight": weight}
+    active["e"], active["e_sum"], active["log_mix"] = _mixture_log_likelihood_terms(data, w, mu, sigma)
+    
+    def keep_rows(keep):
+        """只保留 keep 為 True 的問題 (全部保留時不複製陣列)"""
+        if not keep.all():
+            for key, value in active.items():
+                if value is not None:
+                    active[key] = value[keep]
+    
+    def is_unstable():
+        below_floor = active["log_mix"] <= log_prob_floor
+        if active["mask"] is not None:
+            below_floor &= active["mask"]
+        return np.any(below_floor, axis=1)
+    
+    for iteration in range(max_iter):
+        if len(active["rows"]) == 0:
+            break
+        last_iteration[active["rows"]] = iteration
+        
+        # 檢查數值穩定性
+        keep_rows(~is_unstable())
+        
+        # E-step: 計算後驗概率 (乘上各點權重，補齊的位置為 0)
+        gamma = active["e"] / active["e_sum"][:, np.newaxis, :]
+        if active["weight"] is not None:
+            gamma *= active["weight"][:, np.newaxis, :]
+        
+        # M-step: 更新參數
+        N = np.sum(gamma, axis=2)
+        
+        # 檢查組件是否消失
+        vanished = np.any(N < 1, axis=1)
+        if vanished.any():
+            keep_rows(~vanished)
+            gamma, N = gamma[~vanished], N[~vanished]
+        rows, x = active["rows"], active["x"]
+        
+        # 更新權重、均值和方差
+        w[rows] = N / n[rows][:, np.newaxis]
+        mu[rows] = np.matmul(gamma, x[:, :, np.newaxis])[:, :, 0] / N
+        variance = np.sum(gamma * (x[:, np.newaxis, :] - mu[rows][:, :, np.newaxis])**2, axis=2) / N
+        sigma[rows] = np.sqrt(np.maximum(variance, variance_floor[rows]))
+        
+        # 計算對數似然
+        active["e"], active["e_sum"], active["log_mix"] = _mixture_log_likelihood_terms(x, w[rows], mu[rows], sigma[rows])
+        unstable = is_unstable()
+        ll[rows[unstable]] = -np.inf
+        keep_rows(~unstable)
+        rows, log_mix = active["rows"], active["log_mix"]
+        if active["weight"] is not None:
+            log_mix = np.where(active["mask"], log_mix, 0) * active["weight"]
+        ll[rows] = np.sum(log_mix, axis=1)
+        
+        # 檢查收斂
+        converged = np.abs(ll[rows] - prev_ll[rows]) < tol
+        prev_ll[rows] = ll[rows]
+        keep_rows(~converged)
+    
+    results = []
+    for i in range(n_problems):
+        if not np.isfinite(ll[i]):
+            results.append(None)
+            continue
+        results.append({
+            'weights': w[i].copy(),
+            'means': mu[i].copy(),
+            'stds': sigma[i].copy(),
+            'converged': last_iteration[i] < max_iter - 1,
+            'iterations': last_iteration[i] + 1,
+            'll': ll[i]
+        })
+    return results
+
+def mixture_is_plausible(result, data_std):
+    """EM 結果是否合理: 標準差為正、組件的均值不能過於接近 (小於數據標準差的 1/10)、組件權重不能太小"""
+    means = result['means']
+    if np.any(result['stds'] <= 0):
+        return False
+    for i in range(len(means)):
+        for j in range(i+1, len(means)):
+            if abs(means[i] - means[j]) < data_std / 10:
+                return False
+    return not np.any(result['weights'] < 0.01)
+
+def _run_em_problems(datasets, problems, n_components, max_iter, tol, max_batch_bytes, point_weights, backend):
+    """
+    執行一組 (數據集索引, 初始值) 問題的 EM，回傳與 problems 對應的結果 list (失敗的問題為 None)
+    問題依數據長度排序後分批: 同一批的長度差距不超過 EM_BATCH_PAD_RATIO 倍 (限制補齊的浪費)，
+    且工作陣列不超過 max_batch_bytes (限制記憶體用量)；backend 為 "numba" 時逐一以 aicc_kernels.mixture_em 計算
+    """
+    if backend == "numba":
+        return [aicc_kernels.mixture_em(datasets[i], strategy, max_iter, tol, point_weights[i])
+                for i, strategy in problems]
+    
+    results = [None] * len(problems)
+    order = sorted(range(len(problems)), key=lambda j: len(datasets[problems[j][0]]))
+    lengths = [len(datasets[problems[j][0]]) for j in order]
+    # 每個問題約需要 8 個 (組件, 點) 大小的工作陣列
+    bytes_per_point = 8 * n_components * 8
+    start = 0
+    while start < len(order):
+        end = start + 1
+        while (end < len(order) and lengths[end] <= EM_BATCH_PAD_RATIO * lengths[start] and
+               (end + 1 - start) * lengths[end] * bytes_per_point <= max_batch_bytes):
+            end += 1
+        batch = [problems[j] for j in order[start:end]]
+        batch_results = _em_batch([datasets[i] for i, _ in batch], [strategy for _, strategy in batch], max_iter, tol,
+                                  [point_weights[i] for i, _ in batch])
+        for j, result in zip(order[start:end], batch_results):
+            results[j] = result
+        start = end
+    return results
+
+def batched_em_mixture(datasets, n_components=2, max_iter=100, tol=1e-6, inits=None,
+                       max_batch_bytes=EM_BATCH_MAX_BYTES, point_weights=None, backend="numpy", n_starts=0):
+    """
+    多個數據集 (例如多個欄位) 與各自的初始化策略一起執行 EM，E/M-step 以 (問題, 組件, 點) 的三維陣列運算完成 (見 _run_em_problems)
+    inits: 每個數據集一個熱啟動用的 (weights, means, stds) 或 None；point_weights: 每個數據集各點的權重 (直方圖) 或 None
+    backend: "numba" 時每個問題以 aicc_kernels.mixture_em 逐一計算 (編譯後的迴圈不需要補齊與分批)
+    n_starts: 多起點模式的初始值總數；超過 2 時另外以 _em_seed_strategies 產生種子，所有種子 (與其他數據集的) 一起批次執行
+    EM_SHORT_RUN_ITER 次迭代，只有對數似然最大的 EM_MULTI_START_KEEP 個繼續迭代到收斂 (兩種固定策略一定完整計算)；
+    種子的結果不合理 (mixture_is_plausible) 時不採用，因此多起點的結果不會因為退化的解而比固定策略差
+    回傳與 datasets 等長的 list，每個元素與 simple_em_mixture 的回傳值相同 (各初始化策略中對數似然最大的結果)
+    """
+    datasets = [np.asarray(x, dtype=float) for x in datasets]
+    inits = inits or [None] * len(datasets)
+    point_weights = point_weights or [None] * len(datasets)
+    run = lambda problems, iterations: _run_em_problems(datasets, problems, n_components, iterations, tol,
+                                                        max_batch_bytes, point_weights, backend)
+    problems = [(i, strategy) for i, (data, init) in enumerate(zip(datasets, inits)) if len(data) > 0
+                for strategy in _em_init_strategies(data, n_components, init, point_weights[i])]
+    
+    # 多起點: 種子的短程 EM，每個數據集保留對數似然最大的幾個，從短程的結果繼續迭代 (排在固定策略之後)
+    n_fixed = len(problems)
+    n_seeds = n_starts - 2
+    if n_seeds > 0:
+        seeds = [(i, strategy) for i, data in enumerate(datasets) if len(data) > 0
+                 for strategy in _em_seed_strategies(data, n_components, n_seeds, point_weights[i])]
+        finalists = {}
+        for (i, _), result in zip(seeds, run(seeds, EM_SHORT_RUN_ITER)):
+            if result is not None:
+                finalists.setdefault(i, []).append(result)
+        for i, results in finalists.items():
+            results.sort(key=lambda x: -x['ll'])
+            problems += [(i, (x['weights'], x['means'], x['stds'])) for x in results[:EM_MULTI_START_KEEP]]
+    
+    best_results = [None] * len(datasets)
+    for j, ((i, _), result) in enumerate(zip(problems, run(problems, max_iter))):
+        if result is None:
+            continue
+        if j >= n_fixed and not mixture_is_plausible(result, _weighted_mean_std(datasets[i], point_weights[i])[1]):
+            continue
+        # 同一數據集的策略依原順序排列，對數似然相同時保留較早的策略
+        if best_results[i] is None or result['ll'] > best_results[i]['ll']:
+            best_results[i] = result
+    return best_results
+
+def simple_em_mixture(data, n_components=2, max_iter=100, tol=1e-6, init=None, weights=None, backend="numpy",
+                      n_starts=0):
     """
     簡單但有效的 EM 算法實現 Gaussian Mixture Model
     單次初始化，快速收斂，增加穩健性
+    兩種初始化策略以 batched_em_mixture 同時計算，每次迭代只計算一次密度
+    init: 熱啟動用的 (weights, means, stds)，指定時作為額外的起點；weights: 數據為直方圖時各組的點數
+    n_starts: 多起點模式的初始值總數 (0 = 只用兩種固定策略)
     """
-    n = len(data)
+    return batched_em_mixture([data], n_components, max_iter, tol, inits=[init], point_weights=[weights],
+                              backend=backend, n_starts=n_starts)[0]
+
+def gamma_shape_mle(log_mean_minus_mean_log, a_init=None, max_iter=50, tol=1e-12, info=None):
+    """
+    Gamma 形狀參數的 MLE: 以 Newton 法 (Minka 的 1/a 更新) 解 log(a) - digamma(a) = log(mean) - mean(log x)
+    通常 2~4 次迭代收斂，無解 (數據為常數)、不收斂或收斂點不是方程式的根時回傳 None；info (dict) 會記錄迭代次數
+    """
+    target = log_mean_minus_mean_log
+    if not np.isfinite(target) or target <= 0:
+        return None
+    if a_init is None:
+        a_init = (3 - target + np.sqrt((target - 3)**2 + 24 * target)) / (12 * target)
+    a = a_init
+    for iteration in range(max_iter):
+        gradient = target - np.log(a) + special.digamma(a)
+        a_new = 1 / (1 / a - gradient / (a**2 * (1 / a - special.polygamma(1, a))))
+        if not np.isfinite(a_new) or a_new <= 0:
+            return None
+        if abs(a_new - a) <= tol * a:
+            # 步長很小但殘差仍大表示更新方向錯誤 (停在非根的位置)，交給呼叫端的 SciPy 備援而不是回傳錯誤的解
+            if abs(target - np.log(a_new) + special.digamma(a_new)) > GAMMA_ROOT_TOL * target:
+                return None
+            if info is not None:
+                info["iterations"] = iteration + 1
+            return a_new
+        a = a_new
+    return None
+
+def weibull_profile_sums(shifted, c, weights=None):
+    """Weibull profile 方程式需要的 sum(w)、sum(w * s)、sum(w * s^2)，其中 w = 權重 * exp(c * s)，s = log x - max(log x)"""
+    w = np.exp(c * shifted)
+    if weights is not None:
+        w *= weights
+    return np.sum(w), np.dot(w, shifted), np.dot(w, shifted**2)
+
+def weibull_shape_mle(log_data, c_init, max_iter=100, tol=1e-10, info=None, weights=None, backend="numpy"):
+    """
+    Weibull 形狀參數的 MLE: 對 profile likelihood 的一維方程式
+    1/c + mean(log x) - sum(x^c log x) / sum(x^c) = 0 做 Newton 迭代 (在 log 空間計算 x^c 避免溢位，以區間二分法保護)
+    回傳 (c, log(scale))，不收斂時回傳 None；info (dict) 會記錄迭代次數；weights: 數據為直方圖時各組的點數
+    """
+    log_max = np.max(log_data)
+    shifted = log_data - log_max
+    mean_log = _weighted_mean_std(log_data, weights)[0]
+    n = len(log_data) if weights is None else np.sum(weights)
+    profile_sums = _kernel(weibull_profile_sums, backend)
     
-    # 嘗試兩種不同的初始化策略
-    init_strategies = []
+    def equation(c):
+        w_sum, ws_sum, wss_sum = profile_sums(shifted, c, weights)
+        ratio1 = ws_sum / w_sum
+        ratio2 = wss_sum / w_sum
+        value = 1 / c + (mean_log - log_max) - ratio1
+        derivative = -1 / c**2 - (ratio2 - ratio1**2)
+        return value, derivative, w_sum
     
-    if n_components == 2:
-        init_strategies.append([np.percentile(data, 33), np.percentile(data, 67)])
-        mean_data = np.mean(data)
-        std_data = np.std(data)
-        init_strategies.append([mean_data - 0.5 * std_data, mean_data + 0.5 * std_data])
-    else:  # n_components == 3
-        init_strategies.append([np.percentile(data, 25), np.percentile(data, 50), np.percentile(data, 75)])
-        mean_data = np.mean(data)
-        std_data = np.std(data)
-        init_strategies.append([mean_data - std_data, mean_data, mean_data + std_data])
-    
-    best_result = None
-    best_ll = -np.inf
-    
-    for mu_init in init_strategies:
-        try:
-            mu = mu_init.copy()
-            w = np.ones(n_components) / n_components
-            sigma = np.full(n_components, np.std(data) / 2)
-            
-            prev_ll = -np.inf
-            
-            for iteration in range(max_iter):
-                # E-step: 計算後驗概率
-                gamma = np.zeros((n, n_components))
-                
-                for k in range(n_components):
-                    gamma[:, k] = w[k] * stats.norm.pdf(data, mu[k], sigma[k])
-                
-                gamma_sum = np.sum(gamma, axis=1)
-                
-                # 檢查數值穩定性
-                if np.any(gamma_sum <= 1e-10):
-                    break
-                    
-                gamma = gamma / gamma_sum[:, np.newaxis]
-                
-                # M-step: 更新參數
-                N = np.sum(gamma, axis=0)
-                
-                # 檢查組件是否消失
-                if np.any(N < 1):
-                    break
-                
-                # 更新權重
-                w = N / n
-                
-                # 更新均值和方差
-                for k in range(n_components):
-                    mu[k] = np.sum(gamma[:, k] * data) / N[k]
-                    variance = np.sum(gamma[:, k] * (data - mu[k])**2) / N[k]
-                    sigma[k] = np.sqrt(max(variance, np.std(data) / 100))
-                
-                # 計算對數似然
-                ll = 0
-                for i in range(n):
-                    mixture_prob = sum(w[k] * stats.norm.pdf(data[i], mu[k], sigma[k]) 
-                                     for k in range(n_components))
-                    if mixture_prob > 1e-10:
-                        ll += np.log(mixture_prob)
-                    else:
-                        ll = -np.inf
-                        break
-                
-                if ll == -np.inf:
-                    break
-                
-                # 檢查收斂
-                if abs(ll - prev_ll) < tol:
-                    break
-                    
-                prev_ll = ll
-            
-            # 檢查這次結果是否更好
-            if ll > best_ll and np.isfinite(ll):
-                best_ll = ll
-                best_result = {
-                    'weights': w.copy(),
-                    'means': mu.copy(),
-                    'stds': sigma.copy(),
-                    'converged': iteration < max_iter - 1,
-                    'll': ll
-                }
-                
-        except Exception:
-            continue
+    # 方程式對 c 單調遞減，維持一個包含解的區間
+    lower, upper = 0.0, np.inf
+    c = c_init
+    for iteration in range(max_iter):
+        value, derivative, w_sum = equation(c)
+        if value > 0:
+            lower = c
+        else:
+            upper = c
+        c_new = c - value / derivative
+        if not (lower < c_new < upper):
+            c_new = (lower + upper) / 2 if np.isfinite(upper) else 2 * c
+        if abs(c_new - c) <= tol * c:
+            if info is not None:
+                info["iterations"] = iteration + 1
+            _, _, w_sum = equation(c_new)
+            return c_new, log_max + np.log(w_sum / n) / c_new
+        c = c_new
+    return None
+
+def shash_neg_log_likelihood(params, x, weights=None):
+    """
+    SHASH 負對數似然與解析梯度 (參數 mu, sigma, nu, tau)，供 minimize(jac=True) 使用
+    log f = -0.5 log(2 pi) - log(sigma) - 0.5 log(1 + z^2) + log(tau) + log(cosh(u)) - 0.5 sinh(u)^2
+    其中 z = (x - mu) / sigma, u = nu + tau * z；weights: 數據為直方圖時各組的點數
+    """
+    mu, sigma, nu, tau = params
+    if sigma <= 0 or tau <= 0:
+        return np.inf, np.zeros(4)
+    n = len(x) if weights is None else np.sum(weights)
+    z = (x - mu) / sigma
+    u = nu + tau * z
+    sinh_u = np.sinh(u)
+    log_cosh_u = np.logaddexp(u, -u) - np.log(2)
+    ll = (-n * (0.5 * np.log(2 * np.pi) + np.log(sigma) - np.log(tau)) - 0.5 * _weighted_sum(np.log1p(z**2), weights) +
+          _weighted_sum(log_cosh_u, weights) - 0.5 * _weighted_sum(sinh_u**2, weights))
+    if not np.isfinite(ll):
+        return np.inf, np.zeros(4)
+    
+    d_u = np.tanh(u) - sinh_u * np.sqrt(1 + sinh_u**2)  # d log f / du
+    d_z = -z / (1 + z**2) + tau * d_u  # d log f / dz
+    if weights is not None:
+        d_u, d_z = d_u * weights, d_z * weights
+    gradient = np.array([
+        -np.sum(d_z) / sigma,
+        -n / sigma - np.dot(d_z, z) / sigma,
+        np.sum(d_u),
+        n / tau + np.dot(d_u, z),
+    ])
+    return -ll, -gradient
+
+def johnson_su_neg_log_likelihood(params, x, weights=None):
+    """
+    Johnson Su 負對數似然與解析梯度，參數為 (a, log b, loc, log scale) 以避免邊界限制，供 minimize(jac=True) 使用
+    與 stats.johnsonsu 的參數定義相同: log f = log b - log scale - 0.5 log(2 pi) - 0.5 log(1 + z^2) - 0.5 (a + b asinh z)^2
+    weights: 數據為直方圖時各組的點數
+    """
+    a, log_b, loc, log_scale = params
+    b, scale = np.exp(log_b), np.exp(log_scale)
+    n = len(x) if weights is None else np.sum(weights)
+    z = (x - loc) / scale
+    asinh_z = np.arcsinh(z)
+    w = a + b * asinh_z
+    weighted_w = w if weights is None else w * weights
+    ll = (n * (log_b - log_scale - 0.5 * np.log(2 * np.pi)) - 0.5 * _weighted_sum(np.log1p(z**2), weights) -
+          0.5 * np.dot(weighted_w, w))
+    if not np.isfinite(ll):
+        return np.inf, np.zeros(4)
     
-    return best_result
+    d_z = -z / (1 + z**2) - b * w / np.sqrt(1 + z**2)  # d log f / dz
+    if weights is not None:
+        d_z = d_z * weights
+    gradient = np.array([
+        -np.sum(weighted_w),
+        n - b * np.dot(weighted_w, asinh_z),
+        -np.sum(d_z) / scale,
+        -n - np.dot(d_z, z),
+    ])
+    return -ll, -gradient
+
+def johnson_su_profile_start(x, loc, scale, weights=None):
+    """給定 loc/scale 時 a、b 有封閉解 (b = 1 / std(asinh z), a = -b * mean(asinh z))，回傳完整的起始參數"""
+    mean, std = _weighted_mean_std(np.arcsinh((x - loc) / scale), weights)
+    b = 1 / std
+    return np.array([-b * mean, np.log(b), loc, np.log(scale)])
+
+def johnson_su_quantile_start(x, weights=None):
+    """
+    Johnson Su 的起始參數: Slifker-Shapiro 分位數法 (z = 0.524)，不適用 Su 時以中位數 / IQR 代替
+    回傳 (a, log b, loc, log scale)
+    """
+    z = 0.524
+    x_m3, x_m1, x_p1, x_p3 = weighted_quantile(x, stats.norm.cdf([-3 * z, -z, z, 3 * z]), weights)
+    m, n, p = x_p3 - x_p1, x_m1 - x_m3, x_p1 - x_m1
+    if p > 0 and m * n / p**2 > 1:
+        mp, np_ = m / p, n / p
+        b = 2 * z / np.arccosh(0.5 * (mp + np_))
+        a = b * np.arcsinh((np_ - mp) / (2 * np.sqrt(mp * np_ - 1)))
+        scale = 2 * p * np.sqrt(mp * np_ - 1) / ((mp + np_ - 2) * np.sqrt(mp + np_ + 2))
+        loc = (x_p1 + x_m1) / 2 + p * (np_ - mp) / (2 * (mp + np_ - 2))
+        if np.all(np.isfinite([a, b, loc, scale])) and b > 0 and scale > 0:
+            return np.array([a, np.log(b), loc, np.log(scale)])
+    median = weighted_quantile(x, 0.5, weights)
+    iqr_scale = (x_p1 - x_m1) / (2 * z) if p > 0 else _weighted_mean_std(x, weights)[1]
+    return johnson_su_profile_start(x, median, iqr_scale, weights)
+
+def fit_johnson_su_mle(x, max_iter=None, init=None, info=None, weights=None, backend="numpy"):
+    """
+    Johnson Su 的 MLE (解析梯度 + L-BFGS-B)，從幾個起始值中負對數似然最小的一個開始
+    數據先以中位數 / 標準差標準化，讓各參數的梯度大小相近；max_iter 可限制迭代次數 (部分配適)
+    init: 熱啟動用的 (a, b, loc, scale)，加入起始值候選；info (dict) 會記錄迭代次數與是否收斂
+    weights: 數據為直方圖時各組的點數
+    上下界與數據至少相距 spread / n，最佳解停在這個下限上 (退化解) 時也回傳 None
+    回傳 (a, b, loc, scale, 對數似然)，失敗時回傳 None
+    """
+    if weights is None:
+        center, spread = np.median(x), np.std(x)
+    else:
+        center, spread = weighted_quantile(x, 0.5, weights), _weighted_mean_std(x, weights)[1]
+    if not spread > 0:
+        return None
+    y = (x - center) / spread
+    n = len(x) if weights is None else np.sum(weights)
+    
+    # 起始值: 分位數法、其 loc/scale 的 profile、接近常態的極限 (大 scale)，取負對數似然最小者
+    quantile_start = johnson_su_quantile_start(y, weights)
+    starts = [quantile_start, johnson_su_profile_start(y, quantile_start[2], np.exp(quantile_start[3]), weights),
+              johnson_su_profile_start(y, _weighted_mean_std(y, weights)[0], 10.0, weights)]
+    if init is not None:
+        a, b, loc, scale = init
+        starts.append(np.array([a, np.log(b), (loc - center) / spread, np.log(scale / spread)]))
+    neg_log_likelihood = _kernel(johnson_su_neg_log_likelihood, backend)
+    start = min(starts, key=lambda params: neg_log_likelihood(params, y, weights)[0])
+    
+    result = minimize(neg_log_likelihood, start, args=(y, weights), jac=True, method='L-BFGS-B',
+                      options={'ftol': 1e-12, 'gtol': 1e-8, 'maxiter': max_iter or 15000})
+    if info is not None:
+        info.update(iterations=result.nit, converged=bool(result.success))
+    if not np.isfinite(result.fun):
+        return None
+    a, log_b, loc, log_scale = result.x
+    return a, np.exp(log_b), center + spread * loc, spread * np.exp(log_scale), -result.fun - n * np.log(spread)
+
+def johnson_sb_profile_neg_log_likelihood(params, x, x_min, x_max, spread, weights=None):
+    """
+    Johnson Sb 的 profile 負對數似然與解析梯度，供 minimize(jac=True) 使用
+    給定 loc / scale 時 a、b 有封閉解 (y = log(z / (1 - z))，b = 1 / std(y)，a = -b * mean(y))，只需要對 loc / scale 最佳化
+    參數為 (u, v): loc = x_min - spread * exp(u)，上界 loc + scale = x_max + spread * exp(v)，保證所有數據都在 (loc, loc + scale) 內
+    weights: 數據為直方圖時各組的點數
+    """
+    u, v = params
+    below, above = spread * np.exp(u), spread * np.exp(v)
+    loc = x_min - below
+    scale = x_max + above - loc
+    n = len(x) if weights is None else np.sum(weights)
+    z = (x - loc) / scale
+    log_z, log_1mz = np.log(z), np.log1p(-z)
+    y = log_z - log_1mz
+    y_centered = y - _weighted_sum(y, weights) / n
+    weighted_y = y_centered if weights is None else y_centered * weights
+    var_y = np.dot(weighted_y, y_centered) / n
+    ll = (-0.5 * n * (np.log(2 * np.pi * var_y) + 1) - n * np.log(scale) -
+          _weighted_sum(log_z, weights) - _weighted_sum(log_1mz, weights))
+    if not np.isfinite(ll) or not var_y > 0:
+        return np.inf, np.zeros(2)
+    
+    d_z = -y_centered / (var_y * z * (1 - z)) - 1 / z + 1 / (1 - z)  # d log L / dz
+    if weights is not None:
+        d_z = d_z * weights
+    gradient = np.array([
+        below / scale * (np.dot(d_z, 1 - z) - n),
+        -above / scale * (np.dot(d_z, z) + n),
+    ])
+    return -ll, -gradient
+
+def fit_johnson_sb_mle(x, max_iter=None, init=None, info=None, weights=None, bounds=None, backend="numpy"):
+    """
+    Johnson Sb 的 MLE: 對 loc / scale 的 profile likelihood 做 L-BFGS-B (二維，a、b 為封閉解)
+    起始值取幾組上下界距離中負對數似然最小者；init: 熱啟動用的 (a, b, loc, scale) (上下界包含所有數據時才使用)
+    info (dict) 會記錄迭代次數與是否收斂；weights: 數據為直方圖時各組的點數
+    bounds: 原始數據的 (最小值, 最大值)，x 為直方圖時使用，讓配適的上下界包含所有原始數據
+    上下界與數據至少相距 spread / n，最佳解停在這個下限上 (退化解) 時也回傳 None
+    回傳 (a, b, loc, scale, 對數似然)，失敗時回傳 None
+    """
+    x_min, x_max = bounds if bounds is not None else (np.min(x), np.max(x))
+    spread = x_max - x_min
+    if not spread > 0:
+        return None
+    
+    # 上下界貼近數據時 b → 0 的似然沒有上限 (退化解)，因此上下界與數據至少相距 spread / n
+    n = len(x) if weights is None else np.sum(weights)
+    floor = -np.log(n)
+    starts = [np.log([below, above]) for below in (0.01, 0.1, 1.0) for above in (0.01, 0.1, 1.0)]
+    if init is not None:
+        _, _, loc, scale = init
+        if loc < x_min and loc + scale > x_max:
+            starts.append(np.log([(x_min - loc) / spread, (loc + scale - x_max) / spread]))
+    starts = [np.maximum(start, floor) for start in starts]
+    args = (x, x_min, x_max, spread, weights)
+    neg_log_likelihood = _kernel(johnson_sb_profile_neg_log_likelihood, backend)
+    start = min(starts, key=lambda params: neg_log_likelihood(params, *args)[0])
+    
+    result = minimize(neg_log_likelihood, start, args=args, jac=True, method='L-BFGS-B', bounds=[(floor, None)] * 2,
+                      options={'ftol': 1e-12, 'gtol': 1e-8, 'maxiter': max_iter or 15000})
+    if info is not None:
+        info.update(iterations=result.nit, converged=bool(result.success))
+    # 停在下限上表示似然仍想把上下界推向數據 (退化解)，不是有界分布，交給 Su
+    if not np.isfinite(result.fun) or np.any(result.x <= floor + SB_BOUNDARY_TOL):
+        return None
+    u, v = result.x
+    loc = x_min - spread * np.exp(u)
+    scale = x_max + spread * np.exp(v) - loc
+    mean, std = _weighted_mean_std(np.log((x - loc) / (loc + scale - x)), weights)
+    b = 1 / std
+    return -b * mean, b, loc, scale, -result.fun
+
+def johnson_sb_log_likelihood(x, a, b, loc, scale):
+    """Johnson Sb 在指定參數下的對數似然 (與 stats.johnsonsb.logpdf 的總和相同)"""
+    z = (x - loc) / scale
+    log_z, log_1mz = np.log(z), np.log1p(-z)
+    w = a + b * (log_z - log_1mz)
+    return (len(x) * (np.log(b) - np.log(scale) - 0.5 * np.log(2 * np.pi)) - np.sum(log_z) - np.sum(log_1mz) -
+            0.5 * np.dot(w, w))
+
+def shash_start(x, column_stats, init=None, weights=None, backend="numpy"):
+    """SHASH 的起始參數: 平均值 / 標準差 或 中位數 / IQR (以及熱啟動的 init)，取負對數似然較小者 (weights: 直方圖的點數)"""
+    q25, median, q75 = np.percentile(x, [25, 50, 75]) if weights is None else weighted_quantile(x, [0.25, 0.5, 0.75], weights)
+    starts = [[column_stats.mean, column_stats.std, 0, 1]]
+    if q75 > q25:
+        starts.append([median, (q75 - q25) / 1.349, 0, 1])
+    if init is not None:
+        starts.append(list(init))
+    neg_log_likelihood = _kernel(shash_neg_log_likelihood, backend)
+    return min(starts, key=lambda params: neg_log_likelihood(params, x, weights)[0])
+
+def _johnson_init(params):
+    """Johnson 參數 dict 轉成 fit_johnson_su_mle 的 init"""
+    return (params["a"], params["b"], params["loc"], params["scale"]) if params else None
+
+def _mixture_init(params, n_components):
+    """混合常態參數 dict 轉成 simple_em_mixture 的 init (weights, means, stds)"""
+    if not params:
+        return None
+    indexes = range(1, n_components + 1)
+    return ([params[f"weight{i}"] for i in indexes], [params[f"mean{i}"] for i in indexes],
+            [params[f"std{i}"] for i in indexes])
+
+def clean_column(data):
+    """去除缺失值並轉為 float64 陣列 (每個欄位只需要做一次)"""
+    values = np.asarray(data, dtype=float)
+    return values[~np.isnan(values)]
+
+class ColumnStats:
+    """
+    欄位的充分統計量，每個欄位只計算一次，供所有分布共用
+    n、total (總和)、mean、m2 (離均差平方和)、min、max、positive (是否全部大於 0)
+    全部為正值時另外計算 sum_log (log x 總和)、mean_log、m2_log (log x 的離均差平方和)、sum_xlogx (x·log x 總和)，否則為 nan
+    """
+    def __init__(self, values):
+        values = np.asarray(values, dtype=float)
+        self.n = len(values)
+        self.total = float(np.sum(values))
+        self.mean = float(np.mean(values)) if self.n else np.nan
+        self.m2 = float(np.sum((values - self.mean)**2))
+        self.min = float(np.min(values)) if self.n else np.nan
+        self.max = float(np.max(values)) if self.n else np.nan
+        self.positive = bool(self.n > 0 and self.min > 0)
+        
+        self.sum_log = self.mean_log = self.m2_log = self.sum_xlogx = np.nan
+        if self.positive:
+            log_values = np.log(values)
+            self.sum_log = float(np.sum(log_values))
+            self.mean_log = float(np.mean(log_values))
+            self.m2_log = float(np.sum((log_values - self.mean_log)**2))
+            self.sum_xlogx = float(np.dot(values, log_values))
+    
+    def merge(self, other):
+        """
+        合併兩段數據的統計量 (例如既有數據 + 新增的列)，回傳新的 ColumnStats，不需要重新讀取舊數據
+        平均值與離均差平方和以 Chan 等人的兩兩合併公式計算
+        """
+        merged = ColumnStats([])
+        if self.n == 0 or other.n == 0:
+            merged.__dict__.update((other if self.n == 0 else self).__dict__)
+            return merged
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        merged.n = n
+        merged.total = self.total + other.total
+        merged.mean = self.mean + delta * other.n / n
+        merged.m2 = self.m2 + other.m2 + delta**2 * self.n * other.n / n
+        merged.min = min(self.min, other.min)
+        merged.max = max(self.max, other.max)
+        merged.positive = self.positive and other.positive
+        if merged.positive:
+            delta_log = other.mean_log - self.mean_log
+            merged.sum_log = self.sum_log + other.sum_log
+            merged.mean_log = self.mean_log + delta_log * other.n / n
+            merged.m2_log = self.m2_log + other.m2_log + delta_log**2 * self.n * other.n / n
+            merged.sum_xlogx = self.sum_xlogx + other.sum_xlogx
+        return merged
+    
+    def to_dict(self):
+        """轉成可存成 JSON 的 dict"""
+        return {key: (float(value) if isinstance(value, float) else value) for key, value in self.__dict__.items()}
+    
+    @classmethod
+    def from_dict(cls, values):
+        """由 to_dict 的結果還原"""
+        column_stats = cls([])
+        column_stats.__dict__.update(values)
+        return column_stats
+    
+    @property
+    def var(self):
+        """母體變異數 (除以 n，與 np.var 相同)"""
+        return self.m2 / self.n
+    
+    @property
+    def std(self):
+        """母體標準差 (與 np.std 相同)"""
+        return np.sqrt(self.var)
+    
+    @property
+    def std_log(self):
+        """log x 的母體標準差"""
+        return np.sqrt(self.m2_log / self.n)
 
 class AICcCalculator:
-    def __init__(self):
+    def __init__(self, fit_cache=None, log_sink=None, binned=False, n_bins=BINNED_N_BINS,
+                 binned_min_points=BINNED_MIN_POINTS, kernel_backend="auto", em_starts=0):
+        """
+        fit_cache: 選用的 FitCache，欄位數據未變更時直接取得先前的配適結果
+        log_sink: 選用的記錄接收函式 (例如 list.append 或 print_log_sink)，每次配適結束時收到一筆結構化記錄 (dict)；
+        預設為 None，不產生任何記錄或輸出
+        binned: 直方圖近似模式，點數至少 binned_min_points 的欄位，BINNED_DISTRIBUTIONS 改以 n_bins 組的加權數據配適，
+        最後在原始數據上精確計算AICc (log_sink 記錄中的 aicc_error 為近似AICc與精確AICc的差)
+        kernel_backend: SHASH、Johnson、Weibull 與混合常態的對數似然計算方式，"numpy"、"numba" (aicc_kernels 的編譯核心)
+        或 "auto" (有安裝 numba 時使用 numba)；沒有安裝 numba 時一律使用 numpy
+        em_starts: 混合常態的多起點 EM，每個欄位使用 em_starts 組初始值 (固定亂數種子的 k-means++ / 分位數)，
+        保留對數似然最大者；0 表示只用兩種固定的初始化策略
+        """
         self.results = {}
+        self.fit_cache = fit_cache
+        self.log_sink = log_sink
+        self.binned = binned
+        self.n_bins = n_bins
+        self.binned_min_points = binned_min_points
+        self.kernel_backend = aicc_kernels.resolve_backend(kernel_backend)
+        self.em_starts = em_starts
+        # 最近一次分組的 (原始數據, (各組平均值, 各組點數))，同一欄位的各分布共用
+        self._last_binned = (None, None)
+        # 目前這次配適的診斷資訊 (迭代次數、是否收斂、候選結果)，只有 log_sink 存在時才記錄
+        self._fit_info = {}
+        # 增量模式的狀態: {欄位名稱: {"n", "data_hash", "stats", "params"}}，見 calculate_incremental_distributions
+        self.incremental_state = {}
         
+    def _log(self, record):
+        """把結構化記錄交給 log_sink (沒有 log_sink 時不做任何事)"""
+        if self.log_sink is not None:
+            self.log_sink(record)
+    
+    def _note_fit(self, **fields):
+        """記錄目前配適的診斷資訊 (iterations、converged、adjustment 等)"""
+        if self.log_sink is not None:
+            self._fit_info.update(fields)
+    
+    def _note_candidate(self, method, params, aicc, **fields):
+        """記錄目前配適中的一個候選結果 (例如Gamma的估計方法、Johnson的Su / Sb)"""
+        if self.log_sink is not None:
+            self._fit_info.setdefault("candidates", []).append(
+                {"method": method, "params": params, "aicc": aicc, **fields})
+    
+    def _binned_column(self, clean_data, column_stats):
+        """直方圖近似模式下回傳 (各組平均值, 各組點數)；未啟用或點數不足時回傳 None"""
+        if not self.binned or column_stats.n < self.binned_min_points:
+            return None
+        if self._last_binned[0] is not clean_data:
+            self._last_binned = (clean_data, bin_column(clean_data, self.n_bins, column_stats.min, column_stats.max))
+        return self._last_binned[1]
+    
+    def _binned_note(self, binned, binned_log_likelihood, log_likelihood, n_params, n):
+        """直方圖近似配適的診斷資訊: 近似AICc、與精確AICc的差、組數"""
+        binned_aicc = self.calculate_aicc(binned_log_likelihood, n_params, n)
+        return {"binned_aicc": binned_aicc, "aicc_error": binned_aicc - self.calculate_aicc(log_likelihood, n_params, n),
+                "n_bins": len(binned[0])}
+    
     def calculate_aicc(self, log_likelihood, n_params, n_data):
         """計算AICc值"""
         aic = -2 * log_likelihood + 2 * n_params
         aicc = aic + (2 * n_params * (n_params + 1)) / (n_data - n_params - 1)
         return aicc
     
-    def fit_normal(self, data):
-        """計算Normal分布的AICc"""
+    def _prepare_column(self, data, column_stats=None):
+        """回傳 (清理後的 float64 陣列, ColumnStats)；已提供 column_stats 時 data 必須是已清理過的同一份數據"""
+        if column_stats is not None:
+            return np.asarray(data, dtype=float), column_stats
+        clean_data = clean_column(data)
+        return clean_data, ColumnStats(clean_data)
+    
+    def fit_normal(self, data, column_stats=None):
+        """計算Normal分布的AICc (MLE 有封閉解，直接由充分統計量計算)"""
         try:
-            clean_data = data.dropna()
-            if len(clean_data) < 3:
+            clean_data, column_stats = self._prepare_column(data, column_stats)
+            n = column_stats.n
+            if n < 3:
                 return None, np.inf
             
-            mu, sigma = stats.norm.fit(clean_data)
-            log_likelihood = np.sum(stats.norm.logpdf(clean_data, mu, sigma))
-            aicc = self.calculate_aicc(log_likelihood, 2, len(clean_data))
+            mu, sigma = column_stats.mean, column_stats.std
+            if not sigma > 0:
+                return None, np.inf
+            log_likelihood = -0.5 * n * (np.log(2 * np.pi * sigma**2) + 1)
+            aicc = self.calculate_aicc(log_likelihood, 2, n)
             
             return {"mu": mu, "sigma": sigma}, aicc
         except Exception as e:
             return None, np.inf
     
-    def fit_lognormal(self, data):
-        """計算LogNormal分布的AICc"""
+    def fit_lognormal(self, data, column_stats=None):
+        """計算LogNormal分布的AICc (MLE 有封閉解，直接由充分統計量計算)"""
         try:
-            clean_data = data.dropna()
-            if len(clean_data) < 3 or np.any(clean_data <= 0):
+            clean_data, column_stats = self._prepare_column(data, column_stats)
+            n = column_stats.n
+            if n < 3 or not column_stats.positive:
                 return None, np.inf
             
-            s, loc, scale = stats.lognorm.fit(clean_data, floc=0)
-            log_likelihood = np.sum(stats.lognorm.logpdf(clean_data, s, loc=loc, scale=scale))
-            aicc = self.calculate_aicc(log_likelihood, 2, len(clean_data))
+            s, scale = column_stats.std_log, np.exp(column_stats.mean_log)
+            if not s > 0:
+                return None, np.inf
+            log_likelihood = -column_stats.sum_log - 0.5 * n * (np.log(2 * np.pi * s**2) + 1)
+            aicc = self.calculate_aicc(log_likelihood, 2, n)
             
             return {"s": s, "scale": scale}, aicc
         except Exception as e:
             return None, np.inf
     
-    def fit_exponential(self, data):
-        """計算Exponential分布的AICc"""
+    def fit_exponential(self, data, column_stats=None):
+        """計算Exponential分布的AICc (MLE 有封閉解，直接由充分統計量計算)"""
         try:
-            clean_data = data.dropna()
-            if len(clean_data) < 2 or np.any(clean_data < 0):
+            clean_data, column_stats = self._prepare_column(data, column_stats)
+            n = column_stats.n
+            if n < 2 or column_stats.min < 0:
                 return None, np.inf
             
-            loc, scale = stats.expon.fit(clean_data, floc=0)
-            log_likelihood = np.sum(stats.expon.logpdf(clean_data, loc=loc, scale=scale))
-            aicc = self.calculate_aicc(log_likelihood, 1, len(clean_data))
+            scale = column_stats.mean
+            if not scale > 0:
+                return None, np.inf
+            log_likelihood = -n * np.log(scale) - n
+            aicc = self.calculate_aicc(log_likelihood, 1, n)
             
             return {"scale": scale}, aicc
         except Exception as e:
             return None, np.inf
     
-    def fit_gamma(self, data, column_name=""):
-        """計算Gamma分布的AICc - 包含JMP修正邏輯"""
+    def fit_gamma(self, data, column_name="", column_stats=None, init=None):
+        """計算Gamma分布的AICc - 包含JMP修正邏輯 (init: 熱啟動用的先前參數)"""
         try:
-            clean_data = data.dropna()
-            if len(clean_data) < 3 or np.any(clean_data <= 0):
+            clean_data, column_stats = self._prepare_column(data, column_stats)
+            if column_stats.n < 3 or not column_stats.positive:
                 return None, np.inf
             
             # 多種方法計算Gamma參數
             methods = {}
+            n = column_stats.n
             
-            # 方法1: SciPy MLE
+            def gamma_log_likelihood(a, scale):
+                return ((a - 1) * column_stats.sum_log - column_stats.total / scale -
+                        n * special.gammaln(a) - n * a * np.log(scale))
+            
+            # 方法1: MLE (Newton 法解形狀參數，尺度參數有封閉解；不收斂時改用 SciPy)
             try:
-                a1, loc1, scale1 = stats.gamma.fit(clean_data, floc=0)
-                ll1 = np.sum(stats.gamma.logpdf(clean_data, a1, loc=0, scale=scale1))
-                aicc1 = self.calculate_aicc(ll1, 2, len(clean_data))
-                methods['scipy_mle'] = {'a': a1, 'scale': scale1, 'aicc': aicc1}
-                print(f"Gamma SciPy MLE: a={a1:.6f}, scale={scale1:.6f}, AICc={aicc1:.3f}")
+                info = {}
+                a1 = gamma_shape_mle(np.log(column_stats.mean) - column_stats.mean_log,
+                                     a_init=init["a"] if init else None, info=info)
+                if a1 is not None:
+                    scale1 = column_stats.mean / a1
+                else:
+                    a1, loc1, scale1 = stats.gamma.fit(clean_data, floc=0)
+                ll1 = gamma_log_likelihood(a1, scale1)
+                aicc1 = self.calculate_aicc(ll1, 2, n)
+                methods['mle'] = {'a': a1, 'scale': scale1, 'aicc': aicc1}
+                self._note_fit(iterations=info.get("iterations"), converged="iterations" in info)
+                self._note_candidate('mle', {"a": a1, "scale": scale1}, aicc1)
             except:
                 pass
             
             # 方法2: 矩估計法
             try:
-                mean_data = np.mean(clean_data)
-                var_data = np.var(clean_data)
+                mean_data = column_stats.mean
+                var_data = column_stats.var
                 a2 = mean_data**2 / var_data
                 scale2 = var_data / mean_data
-                ll2 = np.sum(stats.gamma.logpdf(clean_data, a2, loc=0, scale=scale2))
-                aicc2 = self.calculate_aicc(ll2, 2, len(clean_data))
+                ll2 = gamma_log_likelihood(a2, scale2)
+                aicc2 = self.calculate_aicc(ll2, 2, n)
                 methods['moment'] = {'a': a2, 'scale': scale2, 'aicc': aicc2}
-                print(f"Gamma 矩估計法: a={a2:.6f}, scale={scale2:.6f}, AICc={aicc2:.3f}")
-            except:
-                pass
-            
-            # 方法3: 備選MLE
-            try:
-                def neg_log_likelihood(params):
-                    a, scale = params
-                    if a <= 0 or scale <= 0:
-                        return np.inf
-                    return -np.sum(stats.gamma.logpdf(clean_data, a, loc=0, scale=scale))
-                
-                result = minimize(neg_log_likelihood, [1, 1], method='L-BFGS-B', 
-                                bounds=[(0.01, None), (0.01, None)])
-                if result.success:
-                    a3, scale3 = result.x
-                    ll3 = -result.fun
-                    aicc3 = self.calculate_aicc(ll3, 2, len(clean_data))
-                    methods['alt_mle'] = {'a': a3, 'scale': scale3, 'aicc': aicc3}
-                    print(f"Gamma 備選MLE: a={a3:.6f}, scale={scale3:.6f}, AICc={aicc3:.3f}")
+                self._note_candidate('moment', {"a": a2, "scale": scale2}, aicc2)
             except:
                 pass
             
@@ -218,155 +958,187 @@ class AICcCalculator:
             # 選擇最佳方法
             best_method = min(methods.keys(), key=lambda x: methods[x]['aicc'])
             best_result = methods[best_method]
-            print(f"Gamma 最佳方法: {best_method}, AICc: {best_result['aicc']:.3f}")
+            self._note_fit(method=best_method)
             
             # 檢查是否為GAMMA欄位，需要特殊修正
             final_aicc = best_result['aicc']
             if 'GAMMA' in column_name.upper():
                 # 檢查數據特徵是否符合GAMMA欄位
-                data_mean = np.mean(clean_data)
-                data_std = np.std(clean_data)
+                data_mean = column_stats.mean
+                data_std = column_stats.std
                 if abs(data_mean - 2.22) < 0.1 and data_std < 0.02:
                     final_aicc += 122.65
-                    print(f"Gamma 檢測到GAMMA欄位，應用+122.65修正: {final_aicc:.3f}")
-                else:
-                    print(f"Gamma 檢測到其他欄位，使用原始AICc: {final_aicc:.3f}")
-            else:
-                print(f"Gamma 檢測到其他欄位，使用原始AICc: {final_aicc:.3f}")
+                    self._note_fit(adjustment=122.65)
             
             return {"a": best_result['a'], "scale": best_result['scale']}, final_aicc
             
         except Exception as e:
             return None, np.inf
     
-    def fit_weibull(self, data):
-        """計算Weibull分布的AICc"""
+    def fit_weibull(self, data, column_stats=None, init=None):
+        """計算Weibull分布的AICc (init: 熱啟動用的先前參數)"""
         try:
-            clean_data = data.dropna()
-            if len(clean_data) < 3 or np.any(clean_data <= 0):
+            clean_data, column_stats = self._prepare_column(data, column_stats)
+            if column_stats.n < 3 or not column_stats.positive:
                 return None, np.inf
             
-            c, loc, scale = stats.weibull_min.fit(clean_data, floc=0)
-            log_likelihood = np.sum(stats.weibull_min.logpdf(clean_data, c, loc=0, scale=scale))
-            aicc = self.calculate_aicc(log_likelihood, 2, len(clean_data))
+            # 形狀參數以 profile likelihood 的 Newton 法求解 (起始值: log x 的標準差 = pi / (c * sqrt(6)))
+            # 不收斂時改用 SciPy
+            # 直方圖近似模式以各組平均值的 log 與點數求解，最後在原始數據上精確計算對數似然
+            n = column_stats.n
+            binned = self._binned_column(clean_data, column_stats)
+            solution = None
+            if column_stats.std_log > 0:
+                c_init = init["c"] if init else np.pi / (column_stats.std_log * np.sqrt(6))
+                info = {}
+                if binned is None:
+                    solution = weibull_shape_mle(np.log(clean_data), c_init, info=info, backend=self.kernel_backend)
+                else:
+                    solution = weibull_shape_mle(np.log(binned[0]), c_init, info=info, weights=binned[1],
+                                                 backend=self.kernel_backend)
+                self._note_fit(iterations=info.get("iterations"), converged=solution is not None)
+            if solution is not None:
+                c, log_scale = solution
+                scale = np.exp(log_scale)
+                # 在 MLE 時 sum((x / scale)^c) = n
+                log_likelihood = n * np.log(c) - n * c * log_scale + (c - 1) * column_stats.sum_log - n
+                if binned is not None:
+                    binned_log_likelihood = log_likelihood
+                    log_likelihood += n - np.sum(np.exp(c * (np.log(clean_data) - log_scale)))
+                    self._note_fit(**self._binned_note(binned, binned_log_likelihood, log_likelihood, 2, n))
+            else:
+                c, loc, scale = stats.weibull_min.fit(clean_data, floc=0)
+                log_likelihood = np.sum(stats.weibull_min.logpdf(clean_data, c, loc=0, scale=scale))
+            aicc = self.calculate_aicc(log_likelihood, 2, n)
             
             return {"c": c, "scale": scale}, aicc
         except Exception as e:
             return None, np.inf
     
-    def fit_johnson_sb(self, data):
-        """計算Johnson Sb分布的AICc - 使用MLE方法"""
+    def fit_johnson_sb(self, data, column_stats=None, init=None):
+        """計算Johnson Sb分布的AICc - 使用有界Sb模型的MLE (init: 熱啟動用的先前參數)"""
         try:
-            clean_data = data.dropna()
-            if len(clean_data) < 10:
+            clean_data, column_stats = self._prepare_column(data, column_stats)
+            if column_stats.n < 10:
                 return None, np.inf
             
-            # 使用MLE方法擬合Johnson Sb分布
-            a, b, loc, scale = stats.johnsonsu.fit(clean_data)
-            log_likelihood = np.sum(stats.johnsonsu.logpdf(clean_data, a, b, loc=loc, scale=scale))
-            
             # 檢查是否為有界分布特徵
-            data_min, data_max = clean_data.min(), clean_data.max()
-            if data_max - data_min < np.std(clean_data) * 10:
-                # 可能更適合Sb分布，但使用Su的計算結果
-                aicc = self.calculate_aicc(log_likelihood, 4, len(clean_data))
-                return {"a": a, "b": b, "loc": loc, "scale": scale}, aicc
+            data_min, data_max = column_stats.min, column_stats.max
+            if not data_max - data_min < column_stats.std * 10:
+                return None, np.inf
+            
+            # 使用MLE方法擬合Johnson Sb分布 (loc / scale 的 profile likelihood)
+            # 直方圖近似模式以加權數據配適 (上下界仍包含所有原始數據)，再在原始數據上精確計算對數似然
+            info = {}
+            binned = self._binned_column(clean_data, column_stats)
+            if binned is None:
+                sb_fit = fit_johnson_sb_mle(clean_data, init=_johnson_init(init), info=info, backend=self.kernel_backend)
             else:
+                sb_fit = fit_johnson_sb_mle(binned[0], init=_johnson_init(init), info=info, weights=binned[1],
+                                            bounds=(data_min, data_max), backend=self.kernel_backend)
+            if sb_fit is None:
                 return None, np.inf
+            a, b, loc, scale, log_likelihood = sb_fit
+            if binned is not None:
+                binned_log_likelihood = log_likelihood
+                log_likelihood = johnson_sb_log_likelihood(clean_data, a, b, loc, scale)
+                info.update(self._binned_note(binned, binned_log_likelihood, log_likelihood, 4, column_stats.n))
+            aicc = self.calculate_aicc(log_likelihood, 4, len(clean_data))
+            
+            params = {"a": a, "b": b, "loc": loc, "scale": scale}
+            self._note_candidate("Johnson Sb", params, aicc, **info)
+            return params, aicc
                 
         except Exception as e:
             return None, np.inf
     
-    def fit_johnson_su(self, data):
-        """計算Johnson Su分布的AICc - 使用MLE方法，與JMP一致"""
+    def fit_johnson_su(self, data, column_stats=None, init=None):
+        """計算Johnson Su分布的AICc - 使用MLE方法，與JMP一致 (init: 熱啟動用的先前參數)"""
         try:
-            clean_data = data.dropna()
-            if len(clean_data) < 10:
+            clean_data, column_stats = self._prepare_column(data, column_stats)
+            if column_stats.n < 10:
                 return None, np.inf
             
-            # 使用MLE方法擬合Johnson Su分布
-            a, b, loc, scale = stats.johnsonsu.fit(clean_data)
-            log_likelihood = np.sum(stats.johnsonsu.logpdf(clean_data, a, b, loc=loc, scale=scale))
+            # 使用MLE方法擬合Johnson Su分布 (直方圖近似模式以加權數據配適，再在原始數據上精確計算對數似然)
+            info = {}
+            binned = self._binned_column(clean_data, column_stats)
+            if binned is None:
+                su_fit = fit_johnson_su_mle(clean_data, init=_johnson_init(init), info=info, backend=self.kernel_backend)
+            else:
+                su_fit = fit_johnson_su_mle(binned[0], init=_johnson_init(init), info=info, weights=binned[1],
+                                            backend=self.kernel_backend)
+            if su_fit is None:
+                return None, np.inf
+            a, b, loc, scale, log_likelihood = su_fit
+            if binned is not None:
+                binned_log_likelihood = log_likelihood
+                neg_log_likelihood = _kernel(johnson_su_neg_log_likelihood, self.kernel_backend)
+                log_likelihood = -neg_log_likelihood([a, np.log(b), loc, np.log(scale)], clean_data)[0]
+                info.update(self._binned_note(binned, binned_log_likelihood, log_likelihood, 4, column_stats.n))
             aicc = self.calculate_aicc(log_likelihood, 4, len(clean_data))
             
             # 應用JMP修正（基於之前的研究結果）
             corrected_aicc = aicc + 19.903
             
-            return {"a": a, "b": b, "loc": loc, "scale": scale}, corrected_aicc
+            params = {"a": a, "b": b, "loc": loc, "scale": scale}
+            self._note_candidate("Johnson Su", params, corrected_aicc, adjustment=19.903, **info)
+            return params, corrected_aicc
         except Exception as e:
             return None, np.inf
     
-    def fit_johnson_best(self, data):
-        """選擇最佳的Johnson分布 - 優先選擇Su"""
-        print("\n=== 計算Johnson分布 (MLE方法，與JMP一致) ===")
-        
-        su_params, su_aicc = self.fit_johnson_su(data)
-        print(f"嘗試 Johnson Su...")
-        if su_params is not None:
-            print(f"Johnson Su AICc: {su_aicc:.3f}")
-        
-        sb_params, sb_aicc = self.fit_johnson_sb(data)
-        print(f"嘗試 Johnson Sb...")
-        if sb_params is not None:
-            print(f"Johnson Sb AICc: {sb_aicc:.3f}")
+    def fit_johnson_best(self, data, column_stats=None, init=None):
+        """
+        選擇最佳的Johnson分布 - 優先選擇Su (init: 熱啟動用的先前參數)
+        Su 與 Sb 各自只做一次最佳化；init 可能是 Su 或 Sb 的參數，兩者都只把它當成起始值候選
+        """
+        data, column_stats = self._prepare_column(data, column_stats)
+        su_params, su_aicc = self.fit_johnson_su(data, column_stats, init)
+        sb_params, sb_aicc = self.fit_johnson_sb(data, column_stats, init)
         
         # 優先選擇Su，除非Sb明顯更好
-        if su_params is not None and sb_params is not None:
-            if su_aicc <= sb_aicc + 10:  # Su優先，除非Sb好很多
-                print(f"最佳Johnson分布: Johnson Su, AICc: {su_aicc:.3f} (優先選擇Su)")
-                return su_params, su_aicc
-            else:
-                print(f"最佳Johnson分布: Johnson Sb, AICc: {sb_aicc:.3f}")
-                return sb_params, sb_aicc
-        elif su_params is not None:
-            print(f"最佳Johnson分布: Johnson Su, AICc: {su_aicc:.3f}")
-            return su_params, su_aicc
+        if su_params is not None and (sb_params is None or su_aicc <= sb_aicc + 10):  # Su優先，除非Sb好很多
+            best = "Johnson Su", su_params, su_aicc
         elif sb_params is not None:
-            print(f"最佳Johnson分布: Johnson Sb, AICc: {sb_aicc:.3f}")
-            return sb_params, sb_aicc
+            best = "Johnson Sb", sb_params, sb_aicc
         else:
             return None, np.inf
+        
+        # 以選中的候選結果的迭代資訊作為這次配適的資訊
+        for candidate in self._fit_info.get("candidates", []):
+            if candidate["method"] == best[0]:
+                self._note_fit(method=best[0], iterations=candidate.get("iterations"),
+                               converged=candidate.get("converged"))
+                if "aicc_error" in candidate:
+                    self._note_fit(**{x: candidate[x] for x in ("binned_aicc", "aicc_error", "n_bins")})
+        return best[1], best[2]
     
-    def fit_shash(self, data):
-        """計算SHASH分布的AICc"""
+    def fit_shash(self, data, column_stats=None, init=None):
+        """計算SHASH分布的AICc (init: 熱啟動用的先前參數)"""
         try:
-            clean_data = data.dropna()
-            if len(clean_data) < 10:
+            clean_data, column_stats = self._prepare_column(data, column_stats)
+            if column_stats.n < 10:
                 return None, np.inf
             
-            # SHASH分布參數估計
-            def shash_logpdf(x, mu, sigma, nu, tau):
-                z = (x - mu) / sigma
-                sinh_z = np.sinh(nu + tau * z)
-                cosh_z = np.cosh(nu + tau * z)
-                
-                logpdf = (-0.5 * np.log(2 * np.pi) - np.log(sigma) - 0.5 * np.log(1 + z**2) +
-                         np.log(tau) + np.log(cosh_z) - 0.5 * sinh_z**2)
-                return logpdf
-            
-            def neg_log_likelihood(params):
-                mu, sigma, nu, tau = params
-                if sigma <= 0 or tau <= 0:
-                    return np.inf
-                try:
-                    ll = np.sum(shash_logpdf(clean_data, mu, sigma, nu, tau))
-                    return -ll if np.isfinite(ll) else np.inf
-                except:
-                    return np.inf
+            # 直方圖近似模式以加權數據配適，再在原始數據上精確計算對數似然
+            binned = self._binned_column(clean_data, column_stats)
+            x, weights = (clean_data, None) if binned is None else binned
             
-            # 初始估計
-            mu_init = np.mean(clean_data)
-            sigma_init = np.std(clean_data)
-            nu_init = 0
-            tau_init = 1
+            # 初始估計: 平均值 / 標準差 或 中位數 / IQR (或先前的參數)，取負對數似然較小者
+            start = shash_start(x, column_stats, [init[key] for key in ("mu", "sigma", "nu", "tau")] if init else None,
+                                weights, backend=self.kernel_backend)
             
-            result = minimize(neg_log_likelihood, [mu_init, sigma_init, nu_init, tau_init],
-                            method='L-BFGS-B', 
-                            bounds=[(-np.inf, np.inf), (0.001, np.inf), (-5, 5), (0.001, 5)])
+            # 使用解析梯度
+            neg_log_likelihood = _kernel(shash_neg_log_likelihood, self.kernel_backend)
+            result = minimize(neg_log_likelihood, start, args=(x, weights), jac=True,
+                            method='L-BFGS-B', bounds=SHASH_BOUNDS)
+            self._note_fit(iterations=result.nit, converged=bool(result.success))
             
             if result.success:
                 mu, sigma, nu, tau = result.x
                 log_likelihood = -result.fun
+                if binned is not None:
+                    log_likelihood = -neg_log_likelihood(result.x, clean_data)[0]
+                    self._note_fit(**self._binned_note(binned, -result.fun, log_likelihood, 4, column_stats.n))
                 aicc = self.calculate_aicc(log_likelihood, 4, len(clean_data))
                 return {"mu": mu, "sigma": sigma, "nu": nu, "tau": tau}, aicc
             else:
@@ -375,143 +1147,721 @@ class AICcCalculator:
         except Exception as e:
             return None, np.inf
     
-    def fit_mixture_2_normals(self, data):
-        """計算Mixture of 2 Normals的AICc - 使用簡化EM算法"""
+    def _mixture_applicable(self, column_stats, n_components):
+        """數據是否適合計算混合分布 (點數足夠且有變異)"""
+        if column_stats.n < MIXTURE_MIN_POINTS[n_components]:
+            return False
+        
+        # 如果變異性太小，可能不適合混合分布
+        data_range = column_stats.max - column_stats.min  # peak-to-peak range
+        return not (column_stats.std < 1e-10 or data_range < 1e-10)
+    
+    def _mixture_result(self, result, n_components, column_stats, clean_data=None, binned=None):
+        """
+        檢查 EM 結果的合理性並計算AICc，回傳 (params, aicc)
+        binned: EM 以直方圖近似計算時的 (各組平均值, 各組點數)，此時在原始數據 clean_data 上精確計算對數似然
+        """
+        if result is None:
+            return None, np.inf
+        
+        # 提取參數
+        weights = result['weights']
+        means = result['means']
+        stds = result['stds']
+        if not mixture_is_plausible(result, column_stats.std):
+            return None, np.inf
+        
+        # 計算AICc
+        log_likelihood = result['ll']
+        if binned is not None:
+            log_likelihood = mixture_log_likelihood(clean_data, weights, means, stds)
+        if not np.isfinite(log_likelihood):
+            return None, np.inf
+        
+        aicc = self.calculate_aicc(log_likelihood, 3 * n_components - 1, column_stats.n)
+        self._note_fit(iterations=result['iterations'], converged=result['converged'])
+        if binned is not None:
+            self._note_fit(**self._binned_note(binned, result['ll'], log_likelihood, 3 * n_components - 1,
+                                               column_stats.n))
+        params = {}
+        for i in range(n_components):
+            params[f"mean{i+1}"], params[f"std{i+1}"] = means[i], stds[i]
+        for i in range(n_components):
+            params[f"weight{i+1}"] = weights[i]
+        return params, aicc
+    
+    def fit_mixture_2_normals(self, data, column_stats=None, init=None):
+        """計算Mixture of 2 Normals的AICc - 使用簡化EM算法 (init: 熱啟動用的先前參數)"""
         try:
-            clean_data = data.dropna().values.flatten()
-            if len(clean_data) < 10:
-                return None, np.inf
-            
-            # 檢查數據是否適合混合分布（變異性檢查）
-            data_std = np.std(clean_data)
-            data_range = np.ptp(clean_data)  # peak-to-peak range
-            
-            # 如果變異性太小，可能不適合混合分布
-            if data_std < 1e-10 or data_range < 1e-10:
-                return None, np.inf
-            
-            # 使用簡化的EM算法
-            result = simple_em_mixture(clean_data, n_components=2)
-            
-            if result is None:
+            clean_data, column_stats = self._prepare_column(data, column_stats)
+            if not self._mixture_applicable(column_stats, 2):
                 return None, np.inf
             
-            # 提取參數
-            weights = result['weights']
-            means = result['means']
-            stds = result['stds']
-            
-            # 檢查參數合理性
-            if np.any(stds <= 0) or abs(means[0] - means[1]) < data_std / 10:
-                return None, np.inf
-            
-            # 檢查組件權重不能太小
-            if np.any(weights < 0.01):
-                return None, np.inf
-            
-            # 計算AICc
-            log_likelihood = result['ll']
-            if not np.isfinite(log_likelihood):
-                return None, np.inf
-                
-            aicc = self.calculate_aicc(log_likelihood, 5, len(clean_data))
-            
-            return {
-                "mean1": means[0], "std1": stds[0],
-                "mean2": means[1], "std2": stds[1],
-                "weight1": weights[0], "weight2": weights[1],
-            }, aicc
+            # 使用簡化的EM算法 (直方圖近似模式以加權數據計算)
+            binned = self._binned_column(clean_data, column_stats)
+            if binned is None:
+                result = simple_em_mixture(clean_data, n_components=2, init=_mixture_init(init, 2),
+                                           backend=self.kernel_backend, n_starts=self.em_starts)
+            else:
+                result = simple_em_mixture(binned[0], n_components=2, init=_mixture_init(init, 2), weights=binned[1],
+                                           backend=self.kernel_backend, n_starts=self.em_starts)
+            return self._mixture_result(result, 2, column_stats, clean_data, binned)
             
         except Exception as e:
             return None, np.inf
     
-    def fit_mixture_3_normals(self, data):
-        """計算Mixture of 3 Normals的AICc - 使用簡化EM算法"""
+    def fit_mixture_3_normals(self, data, column_stats=None, init=None):
+        """計算Mixture of 3 Normals的AICc - 使用簡化EM算法 (init: 熱啟動用的先前參數)"""
         try:
-            clean_data = data.dropna().values.flatten()
-            if len(clean_data) < 15:
+            clean_data, column_stats = self._prepare_column(data, column_stats)
+            if not self._mixture_applicable(column_stats, 3):
                 return None, np.inf
             
-            # 檢查數據是否適合混合分布（變異性檢查）
-            data_std = np.std(clean_data)
-            data_range = np.ptp(clean_data)  # peak-to-peak range
-            
-            # 如果變異性太小，可能不適合混合分布
-            if data_std < 1e-10 or data_range < 1e-10:
-                return None, np.inf
-            
-            # 使用簡化的EM算法
-            result = simple_em_mixture(clean_data, n_components=3)
-            
-            if result is None:
-                return None, np.inf
-            
-            # 提取參數
-            weights = result['weights']
-            means = result['means']
-            stds = result['stds']
-            
-            # 檢查參數合理性
-            if np.any(stds <= 0):
-                return None, np.inf
-            
-            # 檢查組件是否過於接近
-            for i in range(3):
-                for j in range(i+1, 3):
-                    if abs(means[i] - means[j]) < data_std / 10:
-                        return None, np.inf
-            
-            # 檢查組件權重不能太小
-            if np.any(weights < 0.01):
-                return None, np.inf
-            
-            # 計算AICc
-            log_likelihood = result['ll']
-            if not np.isfinite(log_likelihood):
-                return None, np.inf
-                
-            aicc = self.calculate_aicc(log_likelihood, 8, len(clean_data))
-            
-            return {
-                "mean1": means[0], "std1": stds[0],
-                "mean2": means[1], "std2": stds[1], 
-                "mean3": means[2], "std3": stds[2],
-                "weight1": weights[0], "weight2": weights[1], "weight3": weights[2],
-            }, aicc
+            # 使用簡化的EM算法 (直方圖近似模式以加權數據計算)
+            binned = self._binned_column(clean_data, column_stats)
+            if binned is None:
+                result = simple_em_mixture(clean_data, n_components=3, init=_mixture_init(init, 3),
+                                           backend=self.kernel_backend, n_starts=self.em_starts)
+            else:
+                result = simple_em_mixture(binned[0], n_components=3, init=_mixture_init(init, 3), weights=binned[1],
+                                           backend=self.kernel_backend, n_starts=self.em_starts)
+            return self._mixture_result(result, 3, column_stats, clean_data, binned)
             
         except Exception as e:
             return None, np.inf
     
-    def calculate_all_distributions(self, data, column_name=""):
-        """計算所有9個分布的AICc值"""
-        distributions = {
+    def fit_mixtures_batched(self, columns, n_components, column_name_hashes=None, fit_infos=None, inits=None):
+        """
+        多個欄位的混合常態分布一次以 batched_em_mixture 計算 (所有欄位與兩種初始化策略共用三維陣列運算)
+        columns: {欄位名稱: (清理後的數據, ColumnStats)}；column_name_hashes: {欄位名稱: 數據雜湊}，有 fit_cache 時使用
+        fit_infos: 選用的 dict，會填入 {欄位名稱: {"iterations", "converged", "batched"}}
+        inits: 選用的 {欄位名稱: 先前的 params}，有的欄位從這組參數熱啟動
+        回傳 {欄位名稱: (params, aicc)}，與逐欄呼叫 fit_mixture_2_normals / fit_mixture_3_normals 的結果相同
+        直方圖近似模式下符合分組條件的欄位不在這裡計算 (不包含在回傳值中)，由 fit_distribution 逐欄計算
+        """
+        name = MIXTURE_DISTRIBUTIONS[n_components]
+        results = {}
+        pending = []
+        for column_name, (clean_data, column_stats) in columns.items():
+            if self.binned and column_stats.n >= self.binned_min_points:
+                continue
+            if not self._mixture_applicable(column_stats, n_components):
+                results[column_name] = (None, np.inf)
+                continue
+            if self.fit_cache is not None:
+                key = self._cache_key(name, column_name, column_name_hashes[column_name])
+                cached = self.fit_cache.get(key)
+                if cached is not None:
+                    results[column_name] = cached
+                    continue
+            pending.append(column_name)
+        
+        em_inits = [_mixture_init(inits.get(x), n_components) for x in pending] if inits else None
+        em_results = batched_em_mixture([columns[x][0] for x in pending], n_components, inits=em_inits,
+                                        backend=self.kernel_backend, n_starts=self.em_starts)
+        for column_name, result in zip(pending, em_results):
+            try:
+                results[column_name] = self._mixture_result(result, n_components, columns[column_name][1])
+            except Exception:
+                results[column_name] = (None, np.inf)
+            if fit_infos is not None and result is not None:
+                fit_infos[column_name] = {"iterations": result['iterations'], "converged": result['converged'],
+                                          "batched": True}
+            if self.fit_cache is not None:
+                key = self._cache_key(name, column_name, column_name_hashes[column_name])
+                self.fit_cache.put(key, results[column_name])
+        return results
+    
+    def _distribution_fitters(self, column_name=""):
+        """分布名稱與對應 fit 方法的對照表"""
+        return {
             "Normal": self.fit_normal,
             "LogNormal": self.fit_lognormal,
             "Exponential": self.fit_exponential,
-            "Gamma": lambda x: self.fit_gamma(x, column_name),
+            "Gamma": lambda x, column_stats=None, init=None: self.fit_gamma(x, column_name, column_stats, init),
             "Weibull": self.fit_weibull,
             "Johnson Sb": self.fit_johnson_best,  # 會自動選擇最佳Johnson
             "SHASH": self.fit_shash,
             "Mixture of 2 Normals": self.fit_mixture_2_normals,
             "Mixture of 3 Normals": self.fit_mixture_3_normals
         }
+    
+    def _cache_key(self, name, column_name, data_hash):
+        """配適結果快取的鍵 (只有結果與欄位名稱有關的分布才把欄位名稱納入鍵，其餘分布不同欄位名稱的相同數據共用結果)"""
+        column_name = column_name if name in COLUMN_NAME_DISTRIBUTIONS else ""
+        return self.fit_cache.make_key(data_hash, CALCULATOR_VERSION, name, column_name, self._cache_options())
+    
+    def _cache_options(self):
+        """會影響配適結果的計算器選項 (納入快取鍵)"""
+        options = ()
+        if self.binned:
+            options += ("binned", self.n_bins, self.binned_min_points)
+        if self.kernel_backend != "numpy":
+            options += (self.kernel_backend,)  # 編譯核心的加總順序不同，結果可能有捨入誤差
+        if self.em_starts > 2:
+            options += ("em_starts", self.em_starts)
+        return options
+    
+    def fit_distribution(self, name, data, column_name="", column_stats=None, data_hash=None, init=None):
+        """
+        依分布名稱計算單一分布，回傳 (params, aicc)；有 fit_cache 時先查快取 (data_hash: 已算好的數據雜湊)
+        init: 先前的參數 (同一分布的 params)，只有 WARM_START_DISTRIBUTIONS 會用來熱啟動
+        """
+        fitters = self._distribution_fitters(column_name)
+        if name not in fitters:
+            raise ValueError(f"未知的分布: {name}")
+        fitter = fitters[name]
+        if init is not None and name in WARM_START_DISTRIBUTIONS:
+            fitter = lambda x, column_stats=None: fitters[name](x, column_stats=column_stats, init=init)
+        if self.fit_cache is None:
+            return fitter(data, column_stats=column_stats)
         
+        clean_data, column_stats = self._prepare_column(data, column_stats)
+        key = self._cache_key(name, column_name, data_hash or hash_array(clean_data))
+        result = self.fit_cache.get(key)
+        if result is None:
+            result = fitter(clean_data, column_stats=column_stats)
+            self.fit_cache.put(key, result)
+        return result
+    
+    def _fit_aicc(self, name, clean_data, column_name, column_stats, data_hash=None):
+        """計算單一分布並回傳AICc (失敗時為 inf)"""
+        return self._fit_result(name, clean_data, column_name, column_stats, data_hash)[1]
+    
+    def _fit_result(self, name, clean_data, column_name, column_stats, data_hash=None, init=None,
+                    precomputed=None, precomputed_info=None):
+        """
+        計算單一分布並回傳 (params, aicc) (失敗時為 (None, inf))
+        precomputed / precomputed_info: 已算好的 (params, aicc) 與其診斷資訊 (例如 batched EM 的結果)
+        有 log_sink 時送出一筆 "fit" 記錄: column、family、params、aicc、elapsed_us、iterations、converged
+        (加上 candidates、method、adjustment、error 等診斷資訊)
+        """
+        self._fit_info = dict(precomputed_info or {})
+        start = time.perf_counter_ns() if self.log_sink is not None else 0
+        error = None
+        try:
+            if precomputed is not None:
+                params, aicc = precomputed
+            else:
+                params, aicc = self.fit_distribution(name, clean_data, column_name, column_stats, data_hash, init)
+            if params is None or not np.isfinite(aicc):
+                params, aicc = None, np.inf
+        except Exception as e:
+            params, aicc, error = None, np.inf, str(e)
+        
+        if self.log_sink is not None:
+            record = {"event": "fit", "column": column_name, "family": name, "params": params, "aicc": aicc,
+                      "elapsed_us": (time.perf_counter_ns() - start) // 1000,
+                      "iterations": None, "converged": None, "error": error}
+            if name not in WARM_START_DISTRIBUTIONS and error is None:
+                record.update(iterations=0, converged=True)  # 封閉解
+            record.update(self._fit_info)
+            self._log(record)
+        return params, aicc
+    
+    def calculate_all_distributions(self, data, column_name=""):
+        """計算所有9個分布的AICc值"""
         results = {}
         
-        for name, fit_func in distributions.items():
-            try:
-                print(f"\n計算 {name} 分布...")
-                params, aicc = fit_func(data)
-                
-                if params is not None and np.isfinite(aicc):
-                    results[name] = aicc
-                    print(f"{name} AICc: {aicc:.3f}")
+        # 每個欄位只清理一次數據並計算一次充分統計量，所有分布共用
+        clean_data = clean_column(data)
+        column_stats = ColumnStats(clean_data)
+        data_hash = hash_array(clean_data) if self.fit_cache is not None else None
+        
+        for name in DISTRIBUTION_NAMES:
+            results[name] = self._fit_aicc(name, clean_data, column_name, column_stats, data_hash)
+        
+        return results
+    
+    def calculate_columns_distributions(self, columns_data):
+        """
+        計算多個欄位所有9個分布的AICc值，回傳 {欄位名稱: {分布名稱: AICc}}
+        混合常態分布以 fit_mixtures_batched 一次計算所有欄位，其餘分布逐欄計算；結果與逐欄呼叫 calculate_all_distributions 相同
+        """
+        columns = {}
+        data_hashes = {}
+        for column_name, data in columns_data.items():
+            clean_data = clean_column(data)
+            columns[column_name] = (clean_data, ColumnStats(clean_data))
+            data_hashes[column_name] = hash_array(clean_data) if self.fit_cache is not None else None
+        
+        mixture_results = {}
+        mixture_infos = {}
+        for n_components, name in MIXTURE_DISTRIBUTIONS.items():
+            mixture_infos[name] = {}
+            mixture_results[name] = self.fit_mixtures_batched(columns, n_components, data_hashes, mixture_infos[name])
+        
+        all_results = {}
+        for column_name, (clean_data, column_stats) in columns.items():
+            results = {}
+            for name in DISTRIBUTION_NAMES:
+                if column_name in mixture_results.get(name, {}):
+                    results[name] = self._fit_result(name, clean_data, column_name, column_stats,
+                                                     precomputed=mixture_results[name][column_name],
+                                                     precomputed_info=mixture_infos[name].get(column_name))[1]
                 else:
+                    results[name] = self._fit_result(name, clean_data, column_name, column_stats,
+                                                     data_hashes[column_name])[1]
+            all_results[column_name] = results
+        return all_results
+    
+    def calculate_incremental_distributions(self, data, column_name=""):
+        """
+        增量模式: data 為欄位的完整歷史數據 (例如每天在後面附加新列的 SPC 資料表)，回傳格式與 calculate_all_distributions 相同
+        若先前計算過的數據 (依 incremental_state 記錄的列數與雜湊) 是目前數據的開頭，只對新增的列計算充分統計量並與先前的合併，
+        需要迭代的分布 (WARM_START_DISTRIBUTIONS) 從先前的參數熱啟動，通常只需要幾次迭代就收斂；
+        數據被修改 (不只是附加) 或沒有先前狀態時，等同 calculate_all_distributions
+        注意: 熱啟動的混合分布只從先前的參數開始，可能與冷啟動收斂到不同的局部最佳解
+        """
+        results = {}
+        clean_data = clean_column(data)
+        state = self.incremental_state.get(column_name)
+        
+        previous_params = {}
+        if state is not None and state["n"] <= len(clean_data) and hash_array(clean_data[:state["n"]]) == state["data_hash"]:
+            column_stats = ColumnStats.from_dict(state["stats"]).merge(ColumnStats(clean_data[state["n"]:]))
+            previous_params = state["params"]
+            self._log({"event": "incremental", "column": column_name, "previous_rows": state["n"],
+                       "new_rows": len(clean_data) - state["n"]})
+        else:
+            column_stats = ColumnStats(clean_data)
+        
+        data_hash = hash_array(clean_data)
+        params_by_name = {}
+        for name in DISTRIBUTION_NAMES:
+            params, results[name] = self._fit_result(name, clean_data, column_name, column_stats, data_hash,
+                                                     init=previous_params.get(name))
+            if params is not None:
+                params_by_name[name] = {key: float(value) for key, value in params.items()}
+        
+        self.incremental_state[column_name] = {
+            "n": len(clean_data), "data_hash": data_hash, "stats": column_stats.to_dict(), "params": params_by_name,
+        }
+        return results
+    
+    def save_incremental_state(self, file_path):
+        """把增量模式的狀態 (各欄位的列數、雜湊、充分統計量與參數) 存成 JSON，下次執行時以 load_incremental_state 載入"""
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INCREMENTAL_STATE_VERSION, "calculator_version": CALCULATOR_VERSION,
+                       "columns": self.incremental_state}, f, ensure_ascii=False)
+    
+    def load_incremental_state(self, file_path):
+        """載入 save_incremental_state 存的狀態；檔案不存在、損毀或版本不同時回傳 False (狀態不變，下次為完整計算)"""
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if saved.get("version") != INCREMENTAL_STATE_VERSION or saved.get("calculator_version") != CALCULATOR_VERSION:
+            return False
+        self.incremental_state = saved["columns"]
+        return True
+    
+    def _screening_aicc(self, name, clean_data, column_stats):
+        """啟發式篩選: 只做 SCREEN_MAX_ITER 次迭代的部分配適並計算AICc (不含Johnson的JMP修正)"""
+        n = column_stats.n
+        n_params = SCREENED_DISTRIBUTIONS[name]
+        # 直方圖近似模式下篩選也以加權數據計算 (近似的對數似然)
+        binned = self._binned_column(clean_data, column_stats)
+        x, weights = (clean_data, None) if binned is None else binned
+        if name == "SHASH":
+            result = minimize(_kernel(shash_neg_log_likelihood, self.kernel_backend),
+                              shash_start(x, column_stats, weights=weights, backend=self.kernel_backend), args=(x, weights), jac=True, method='L-BFGS-B', bounds=SHASH_BOUNDS, options={'maxiter': SCREEN_MAX_ITER})
+            log_likelihood = -result.fun
+        elif name == "Johnson Sb":
+            # Su 的部分配適 (不含JMP修正) 與 Sb (符合有界特徵時) 取較佳者
+            fits = [fit_johnson_su_mle(x, max_iter=SCREEN_MAX_ITER, weights=weights, backend=self.kernel_backend)]
+            if column_stats.max - column_stats.min < column_stats.std * 10:
+                fits.append(fit_johnson_sb_mle(x, max_iter=SCREEN_MAX_ITER, weights=weights,
+                                               bounds=(column_stats.min, column_stats.max), backend=self.kernel_backend))
+            log_likelihood = max((fit[-1] for fit in fits if fit is not None), default=-np.inf)
+        else:
+            n_components = 2 if name == "Mixture of 2 Normals" else 3
+            result = simple_em_mixture(x, n_components=n_components, max_iter=SCREEN_MAX_ITER, weights=weights,
+                                       backend=self.kernel_backend)
+            log_likelihood = result['ll'] if result is not None else -np.inf
+        return self.calculate_aicc(log_likelihood, n_params, n)
+    
+    def calculate_screened_distributions(self, data, column_name="", margin=PRUNE_AICC_MARGIN):
+        """
+        啟發式篩選模式: 只完整計算可能是最佳 (或接近最佳) 的分布，回傳格式與 calculate_all_distributions 相同，被略過的分布為 inf
+        依 SCREENING_ORDER 由快到慢計算；較慢的分布 (Johnson、SHASH、混合分布) 先做少量迭代的部分配適，
+        若其AICc已超過目前最佳值 + margin 就略過完整配適
+        注意: 這只是啟發式方法，可能漏掉真正的最佳分布: 部分配適的AICc是完整配適的上限而不是下限 (完整配適只會更好)，
+        無法證明被略過的分布一定比較差；margin 代表預期完整配適最多還能改善多少，margin 越大越保守
+        需要保證正確的最佳分布或完整排名時請使用 calculate_all_distributions
+        """
+        results = {}
+        
+        clean_data = clean_column(data)
+        column_stats = ColumnStats(clean_data)
+        data_hash = hash_array(clean_data) if self.fit_cache is not None else None
+        best_aicc = np.inf
+        
+        for name in SCREENING_ORDER:
+            # 已有快取結果時不需要篩選
+            is_cached = (self.fit_cache is not None and
+                         self.fit_cache.contains(self._cache_key(name, column_name, data_hash)))
+            if name in SCREENED_DISTRIBUTIONS and np.isfinite(best_aicc) and not is_cached:
+                try:
+                    screening_aicc = self._screening_aicc(name, clean_data, column_stats)
+                except Exception:
+                    screening_aicc = -np.inf  # 無法篩選時照常計算
+                if screening_aicc > best_aicc + margin:
+                    self._log({"event": "skip", "column": column_name, "family": name,
+                               "screening_aicc": screening_aicc, "best_aicc": best_aicc, "margin": margin})
                     results[name] = np.inf
-                    print(f"{name} 計算失敗")
-                    
-            except Exception as e:
-                print(f"{name} 發生錯誤: {e}")
-                results[name] = np.inf
+                    continue
+            
+            results[name] = self._fit_aicc(name, clean_data, column_name, column_stats, data_hash)
+            best_aicc = min(best_aicc, results[name])
+        
+        return {name: results[name] for name in DISTRIBUTION_NAMES}
+    
+    def _calculator_options(self):
+        """建立相同設定的計算器所需的參數 (bootstrap 的工作程序使用，不含快取與記錄)"""
+        return {"binned": self.binned, "n_bins": self.n_bins, "binned_min_points": self.binned_min_points,
+                "kernel_backend": self.kernel_backend, "em_starts": self.em_starts}
+    
+    def bootstrap_replicates(self, clean_data, column_name, params_by_name, replicates, seed=BOOTSTRAP_SEED):
+        """
+        計算指定編號的 bootstrap 重抽樣各分布的AICc，回傳 [{分布名稱: AICc}, ...] (與 replicates 順序相同)
+        第 r 次重抽樣的亂數產生器以 (seed, r) 建立，結果與分批方式及程序數無關
+        params_by_name: 完整數據的配適參數，需要迭代的分布從這些參數熱啟動；混合常態分布的所有重抽樣一起以 batched EM 計算
+        """
+        columns = {}
+        for replicate in replicates:
+            rng = np.random.default_rng([seed, replicate])
+            resample = clean_data[rng.integers(0, len(clean_data), len(clean_data))]
+            columns[replicate] = (resample, ColumnStats(resample))
+        
+        mixture_results = {}
+        for n_components, name in MIXTURE_DISTRIBUTIONS.items():
+            inits = {x: params_by_name.get(name) for x in columns}
+            mixture_results[name] = self.fit_mixtures_batched(columns, n_components, inits=inits)
+        
+        results = []
+        for replicate, (resample, column_stats) in columns.items():
+            aicc_by_name = {}
+            for name in DISTRIBUTION_NAMES:
+                if replicate in mixture_results.get(name, {}):
+                    params, aicc = mixture_results[name][replicate]
+                else:
+                    try:
+                        params, aicc = self.fit_distribution(name, resample, column_name, column_stats,
+                                                             init=params_by_name.get(name))
+                    except Exception:
+                        params, aicc = None, np.inf
+                aicc_by_name[name] = aicc if params is not None and np.isfinite(aicc) else np.inf
+            results.append(aicc_by_name)
+        return results
+    
+    def bootstrap_distributions(self, data, column_name="", n_boot=BOOTSTRAP_REPLICATES, seed=BOOTSTRAP_SEED,
+                                max_workers=None, min_boot=BOOTSTRAP_MIN_REPLICATES, freq_tol=BOOTSTRAP_FREQ_TOL,
+                                should_stop=None):
+        """
+        最佳分布排名的 bootstrap 穩定性: 重抽樣最多 n_boot 次，每次重新計算所有分布的AICc
+        重抽樣分成每組最多 BOOTSTRAP_BATCH 次的工作，以多個程序平行計算 (max_workers: 程序數，None = CPU 核心數，1 = 不平行)；
+        至少 min_boot 次後，若目前最佳分布勝出比例的標準誤小於 freq_tol 就提早停止 (依工作編號順序判斷，結果與程序數無關)
+        程序池使用共用的程序池 (見 get_shared_executor)，程序中的工作失敗時該組重抽樣改在目前程序中計算
+        should_stop: 選用的函式，每組重抽樣完成後呼叫，回傳 True 時中止 (例如使用者取消)，只以已完成的重抽樣計算結果
+        回傳 dict: aicc (完整數據的AICc)、n_boot (實際重抽樣次數)、stopped_early、cancelled (是否被 should_stop 中止)、
+        win_frequency ({分布名稱: 勝出比例})、aicc_interval ({分布名稱: (2.5%, 97.5%) 分位數}，沒有有效值時為 None)
+        """
+        clean_data = clean_column(data)
+        column_stats = ColumnStats(clean_data)
+        full_aicc = {}
+        params_by_name = {}
+        for name in DISTRIBUTION_NAMES:
+            params, full_aicc[name] = self._fit_result(name, clean_data, column_name, column_stats)
+            if params is not None:
+                params_by_name[name] = {key: float(value) for key, value in params.items()}
         
-        return results 
\ No newline at end of file
+        batch_size = max(1, min(BOOTSTRAP_BATCH, BOOTSTRAP_MAX_BATCH_POINTS // max(1, len(clean_data))))
+        batches = [list(range(i, min(i + batch_size, n_boot))) for i in range(0, n_boot, batch_size)]
+        replicate_aicc = []
+        wins = dict.fromkeys(DISTRIBUTION_NAMES, 0)
+        
+        def settled():
+            """加入一組結果後判斷是否可以提早停止"""
+            n = len(replicate_aicc)
+            if n < min_boot or n >= n_boot:
+                return False
+            p = max(wins.values()) / n
+            return np.sqrt(p * (1 - p) / n) < freq_tol
+        
+        def add_batch(results):
+            for aicc_by_name in results:
+                replicate_aicc.append(aicc_by_name)
+                best = min(DISTRIBUTION_NAMES, key=lambda x: aicc_by_name[x])
+                if np.isfinite(aicc_by_name[best]):
+                    wins[best] += 1
+        
+        # 重抽樣一律以不使用快取的新計算器計算 (重抽樣的數據不會重複出現，不需要寫入快取)
+        stopped_early = cancelled = False
+        args = (clean_data, column_name, params_by_name)
+        options = self._calculator_options()
+        max_workers = max_workers or os.cpu_count() or 1
+        pool = get_shared_executor(max_workers) if max_workers > 1 else None
+        executor = pool  # 無法再送出工作時設為 None
+        futures = {}
+        
+        def batch_results(index):
+            """第 index 組重抽樣的結果: 已送到程序池的取回結果，未送出或程序中失敗的在目前程序中計算"""
+            future = futures.pop(index, None)
+            if future is not None:
+                try:
+                    return future.result()
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool):
+                        discard_shared_executor(pool)
+            return _bootstrap_task(*args, batches[index], seed, options)
+        
+        try:
+            # 最多預先送出 2 倍程序數的工作，依編號順序取回結果，提早停止時其餘工作不必計算
+            submitted = 0
+            for index in range(len(batches)):
+                while executor is not None and submitted < min(len(batches), index + 2 * max_workers):
+                    try:
+                        futures[submitted] = executor.submit(_bootstrap_task, *args, batches[submitted], seed, options)
+                    except (BrokenProcessPool, RuntimeError) as e:  # RuntimeError: 程序池已被其他執行緒關閉
+                        if isinstance(e, BrokenProcessPool):
+                            discard_shared_executor(pool)
+                        executor = None
+                        break
+                    submitted += 1
+                add_batch(batch_results(index))
+                if settled():
+                    stopped_early = True
+                    break
+                if should_stop is not None and should_stop():
+                    cancelled = True
+                    break
+        finally:
+            for future in futures.values():
+                future.cancel()
+        
+        n = len(replicate_aicc)
+        aicc_interval = {}
+        for name in DISTRIBUTION_NAMES:
+            values = np.array([x[name] for x in replicate_aicc])
+            values = values[np.isfinite(values)]
+            aicc_interval[name] = tuple(float(x) for x in np.percentile(values, [2.5, 97.5])) if len(values) else None
+        summary = {"aicc": full_aicc, "n_boot": n, "stopped_early": stopped_early, "cancelled": cancelled,
+                   "win_frequency": {x: wins[x] / n if n else 0.0 for x in DISTRIBUTION_NAMES},
+                   "aicc_interval": aicc_interval}
+        self._log({"event": "bootstrap", "column": column_name, "replicates": n, "stopped_early": stopped_early,
+                   "win_frequency": summary["win_frequency"]})
+        return summary
+
+def incremental_state_path(data_file_path, state_dir=None):
+    """資料檔案對應的增量模式狀態檔 (依完整路徑命名，放在 state_dir，預設 DEFAULT_INCREMENTAL_STATE_DIR)"""
+    path_key = hashlib.blake2b(os.path.normcase(os.path.abspath(data_file_path)).encode("utf-8"),
+                               digest_size=12).hexdigest()
+    return os.path.join(state_dir or DEFAULT_INCREMENTAL_STATE_DIR, path_key + ".json")
+
+def print_log_sink(record):
+    """把 AICcCalculator 的結構化記錄格式化後輸出到終端機 (除錯用的 log_sink)"""
+    event = record["event"]
+    if event == "fit":
+        if np.isfinite(record["aicc"]):
+            status = f"AICc: {record['aicc']:.3f}"
+        else:
+            status = "計算失敗" + (f" ({record['error']})" if record["error"] else "")
+        details = "batched EM" if record.get("batched") else f"{record['elapsed_us']} µs"
+        if record["iterations"] is not None:
+            details += f", {record['iterations']} 次迭代" + ("" if record["converged"] else "，未收斂")
+        print(f"[{record['column']}] {record['family']} {status} ({details})")
+        for candidate in record.get("candidates", []):
+            print(f"    {candidate['method']}: AICc {candidate['aicc']:.3f}")
+        if "adjustment" in record:
+            print(f"    JMP修正: +{record['adjustment']}")
+        if "aicc_error" in record:
+            print(f"    直方圖近似 ({record['n_bins']} 組): AICc誤差 {record['aicc_error']:+.3f}")
+    elif event == "skip":
+        print(f"[{record['column']}] 略過 {record['family']} (部分配適AICc {record['screening_aicc']:.3f} > "
+              f"目前最佳 {record['best_aicc']:.3f} + {record['margin']})")
+    elif event == "bootstrap":
+        frequencies = sorted(record["win_frequency"].items(), key=lambda x: -x[1])
+        print(f"[{record['column']}] bootstrap {record['replicates']} 次" + ("，已提早停止" if record["stopped_early"] else "") +
+              ": " + ", ".join(f"{name} {frequency:.0%}" for name, frequency in frequencies if frequency > 0))
+    elif event == "incremental":
+        print(f"[{record['column']}] 增量計算 (原有 {record['previous_rows']} 筆，新增 {record['new_rows']} 筆)")
+    else:
+        print(record)
+
+def _fit_columns_task(columns_data, heuristic_screening=False, use_fit_cache=False, binned=False,
+                      kernel_backend="auto", em_starts=0):
+    """
+    工作程序: 計算一組欄位所有分布的AICc，回傳 [(欄位名稱, {分布名稱: AICc}), ...]
+    heuristic_screening: 使用 calculate_screened_distributions (逐欄，可能漏掉真正的最佳分布)，否則以 calculate_columns_distributions 一起計算混合分布
+    use_fit_cache: 使用配適結果快取；binned: 使用直方圖近似模式；kernel_backend、em_starts: 見 AICcCalculator
+    """
+    calculator = AICcCalculator(fit_cache=get_default_fit_cache() if use_fit_cache else None, binned=binned,
+                                kernel_backend=kernel_backend, em_starts=em_starts)
+    if heuristic_screening:
+        return [(column_name, calculator.calculate_screened_distributions(pd.Series(values), column_name))
+                for column_name, values in columns_data.items()]
+    return list(calculator.calculate_columns_distributions(columns_data).items())
+
+def _bootstrap_task(clean_data, column_name, params_by_name, replicates, seed, calculator_options):
+    """工作程序: 以相同設定的計算器計算一組 bootstrap 重抽樣 (見 AICcCalculator.bootstrap_replicates)"""
+    calculator = AICcCalculator(**calculator_options)
+    return calculator.bootstrap_replicates(clean_data, column_name, params_by_name, replicates, seed)
+
+def _fit_family_task(column_name, name, values, use_fit_cache=False, binned=False, kernel_backend="auto",
+                     em_starts=0):
+    """工作程序: 計算單一欄位單一分布的AICc (失敗時為 inf)"""
+    try:
+        calculator = AICcCalculator(fit_cache=get_default_fit_cache() if use_fit_cache else None, binned=binned,
+                                    kernel_backend=kernel_backend, em_starts=em_starts)
+        params, aicc = calculator.fit_distribution(name, pd.Series(values), column_name)
+    except Exception:
+        return column_name, name, np.inf
+    return column_name, name, aicc if params is not None and np.isfinite(aicc) else np.inf
+
+# 共用的程序池 (Tk 主執行緒與背景執行緒都可能使用)，建立、更換與丟棄都在 _shared_executor_lock 內進行
+_shared_executor = None
+_shared_executor_workers = None
+_shared_executor_lock = threading.Lock()
+
+def get_shared_executor(max_workers):
+    """
+    取得共用的程序池，多次計算之間重複使用 (spawn 模式下每次啟動程序的成本遠高於單次配適)
+    程序數不同時建立新的程序池，舊的程序池不再接受工作，但其他執行緒已送出的工作照常完成
+    """
+    global _shared_executor, _shared_executor_workers
+    with _shared_executor_lock:
+        if _shared_executor is None or _shared_executor_workers != max_workers:
+            if _shared_executor is not None:
+                _shared_executor.shutdown(wait=False)
+            _shared_executor = ProcessPoolExecutor(max_workers=max_workers)
+            _shared_executor_workers = max_workers
+        return _shared_executor
+
+def discard_shared_executor(executor):
+    """
+    丟棄已損壞的程序池，下次使用時重新建立
+    只有 executor 仍是目前的共用程序池時才丟棄 (其他執行緒可能已經換成新的程序池，不能關閉它)
+    """
+    global _shared_executor, _shared_executor_workers
+    with _shared_executor_lock:
+        if executor is None or _shared_executor is not executor:
+            return
+        _shared_executor = _shared_executor_workers = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_shared_executor(wait=False):
+    """關閉共用的程序池 (例如程式結束前)"""
+    global _shared_executor, _shared_executor_workers
+    with _shared_executor_lock:
+        executor = _shared_executor
+        _shared_executor = _shared_executor_workers = None
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+def _submit_tasks(max_workers, tasks):
+    """
+    把 [(函式, 參數, 標記), ...] 送到共用的程序池，回傳 (程序池, {future: 標記})
+    程序池已損壞 (例如工作程序在閒置時被終止) 或剛被其他執行緒更換時，以新的程序池重新送出一次
+    """
+    for attempt in range(2):
+        executor = get_shared_executor(max_workers)
+        futures = {}
+        try:
+            for function, args, tag in tasks:
+                futures[executor.submit(function, *args)] = tag
+            return executor, futures
+        except (BrokenProcessPool, RuntimeError) as e:  # RuntimeError: 程序池已被其他執行緒關閉
+            for future in futures:
+                future.cancel()
+            if isinstance(e, BrokenProcessPool):
+                discard_shared_executor(executor)
+            if attempt:
+                raise
+
+def _fit_columns_serially(columns_data, task_options, error, executor=None):
+    """
+    程序中的工作失敗 (例如程序池損壞) 時，在目前程序中逐欄重新計算這組欄位
+    仍然失敗的欄位所有分布都是 inf；executor: 工作所在的程序池 (損壞時丟棄)
+    """
+    logger.warning("平行計算工作失敗，改在目前程序中計算 %d 個欄位: %s", len(columns_data), error)
+    if isinstance(error, BrokenProcessPool):
+        discard_shared_executor(executor)
+    results = []
+    for column_name, values in columns_data.items():
+        try:
+            results += _fit_columns_task({column_name: values}, *task_options)
+        except Exception as e:
+            logger.warning("計算 %s 失敗: %s", column_name, e)
+            results.append((column_name, dict.fromkeys(DISTRIBUTION_NAMES, np.inf)))
+    return results
+
+def calculate_columns_parallel(columns_data, max_workers=None, split_families="auto", heuristic_screening=False,
+                               use_fit_cache=False, binned=False, kernel_backend="auto", em_starts=0,
+                               min_parallel_work=PARALLEL_MIN_WORK):
+    """
+    以多個程序平行計算多個欄位的AICc，每個工作算完就立即 yield 其中各欄位的 (欄位名稱, {分布名稱: AICc})，順序依完成先後
+    不分散分布時，欄位分成每組最多 COLUMNS_PER_TASK 欄的工作 (同一組的混合分布以 batched EM 一起計算)
+    columns_data: {欄位名稱: 已去除缺失值的數值陣列}；max_workers: 程序數 (None = CPU 核心數，1 = 在目前程序中依序計算)
+    split_families: True 時同一欄位的各個分布也分散到不同程序計算，"auto" 表示欄位數少於程序數時才分散
+    heuristic_screening: 使用啟發式篩選模式 (見 AICcCalculator.calculate_screened_distributions)，此模式下不分散分布
+    use_fit_cache: 各程序使用共用的配適結果快取 (記憶體 + 磁碟，見 fit_cache.get_default_fit_cache)
+    binned: 大型欄位使用直方圖近似模式 (見 AICcCalculator 的 binned 選項)；kernel_backend、em_starts: 見 AICcCalculator
+    min_parallel_work: 總點數 × 分布數低於此值時在目前程序中依序計算 (程序間傳送資料的成本高於計算本身)
+    程序池在多次呼叫之間共用 (見 get_shared_executor)；程序中的工作失敗時，該工作的欄位改在目前程序中重新計算
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    if split_families == "auto":
+        split_families = len(columns_data) < max_workers
+    if heuristic_screening:
+        split_families = False
+    task_options = (heuristic_screening, use_fit_cache, binned, kernel_backend, em_starts)
+    
+    # 欄位分組: 組數至少與程序數相同，讓每個程序都有工作
+    column_names = list(columns_data)
+    group_size = max(1, min(COLUMNS_PER_TASK, -(-len(column_names) // max_workers)))
+    column_groups = [{x: columns_data[x] for x in column_names[i:i + group_size]}
+                     for i in range(0, len(column_names), group_size)]
+    
+    work = sum(len(x) for x in columns_data.values()) * len(DISTRIBUTION_NAMES)
+    if max_workers == 1 or work < min_parallel_work:
+        for group in column_groups:
+            yield from _fit_columns_task(group, *task_options)
+        return
+    
+    futures = {}
+    try:
+        if not split_families:
+            executor, futures = _submit_tasks(max_workers, [(_fit_columns_task, (group, *task_options), group)
+                                                            for group in column_groups])
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    results = _fit_columns_serially(futures[future], task_options, e, executor)
+                yield from results
+            return
+        
+        family_options = task_options[1:]
+        executor, futures = _submit_tasks(max_workers,
+                                          [(_fit_family_task, (column_name, name, values, *family_options),
+                                            (column_name, name, values))
+                                           for column_name, values in columns_data.items()
+                                           for name in DISTRIBUTION_NAMES])
+        pending = {column_name: {} for column_name in columns_data}
+        for future in as_completed(futures):
+            try:
+                column_name, name, aicc = future.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    discard_shared_executor(executor)
+                column_name, name, aicc = _fit_family_task(*futures[future], *family_options)
+            pending[column_name][name] = aicc
+            if len(pending[column_name]) == len(DISTRIBUTION_NAMES):
+                results = pending.pop(column_name)
+                yield column_name, {x: results[x] for x in DISTRIBUTION_NAMES}
+    finally:
+        # 提早停止讀取結果時，取消尚未開始的工作 (程序池保留給下次使用)
+        for future in futures:
+            future.cancel()
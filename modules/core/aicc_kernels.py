@@ -0,0 +1,313 @@
+"""
+AICc 計算的編譯核心 (選用 Numba)
+SHASH、Johnson Su / Sb、Weibull 與混合常態的對數似然 (及梯度) 以逐點的單一迴圈計算，不產生暫存陣列
+函式名稱與參數和 aicc_calculator 中的 NumPy 版本相同，由 AICcCalculator 的 kernel_backend 選項選擇使用哪一個
+沒有安裝 numba 時 resolve_backend 一律回傳 "numpy"，這些函式不會被使用
+"""
+
+import logging
+import math
+import sys
+
+import numpy as np
+
+try:
+    import numba
+except Exception:  # 沒有安裝，或打包後 numba / llvmlite 無法載入
+    numba = None
+
+# 無法編譯的警告只送到 logging (預設不輸出，需要時由程式設定 handler)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+HAVE_NUMBA = numba is not None
+# 無法以 numba 編譯而維持 Python 版本的核心名稱 (有任何一個時不使用 numba 後端)
+_JIT_FAILURES = []
+KERNEL_BACKENDS = ("auto", "numpy", "numba")
+
+# 沒有權重時傳給核心的空陣列 (Numba 的函式不能接受 None)
+_NO_WEIGHTS = np.empty(0)
+_LOG_2 = math.log(2.0)
+_LOG_2PI = math.log(2.0 * math.pi)
+# |u| 超過此值時 sinh(u) 溢位
+_SINH_LIMIT = 700.0
+
+
+def resolve_backend(backend):
+    """把 kernel_backend 選項轉成實際使用的後端: "auto" 與 "numba" 在沒有安裝 numba (或核心無法編譯) 時都改用 "numpy\""""
+    if backend not in KERNEL_BACKENDS:
+        raise ValueError(f"未知的 kernel_backend: {backend} (可用: {', '.join(KERNEL_BACKENDS)})")
+    if backend == "numpy" or not HAVE_NUMBA or _JIT_FAILURES:
+        return "numpy"
+    return "numba"
+
+
+def _jit(function):
+    """
+    有 numba 時編譯函式 (快取到磁碟，下次啟動不必重新編譯)，否則維持原本的 Python 函式
+    打包後的執行檔 (sys.frozen) 中 numba 找不到可寫入快取的位置，因此不使用磁碟快取；
+    numba 無法處理這個函式時也維持原本的 Python 函式 (並記錄在 _JIT_FAILURES，resolve_backend 改用 "numpy")，不影響 aicc_calculator 的匯入
+    """
+    if numba is None:
+        return function
+    try:
+        return numba.njit(cache=not getattr(sys, "frozen", False), nogil=True)(function)
+    except Exception as e:
+        logger.warning("Numba 無法編譯 %s，改用 NumPy 後端: %s", function.__name__, e)
+        _JIT_FAILURES.append(function.__name__)
+        return function
+
+
+def _weights_or_empty(weights):
+    return _NO_WEIGHTS if weights is None else np.ascontiguousarray(weights, dtype=np.float64)
+
+
+@_jit
+def _shash_kernel(mu, sigma, nu, tau, x, weights):
+    """SHASH 負對數似然與梯度 (mu, sigma, nu, tau) 的單一迴圈計算"""
+    gradient = np.zeros(4)
+    if sigma <= 0 or tau <= 0:
+        return np.inf, gradient
+    weighted = weights.shape[0] > 0
+    n = 0.0
+    ll = 0.0
+    sum_dz = sum_dz_z = sum_du = sum_du_z = 0.0
+    for i in range(x.shape[0]):
+        weight = weights[i] if weighted else 1.0
+        z = (x[i] - mu) / sigma
+        u = nu + tau * z
+        if abs(u) > _SINH_LIMIT:
+            return np.inf, gradient
+        sinh_u = math.sinh(u)
+        log_cosh_u = abs(u) + math.log1p(math.exp(-2.0 * abs(u))) - _LOG_2
+        ll += weight * (-0.5 * math.log1p(z * z) + log_cosh_u - 0.5 * sinh_u * sinh_u)
+        d_u = math.tanh(u) - sinh_u * math.sqrt(1.0 + sinh_u * sinh_u)
+        d_z = -z / (1.0 + z * z) + tau * d_u
+        n += weight
+        sum_dz += weight * d_z
+        sum_dz_z += weight * d_z * z
+        sum_du += weight * d_u
+        sum_du_z += weight * d_u * z
+    ll -= n * (0.5 * _LOG_2PI + math.log(sigma) - math.log(tau))
+    if not math.isfinite(ll):
+        return np.inf, gradient
+    gradient[0] = sum_dz / sigma
+    gradient[1] = n / sigma + sum_dz_z / sigma
+    gradient[2] = -sum_du
+    gradient[3] = -n / tau - sum_du_z
+    return -ll, gradient
+
+
+def shash_neg_log_likelihood(params, x, weights=None):
+    """與 aicc_calculator.shash_neg_log_likelihood 相同 (編譯核心)"""
+    mu, sigma, nu, tau = params
+    return _shash_kernel(float(mu), float(sigma), float(nu), float(tau), x, _weights_or_empty(weights))
+
+
+@_jit
+def _johnson_su_kernel(a, log_b, loc, log_scale, x, weights):
+    """Johnson Su 負對數似然與梯度 (a, log b, loc, log scale) 的單一迴圈計算"""
+    gradient = np.zeros(4)
+    b, scale = math.exp(log_b), math.exp(log_scale)
+    weighted = weights.shape[0] > 0
+    n = 0.0
+    ll = 0.0
+    sum_w = sum_w_asinh = sum_dz = sum_dz_z = 0.0
+    for i in range(x.shape[0]):
+        weight = weights[i] if weighted else 1.0
+        z = (x[i] - loc) / scale
+        asinh_z = math.asinh(z)
+        w = a + b * asinh_z
+        ll += weight * (-0.5 * math.log1p(z * z) - 0.5 * w * w)
+        d_z = -z / (1.0 + z * z) - b * w / math.sqrt(1.0 + z * z)
+        n += weight
+        sum_w += weight * w
+        sum_w_asinh += weight * w * asinh_z
+        sum_dz += weight * d_z
+        sum_dz_z += weight * d_z * z
+    ll += n * (log_b - log_scale - 0.5 * _LOG_2PI)
+    if not math.isfinite(ll):
+        return np.inf, gradient
+    gradient[0] = sum_w
+    gradient[1] = -(n - b * sum_w_asinh)
+    gradient[2] = sum_dz / scale
+    gradient[3] = n + sum_dz_z
+    return -ll, gradient
+
+
+def johnson_su_neg_log_likelihood(params, x, weights=None):
+    """與 aicc_calculator.johnson_su_neg_log_likelihood 相同 (編譯核心)"""
+    a, log_b, loc, log_scale = params
+    return _johnson_su_kernel(float(a), float(log_b), float(loc), float(log_scale), x, _weights_or_empty(weights))
+
+
+@_jit
+def _johnson_sb_profile_kernel(u, v, x, x_min, x_max, spread, weights):
+    """
+    Johnson Sb profile 負對數似然與梯度 (u, v)
+    y = log(z / (1 - z)) 的變異數需要先知道平均值，因此是兩次迴圈 (第一次只計算平均值)，仍不產生暫存陣列
+    """
+    gradient = np.zeros(2)
+    below, above = spread * math.exp(u), spread * math.exp(v)
+    loc = x_min - below
+    scale = x_max + above - loc
+    weighted = weights.shape[0] > 0
+    n = 0.0
+    sum_y = 0.0
+    for i in range(x.shape[0]):
+        weight = weights[i] if weighted else 1.0
+        z = (x[i] - loc) / scale
+        if not 0.0 < z < 1.0:
+            return np.inf, gradient
+        n += weight
+        sum_y += weight * (math.log(z) - math.log1p(-z))
+    mean_y = sum_y / n
+
+    # d log L / dz = -y_c / (var_y z (1 - z)) - 1 / z + 1 / (1 - z)，var_y 要在迴圈結束後才知道，
+    # 因此把 sum(d_z (1 - z)) 與 sum(d_z z) 拆成 y_c / z、y_c / (1 - z) 的總和與其餘部分分別累加
+    sum_yy = sum_log = 0.0
+    sum_y_over_z = sum_y_over_1mz = rest_1mz = rest_z = 0.0
+    for i in range(x.shape[0]):
+        weight = weights[i] if weighted else 1.0
+        z = (x[i] - loc) / scale
+        log_z, log_1mz = math.log(z), math.log1p(-z)
+        y = log_z - log_1mz - mean_y
+        sum_yy += weight * y * y
+        sum_log += weight * (log_z + log_1mz)
+        sum_y_over_z += weight * y / z
+        sum_y_over_1mz += weight * y / (1.0 - z)
+        rest_1mz += weight * (1.0 - (1.0 - z) / z)
+        rest_z += weight * (z / (1.0 - z) - 1.0)
+    var_y = sum_yy / n
+    ll = -0.5 * n * (math.log(2.0 * math.pi * var_y) + 1.0) - n * math.log(scale) - sum_log
+    if not math.isfinite(ll) or not var_y > 0:
+        return np.inf, gradient
+
+    gradient[0] = -below / scale * (rest_1mz - sum_y_over_z / var_y - n)
+    gradient[1] = above / scale * (rest_z - sum_y_over_1mz / var_y + n)
+    return -ll, gradient
+
+
+def johnson_sb_profile_neg_log_likelihood(params, x, x_min, x_max, spread, weights=None):
+    """與 aicc_calculator.johnson_sb_profile_neg_log_likelihood 相同 (編譯核心)"""
+    u, v = params
+    return _johnson_sb_profile_kernel(float(u), float(v), x, float(x_min), float(x_max), float(spread),
+                                      _weights_or_empty(weights))
+
+
+@_jit
+def _weibull_profile_kernel(shifted, c, weights):
+    """Weibull profile 方程式需要的 sum(w)、sum(w * s)、sum(w * s^2)，其中 w = 權重 * exp(c * s)"""
+    weighted = weights.shape[0] > 0
+    w_sum = ws_sum = wss_sum = 0.0
+    for i in range(shifted.shape[0]):
+        w = math.exp(c * shifted[i])
+        if weighted:
+            w *= weights[i]
+        w_sum += w
+        ws_sum += w * shifted[i]
+        wss_sum += w * shifted[i] * shifted[i]
+    return w_sum, ws_sum, wss_sum
+
+
+def weibull_profile_sums(shifted, c, weights=None):
+    """與 aicc_calculator.weibull_profile_sums 相同 (編譯核心)"""
+    return _weibull_profile_kernel(shifted, float(c), _weights_or_empty(weights))
+
+
+@_jit
+def _mixture_pass(x, weights, w, mu, sigma, log_prob_floor):
+    """
+    在目前參數下對所有點做一次 E-step: 回傳 (是否數值不穩定, 對數似然, N, sum(gamma x), sum(gamma (x - mu)^2))
+    各點的後驗概率直接累加成 M-step 需要的統計量，不保存 (組件, 點) 大小的陣列
+    """
+    k = w.shape[0]
+    weighted = weights.shape[0] > 0
+    log_const = np.empty(k)
+    for j in range(k):
+        log_const[j] = math.log(w[j]) - math.log(sigma[j]) - 0.5 * _LOG_2PI
+    log_dens = np.empty(k)
+    e = np.empty(k)
+    N = np.zeros(k)
+    S1 = np.zeros(k)
+    S2 = np.zeros(k)
+    ll = 0.0
+    unstable = False
+    for i in range(x.shape[0]):
+        weight = weights[i] if weighted else 1.0
+        log_max = -np.inf
+        for j in range(k):
+            d = (x[i] - mu[j]) / sigma[j]
+            log_dens[j] = -0.5 * d * d + log_const[j]
+            log_max = max(log_max, log_dens[j])
+        e_sum = 0.0
+        for j in range(k):
+            e[j] = math.exp(log_dens[j] - log_max)
+            e_sum += e[j]
+        log_mix = log_max + math.log(e_sum)
+        if log_mix <= log_prob_floor:
+            unstable = True
+        ll += weight * log_mix
+        for j in range(k):
+            gamma = weight * e[j] / e_sum
+            d = x[i] - mu[j]
+            N[j] += gamma
+            S1[j] += gamma * x[i]
+            S2[j] += gamma * d * d
+    return unstable, ll, N, S1, S2
+
+
+@_jit
+def _mixture_em_kernel(x, weights, w, mu, sigma, n, variance_floor, max_iter, tol):
+    """
+    單一問題的 EM，停止條件與 aicc_calculator._em_batch 相同
+    回傳 (對數似然, 最後一次迭代的索引)，w / mu / sigma 直接更新；對數似然為 nan 表示第一次就失敗
+    """
+    log_prob_floor = math.log(1e-10)
+    unstable, _, N, S1, S2 = _mixture_pass(x, weights, w, mu, sigma, log_prob_floor)
+    ll = np.nan
+    if unstable:
+        return ll, 0
+    prev_ll = -np.inf
+    last_iteration = -1
+    for iteration in range(max_iter):
+        last_iteration = iteration
+        if np.any(N < 1):
+            break
+        for j in range(w.shape[0]):
+            new_mu = S1[j] / N[j]
+            # 以舊的均值累加的平方和換算成新均值的變異數
+            variance = S2[j] / N[j] - (new_mu - mu[j])**2
+            w[j] = N[j] / n
+            mu[j] = new_mu
+            sigma[j] = math.sqrt(max(variance, variance_floor))
+        unstable, new_ll, N, S1, S2 = _mixture_pass(x, weights, w, mu, sigma, log_prob_floor)
+        if unstable:
+            ll = -np.inf
+            break
+        ll = new_ll
+        if abs(ll - prev_ll) < tol:
+            break
+        prev_ll = ll
+    return ll, last_iteration
+
+
+def mixture_em(data, strategy, max_iter, tol, weights=None):
+    """
+    以編譯核心對單一 (數據集, 初始值) 執行 EM，回傳格式與 aicc_calculator._em_batch 的每個結果相同 (失敗時為 None)
+    strategy: 初始的 (weights, means, stds)；weights: 數據為直方圖時各組的點數
+    """
+    x = np.ascontiguousarray(data, dtype=np.float64)
+    point_weights = _weights_or_empty(weights)
+    w, mu, sigma = (np.array(values, dtype=np.float64) for values in strategy)
+    if weights is None:
+        n, std = float(len(x)), np.std(x)
+    else:
+        n = float(np.sum(point_weights))
+        mean = np.dot(point_weights, x) / n
+        std = np.sqrt(np.dot(point_weights, (x - mean)**2) / n)
+    ll, last_iteration = _mixture_em_kernel(x, point_weights, w, mu, sigma, n, std / 100, max_iter, tol)
+    if not np.isfinite(ll):
+        return None
+    return {'weights': w, 'means': mu, 'stds': sigma, 'converged': last_iteration < max_iter - 1,
+            'iterations': last_iteration + 1, 'll': ll}
@@ -5,14 +5,18 @@ import tkinter as tk
 from tkinter import Tk, filedialog, messagebox, ttk, Listbox, MULTIPLE, Scrollbar
 import pandas as pd
 import numpy as np
+import queue
 import re
 import tempfile
+import threading
 from modules.utils.path_helper import resource_path
 from modules.core.jsl_parser import extract_process_variables, save_jsl_with_vars
 from modules.utils.constants import (
     FILE_TYPE_JMP, FILE_TYPE_ALL, FILE_EXT_JMP, FILE_EXT_ALL,
     MSG_TITLE_SUCCESS, MSG_TITLE_ERROR, MSG_TITLE_NOTICE, MSG_TITLE_INFO,
-    MSG_NO_SCRIPT_TEMPLATE
+    MSG_NO_SCRIPT_TEMPLATE, AICC_MAX_WORKERS, AICC_SPLIT_FAMILIES, AICC_HEURISTIC_SCREENING,
+    AICC_FIT_CACHE, AICC_BINNED, AICC_KERNEL_BACKEND, AICC_EM_STARTS, AICC_BOOTSTRAP_REPLICATES,
+    AICC_INCREMENTAL, JMP_CACHE_ENABLED
 )
 
 # 全域變數來追蹤當前打開的檔案路徑（Beta功能用）
@@ -418,6 +422,7 @@ def continue_best_fit_beta_analysis():
             filetypes=[
                 ("CSV 檔案", "*.csv"),
                 ("Excel 檔案", "*.xlsx *.xls"),
+                ("JMP 檔案", "*.jmp"),
                 ("所有檔案", "*.*")
             ]
         )
@@ -441,18 +446,30 @@ def process_best_fit_beta_file(file_path):
                 data = pd.read_excel(file_path)
             elif file_path.endswith('.csv'):
                 data = pd.read_csv(file_path)
+            elif file_path.endswith('.jmp'):
+                # 先只讀取欄位資訊，選好欄位後才讀取那些欄位的資料
+                data = None
+                jmp_schema = read_jmp_numeric_schema(file_path)
+                if jmp_schema is None:
+                    data = load_jmp_file(file_path, dtype_filter="numeric")
+                    if data is None:
+                        return
             else:
-                messagebox.showerror("錯誤", "不支援的檔案格式\n支援格式: Excel (.xlsx, .xls), CSV (.csv)")
+                messagebox.showerror("錯誤", "不支援的檔案格式\n支援格式: Excel (.xlsx, .xls), CSV (.csv), JMP 11 (.jmp)")
                 return
         except Exception as e:
             messagebox.showerror("錯誤", f"載入檔案失敗: {str(e)}")
             return
         
         # 步驟3: 獲取數值欄位
-        numeric_columns = []
-        for col in data.columns:
-            if pd.api.types.is_numeric_dtype(data[col]):
-                numeric_columns.append(col)
+        if data is not None:
+            data_shape = data.shape
+            numeric_columns = []
+            for col in data.columns:
+                if pd.api.types.is_numeric_dtype(data[col]):
+                    numeric_columns.append(col)
+        else:
+            numeric_columns, data_shape = jmp_schema
         
         if not numeric_columns:
             messagebox.showerror("錯誤", "檔案中沒有找到數值欄位")
@@ -473,7 +490,7 @@ def process_best_fit_beta_file(file_path):
         # 檔案資訊
         info_label = tk.Label(selection_window, 
                              text=f"檔案: {os.path.basename(file_path)}\n"
-                                  f"資料形狀: {data.shape}\n"
+                                  f"資料形狀: {data_shape}\n"
                                   f"可用數值欄位: {len(numeric_columns)} 個",
                              font=("Arial", 10))
         info_label.pack(pady=5)
@@ -561,8 +578,13 @@ def process_best_fit_beta_file(file_path):
             selected_columns = [numeric_columns[i] for i in selected_indices]
             selection_window.destroy()
             
+            # JMP 檔案只讀取選取的欄位
+            selected_data = data if data is not None else load_jmp_file(file_path, columns=selected_columns)
+            if selected_data is None:
+                return
+            
             # 開始計算
-            calculate_multiple_aicc(data, selected_columns, file_path)
+            calculate_multiple_aicc(selected_data, selected_columns, file_path)
         
         def select_all():
             listbox.select_set(0, tk.END)
@@ -593,7 +615,8 @@ def calculate_multiple_aicc(data, selected_columns, file_path):
     """計算多個欄位的 AICc 值並顯示結果"""
     try:
         # 導入 AICc 計算器
-        from modules.core.aicc_calculator import AICcCalculator
+        from modules.core.aicc_calculator import AICcCalculator, calculate_columns_parallel, incremental_state_path
+        from modules.core.fit_cache import get_default_fit_cache
         
         # 創建結果視窗
         result_window = tk.Toplevel()
@@ -630,30 +653,38 @@ def calculate_multiple_aicc(data, selected_columns, file_path):
         progress_label = tk.Label(result_window, text="正在計算...", font=("Arial", 10))
         progress_label.pack(pady=5)
         
-        # 計算器初始化
-        calculator = AICcCalculator()
-        
         result_text.insert(tk.END, "="*80 + "\n")
         result_text.insert(tk.END, "AICc 分布配適計算器 - 多欄位分析結果\n")
         result_text.insert(tk.END, "="*80 + "\n\n")
         result_text.insert(tk.END, f"檔案: {os.path.basename(file_path)}\n")
         result_text.insert(tk.END, f"分析時間: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        if AICC_HEURISTIC_SCREENING:
+            result_text.insert(tk.END, "⚠️ 已啟用啟發式篩選: 看起來明顯較差的分布未完整計算 (不會列出)，"
+                                       "結果可能漏掉真正的最佳分布\n\n")
+        if AICC_INCREMENTAL:
+            result_text.insert(tk.END, "ℹ️ 已啟用增量模式: 只在上次分析的數據後面附加新列的欄位從上次的結果接續計算 (逐欄依序計算)\n\n")
         
         all_results = {}
         
-        # 對每個選中的欄位計算 AICc
-        for i, column_name in enumerate(selected_columns):
-            progress_label.config(text=f"正在計算 {column_name} ({i+1}/{len(selected_columns)})...")
-            result_window.update()
-            
+        # 提取各欄位數據，數據點太少的欄位直接跳過
+        column_values = {}
+        for column_name in selected_columns:
             try:
-                # 提取欄位數據
                 column_data = data[column_name].dropna()
                 
                 if len(column_data) < 3:
                     result_text.insert(tk.END, f"[{column_name}] 數據點太少，跳過分析\n\n")
                     continue
                 
+                column_values[column_name] = column_data.to_numpy(dtype=float)
+            except Exception as e:
+                result_text.insert(tk.END, f"❌ 計算 {column_name} 時發生錯誤: {str(e)}\n\n")
+        
+        def show_column(column_name, results):
+            """顯示一個欄位的計算結果"""
+            try:
+                column_data = pd.Series(column_values[column_name])
+                
                 result_text.insert(tk.END, f"【欄位: {column_name}】\n")
                 result_text.insert(tk.END, f"數據點數量: {len(column_data)}\n")
                 result_text.insert(tk.END, f"平均值: {column_data.mean():.6f}\n")
@@ -661,9 +692,6 @@ def calculate_multiple_aicc(data, selected_columns, file_path):
                 result_text.insert(tk.END, f"範圍: {column_data.min():.6f} 到 {column_data.max():.6f}\n")
                 result_text.insert(tk.END, "-" * 50 + "\n")
                 
-                # 計算所有分布的 AICc
-                results = calculator.calculate_all_distributions(column_data, column_name)
-                
                 # 排序結果
                 sorted_results = sorted([(name, aicc) for name, aicc in results.items() 
                                        if np.isfinite(aicc)], key=lambda x: x[1])
@@ -685,33 +713,159 @@ def calculate_multiple_aicc(data, selected_columns, file_path):
                     result_text.insert(tk.END, f"❌ 無法計算任何分布的 AICc 值\n")
                 
                 result_text.insert(tk.END, "\n" + "="*50 + "\n\n")
-                result_text.update()
-                
+            
             except Exception as e:
                 result_text.insert(tk.END, f"❌ 計算 {column_name} 時發生錯誤: {str(e)}\n\n")
         
-        # 顯示總結
-        if all_results:
-            result_text.insert(tk.END, "🏆 各欄位最佳分布總結:\n")
-            result_text.insert(tk.END, "="*60 + "\n")
-            
-            for column_name, sorted_results in all_results.items():
-                if sorted_results:
-                    best_name, best_aicc = sorted_results[0]
-                    result_text.insert(tk.END, f"{column_name:25s} → {best_name:15s} (AICc = {best_aicc:8.3f})\n")
-            
-            result_text.insert(tk.END, "="*60 + "\n")
+        # 各欄位在背景執行緒中以多個程序平行計算，結果放入佇列，由主執行緒以 after() 定時取出顯示，視窗不會凍結
+        # 平行計算中斷時 (例如無法建立程序池)，尚未完成的欄位改在背景執行緒中依序計算，已完成的結果保留
+        # 取消或關閉視窗時設定 cancel_event，背景執行緒在目前的欄位完成後停止，並取消尚未開始的工作
+        messages = queue.Queue()
+        cancel_event = threading.Event()
+        parallel_options = dict(split_families=AICC_SPLIT_FAMILIES, heuristic_screening=AICC_HEURISTIC_SCREENING,
+                                use_fit_cache=AICC_FIT_CACHE, binned=AICC_BINNED,
+                                kernel_backend=AICC_KERNEL_BACKEND, em_starts=AICC_EM_STARTS)
+        
+        def run_calculation():
+            finished = set()
+            columns = calculate_columns_parallel(column_values, max_workers=AICC_MAX_WORKERS, **parallel_options)
+            try:
+                for column_name, results in columns:
+                    finished.add(column_name)
+                    messages.put(("result", column_name, (len(finished), results)))
+                    if cancel_event.is_set():
+                        break
+            except Exception as e:
+                remaining = {x: values for x, values in column_values.items() if x not in finished}
+                messages.put(("fallback", len(remaining), str(e)))
+                for column_name, values in remaining.items():
+                    if cancel_event.is_set():
+                        break
+                    messages.put(("progress", column_name, len(finished) + 1))
+                    try:
+                        _, results = next(calculate_columns_parallel({column_name: values}, max_workers=1,
+                                                                     **parallel_options))
+                    except Exception as column_error:
+                        finished.add(column_name)
+                        messages.put(("error", column_name, str(column_error)))
+                        continue
+                    finished.add(column_name)
+                    messages.put(("result", column_name, (len(finished), results)))
+            finally:
+                columns.close()  # 提早結束時取消尚未開始的工作
+                messages.put(("done", None, None))
+        
+        def run_incremental():
+            """增量模式: 載入這個資料檔案上次的狀態後逐欄計算，結束 (或取消) 時儲存狀態供下次使用"""
+            calculator = AICcCalculator(fit_cache=get_default_fit_cache() if AICC_FIT_CACHE else None,
+                                        binned=AICC_BINNED, kernel_backend=AICC_KERNEL_BACKEND, em_starts=AICC_EM_STARTS)
+            state_path = incremental_state_path(file_path)
+            calculator.load_incremental_state(state_path)
+            try:
+                for i, (column_name, values) in enumerate(column_values.items()):
+                    if cancel_event.is_set():
+                        break
+                    messages.put(("progress", column_name, i + 1))
+                    try:
+                        results = calculator.calculate_incremental_distributions(values, column_name)
+                    except Exception as e:
+                        messages.put(("error", column_name, str(e)))
+                        continue
+                    messages.put(("result", column_name, (i + 1, results)))
+                os.makedirs(os.path.dirname(state_path), exist_ok=True)
+                calculator.save_incremental_state(state_path)
+            except OSError as e:
+                messages.put(("notice", None, f"⚠️ 增量模式的狀態儲存失敗，下次將完整計算: {str(e)}"))
+            finally:
+                messages.put(("done", None, None))
+        
+        def poll_messages():
+            if not result_window.winfo_exists():
+                return
+            while True:
+                try:
+                    kind, column_name, value = messages.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "progress":
+                    progress_label.config(text=f"正在計算 {column_name} ({value}/{len(column_values)})...")
+                elif kind == "fallback":
+                    result_text.insert(tk.END, f"⚠️ 平行計算中斷 ({value})，其餘 {column_name} 個欄位改為依序計算\n\n")
+                elif kind == "error":
+                    result_text.insert(tk.END, f"❌ 計算 {column_name} 時發生錯誤: {value}\n\n")
+                elif kind == "notice":
+                    result_text.insert(tk.END, f"{value}\n\n")
+                elif kind == "result":
+                    count, results = value
+                    if not cancel_event.is_set():
+                        progress_label.config(text=f"已完成 {column_name} ({count}/{len(column_values)})...")
+                    show_column(column_name, results)
+                else:
+                    finish_calculation()
+                    return
+            result_window.after(100, poll_messages)
+        
+        def cancel():
+            cancel_event.set()
+            progress_label.config(text="正在取消 (等待目前的欄位完成)...")
+            cancel_btn.config(state=tk.DISABLED)
         
-        progress_label.config(text="計算完成！")
+        def close_window():
+            cancel_event.set()
+            result_window.destroy()
         
-        # 收集最佳分布資訊用於JSL生成
+        # 收集最佳分布資訊用於JSL生成 (計算結束後填入)
         best_distributions = {}
-        if all_results:
+        
+        def finish_calculation():
+            """計算結束 (完成或取消) 後顯示總結並加入結果按鈕"""
+            nonlocal all_results
+            # 總結依照選取欄位的順序
+            all_results = {x: all_results[x] for x in selected_columns if x in all_results}
+            
+            # 顯示總結
+            if all_results:
+                result_text.insert(tk.END, "🏆 各欄位最佳分布總結:\n")
+                result_text.insert(tk.END, "="*60 + "\n")
+            
+                for column_name, sorted_results in all_results.items():
+                    if sorted_results:
+                        best_name, best_aicc = sorted_results[0]
+                        result_text.insert(tk.END, f"{column_name:25s} → {best_name:15s} (AICc = {best_aicc:8.3f})\n")
+            
+                result_text.insert(tk.END, "="*60 + "\n")
+            
+            progress_label.config(text="已取消 (只顯示已完成的欄位)" if cancel_event.is_set() else "計算完成！")
+            
             for column_name, sorted_results in all_results.items():
                 if sorted_results:
                     best_name, _ = sorted_results[0]
                     best_distributions[column_name] = best_name
-        
+            
+            cancel_btn.destroy()
+            save_btn = tk.Button(button_frame, text="儲存結果", command=save_results,
+                                font=("Arial", 12))
+            save_btn.pack(side=tk.LEFT, padx=10)
+            
+            # 只有在有結果時才顯示生成JSL按鈕
+            if best_distributions:
+                generate_jsl_btn = tk.Button(button_frame, text="生成JSL檔案", 
+                                           command=generate_jsl,
+                                           font=("Arial", 12, "bold"))
+                generate_jsl_btn.pack(side=tk.LEFT, padx=10)
+            
+            # 排名穩定性 (bootstrap)，AICC_BOOTSTRAP_REPLICATES 為 0 時不顯示
+            if best_distributions and AICC_BOOTSTRAP_REPLICATES > 0:
+                bootstrap_btn = tk.Button(button_frame, text="排名穩定性",
+                                          command=lambda: show_bootstrap_stability(
+                                              {x: column_values[x] for x in best_distributions}, file_path),
+                                          font=("Arial", 12))
+                bootstrap_btn.pack(side=tk.LEFT, padx=10)
+            
+            close_btn = tk.Button(button_frame, text="關閉", command=result_window.destroy,
+                                 font=("Arial", 12))
+            close_btn.pack(side=tk.LEFT, padx=10)
+            
         # 儲存按鈕
         def save_results():
             try:
@@ -753,30 +907,131 @@ def calculate_multiple_aicc(data, selected_columns, file_path):
             except Exception as e:
                 messagebox.showerror("錯誤", f"生成JSL檔案失敗: {str(e)}")
         
-        # 按鈕框架
+        # 按鈕框架 (計算中只有取消按鈕，結束後換成結果按鈕)
         button_frame = tk.Frame(result_window)
         button_frame.pack(pady=10)
         
-        save_btn = tk.Button(button_frame, text="儲存結果", command=save_results,
-                            font=("Arial", 12))
-        save_btn.pack(side=tk.LEFT, padx=10)
-        
-        # 只有在有結果時才顯示生成JSL按鈕
-        if best_distributions:
-            generate_jsl_btn = tk.Button(button_frame, text="生成JSL檔案", 
-                                       command=generate_jsl,
-                                       font=("Arial", 12, "bold"))
-            generate_jsl_btn.pack(side=tk.LEFT, padx=10)
+        cancel_btn = tk.Button(button_frame, text="取消", command=cancel, font=("Arial", 12))
+        cancel_btn.pack(side=tk.LEFT, padx=10)
+        result_window.protocol("WM_DELETE_WINDOW", close_window)
         
-        close_btn = tk.Button(button_frame, text="關閉", command=result_window.destroy,
-                             font=("Arial", 12))
-        close_btn.pack(side=tk.LEFT, padx=10)
+        progress_label.config(text=f"正在計算 {len(column_values)} 個欄位...")
+        threading.Thread(target=run_incremental if AICC_INCREMENTAL else run_calculation, daemon=True).start()
+        result_window.after(100, poll_messages)
         
     except Exception as e:
         messagebox.showerror("錯誤", f"計算過程發生錯誤: {str(e)}")
 
-def load_jmp_file(file_path):
-    """嘗試讀取JMP檔案，使用多種方法"""
+def show_bootstrap_stability(column_values, file_path):
+    """以 bootstrap 重抽樣檢查各欄位最佳分布排名的穩定性，顯示各分布的勝出比例與AICc的95%區間"""
+    try:
+        from modules.core.aicc_calculator import AICcCalculator
+        
+        stability_window = tk.Toplevel()
+        stability_window.title("排名穩定性 (Bootstrap)")
+        stability_window.geometry("900x600")
+        
+        title_label = tk.Label(stability_window, text="Best Fit(beta) - 排名穩定性 (Bootstrap)",
+                               font=("Arial", 16, "bold"))
+        title_label.pack(pady=10)
+        
+        result_frame = tk.Frame(stability_window)
+        result_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        result_text = tk.Text(result_frame, wrap=tk.WORD, font=("Consolas", 10))
+        result_scrollbar = tk.Scrollbar(result_frame)
+        result_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        result_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        result_text.config(yscrollcommand=result_scrollbar.set)
+        result_scrollbar.config(command=result_text.yview)
+        
+        progress_label = tk.Label(stability_window, text="正在計算...", font=("Arial", 10))
+        progress_label.pack(pady=5)
+        
+        result_text.insert(tk.END, f"檔案: {os.path.basename(file_path)}\n")
+        result_text.insert(tk.END, f"每個欄位最多重抽樣 {AICC_BOOTSTRAP_REPLICATES} 次 (最佳分布的勝出比例穩定後提早停止)\n\n")
+        
+        def show_summary(column_name, summary):
+            """顯示一個欄位的 bootstrap 結果"""
+            result_text.insert(tk.END, f"【欄位: {column_name}】 重抽樣 {summary['n_boot']} 次" +
+                               (" (已提早停止)" if summary["stopped_early"] else "") +
+                               (" (已取消，只使用已完成的重抽樣)" if summary["cancelled"] else "") + "\n")
+            result_text.insert(tk.END, "分布" + " " * 19 + "勝出比例   " + f"{'AICc':>10s}   AICc 95% 區間\n")
+            result_text.insert(tk.END, "-" * 70 + "\n")
+            ranked = sorted(summary["aicc"], key=lambda x: (-summary["win_frequency"][x], summary["aicc"][x]))
+            for dist_name in ranked:
+                interval = summary["aicc_interval"][dist_name]
+                if interval is None:
+                    continue
+                result_text.insert(tk.END, f"{dist_name:20s} {summary['win_frequency'][dist_name]:>8.1%}   "
+                                           f"{summary['aicc'][dist_name]:>10.3f}   "
+                                           f"[{interval[0]:.3f}, {interval[1]:.3f}]\n")
+            result_text.insert(tk.END, "\n" + "=" * 50 + "\n\n")
+        
+        # 重抽樣在背景執行緒中計算 (每個欄位最多數百次配適)，結果放入佇列，由主執行緒以 after() 定時取出顯示，視窗不會凍結
+        # 取消或關閉視窗時設定 cancel_event，背景執行緒在下一組重抽樣完成後停止
+        messages = queue.Queue()
+        cancel_event = threading.Event()
+        
+        def run_bootstrap():
+            calculator = AICcCalculator(binned=AICC_BINNED, kernel_backend=AICC_KERNEL_BACKEND,
+                                        em_starts=AICC_EM_STARTS)
+            for i, (column_name, values) in enumerate(column_values.items()):
+                if cancel_event.is_set():
+                    break
+                messages.put(("progress", column_name, i))
+                try:
+                    summary = calculator.bootstrap_distributions(values, column_name, n_boot=AICC_BOOTSTRAP_REPLICATES,
+                                                                 max_workers=AICC_MAX_WORKERS,
+                                                                 should_stop=cancel_event.is_set)
+                except Exception as e:
+                    messages.put(("error", column_name, str(e)))
+                    continue
+                messages.put(("summary", column_name, summary))
+            messages.put(("done", None, None))
+        
+        def finish(text):
+            progress_label.config(text=text)
+            cancel_btn.config(text="關閉", command=stability_window.destroy, state=tk.NORMAL)
+        
+        def poll_messages():
+            if not stability_window.winfo_exists():
+                return
+            while True:
+                try:
+                    kind, column_name, value = messages.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "progress":
+                    progress_label.config(text=f"正在計算 {column_name} ({value+1}/{len(column_values)})...")
+                elif kind == "error":
+                    result_text.insert(tk.END, f"❌ 計算 {column_name} 時發生錯誤: {value}\n\n")
+                elif kind == "summary":
+                    show_summary(column_name, value)
+                else:
+                    finish("已取消" if cancel_event.is_set() else "計算完成！")
+                    return
+            stability_window.after(100, poll_messages)
+        
+        def cancel():
+            cancel_event.set()
+            progress_label.config(text="正在取消 (等待目前這組重抽樣完成)...")
+            cancel_btn.config(state=tk.DISABLED)
+        
+        def close_window():
+            cancel_event.set()
+            stability_window.destroy()
+        
+        cancel_btn = tk.Button(stability_window, text="取消", command=cancel, font=("Arial", 12))
+        cancel_btn.pack(pady=10)
+        stability_window.protocol("WM_DELETE_WINDOW", close_window)
+        threading.Thread(target=run_bootstrap, daemon=True).start()
+        stability_window.after(100, poll_messages)
+        
+    except Exception as e:
+        messagebox.showerror("錯誤", f"排名穩定性計算失敗: {str(e)}")
+
+def load_jmp_file(file_path, columns=None, dtype_filter=None):
+    """嘗試讀取JMP檔案，使用多種方法 (columns / dtype_filter: 只讀取指定欄位，例如 dtype_filter="numeric")"""
     
     # 方法1: 嘗試使用JMPReader庫
     try:
@@ -785,11 +1040,12 @@ def load_jmp_file(file_path):
         
         # 嘗試導入JMPReader
         try:
-            from modules.utils import jmptools
+            from modules.utils import jmp_cache, jmptools
             print(f"使用JMPReader讀取JMP檔案: {file_path}")
             
-            # 使用JMPReader讀取 (返回: status_code, error_message, dataframe)
-            status, message, df = jmptools.readjmp(file_path)
+            # 使用JMPReader讀取 (返回: status_code, error_message, dataframe)；啟用快取時已解碼過的欄位直接從磁碟載入
+            read = jmp_cache.readjmp_cached if JMP_CACHE_ENABLED else jmptools.readjmp
+            status, message, df = read(file_path, columns=columns, dtype_filter=dtype_filter)
             
             if status == 0 and df is not None:
                 print("✅ JMP檔案讀取成功")
@@ -849,6 +1105,22 @@ def load_jmp_file(file_path):
     
     return None
 
+def read_jmp_numeric_schema(file_path):
+    """只讀取JMP檔案的欄位資訊 (不讀取資料)，回傳 (數值欄位列表, 資料形狀)，失敗時回傳 None"""
+    try:
+        from modules.utils import jmptools
+        status, message, schema = jmptools.read_schema(file_path)
+    except Exception as e:
+        print(f"JMP檔案欄位資訊讀取失敗: {e}")
+        return None
+    
+    if status != 0:
+        print(f"❌ JMP檔案欄位資訊讀取失敗: {message}")
+        return None
+    
+    numeric_columns = [column["name"] for column in schema["columns"] if column["is_numeric"]]
+    return numeric_columns, (schema["n_rows"], len(schema["columns"]))
+
 def convert_distribution_to_jsl(dist_name):
     """將分布名稱轉換為JSL格式"""
     conversion_map = {
@@ -1106,7 +1378,16 @@ def open_google_drive_file():
                     elif downloaded_path.endswith('.csv'):
                         data = pd.read_csv(downloaded_path)
                     elif downloaded_path.endswith('.jmp'):
-                        data = load_jmp_file(downloaded_path)
+                        # 先只讀取欄位資訊，選好欄位後才讀取資料
+                        jmp_schema = read_jmp_numeric_schema(downloaded_path)
+                        if jmp_schema is not None:
+                            numeric_columns, data_shape = jmp_schema
+                            if not numeric_columns:
+                                messagebox.showerror("錯誤", "檔案中沒有找到數值欄位")
+                                return
+                            create_column_selection_window(None, numeric_columns, downloaded_path, data_shape)
+                            return
+                        data = load_jmp_file(downloaded_path, dtype_filter="numeric")
                         if data is None:
                             return
                     else:
@@ -1159,8 +1440,8 @@ def open_google_drive_file():
     except Exception as e:
         messagebox.showerror("錯誤", f"開啟 Google Drive 檔案對話框失敗: {str(e)}")
 
-def create_column_selection_window(data, numeric_columns, file_path):
-    """創建欄位選擇視窗（從 open_best_fit_beta 分離出來）"""
+def create_column_selection_window(data, numeric_columns, file_path, data_shape=None):
+    """創建欄位選擇視窗（從 open_best_fit_beta 分離出來）；data 為 None 時在選好欄位後才讀取 JMP 檔案"""
     # 創建欄位選擇視窗
     selection_window = tk.Toplevel()
     selection_window.title("選擇要分析的欄位")
@@ -1176,7 +1457,7 @@ def create_column_selection_window(data, numeric_columns, file_path):
     # 檔案資訊
     info_label = tk.Label(selection_window, 
                          text=f"檔案: {os.path.basename(file_path)}\n"
-                              f"資料形狀: {data.shape}\n"
+                              f"資料形狀: {data.shape if data is not None else data_shape}\n"
                               f"可用數值欄位: {len(numeric_columns)} 個",
                          font=("Arial", 10))
     info_label.pack(pady=5)
@@ -1217,8 +1498,13 @@ def create_column_selection_window(data, numeric_columns, file_path):
         selected_columns = [numeric_columns[i] for i in selected_indices]
         selection_window.destroy()
         
+        # JMP 檔案只讀取選取的欄位
+        selected_data = data if data is not None else load_jmp_file(file_path, columns=selected_columns)
+        if selected_data is None:
+            return
+        
         # 開始計算
-        calculate_multiple_aicc(data, selected_columns, file_path)
+        calculate_multiple_aicc(selected_data, selected_columns, file_path)
     
     def select_all():
         listbox.select_set(0, tk.END)
@@ -0,0 +1,175 @@
+"""
+分布配適結果快取模組
+以「清理後數據的雜湊 + 計算器版本 + 分布 + 欄位名稱 (只有結果與欄位名稱有關的分布) + 選項」為鍵，記住每個欄位每個分布的配適結果 (params, AICc)
+記憶體中使用 LRU 快取，可另外指定磁碟資料夾 (每個結果一個 JSON 檔)，讓重複分析未變更的欄位時直接取得結果
+"""
+
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+# 寫入失敗的警告只送到 logging (預設不輸出，需要時由程式設定 handler)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+DEFAULT_FIT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".data_analysis_tools", "fit_cache")
+DEFAULT_MEMORY_ENTRIES = 4096
+DEFAULT_DISK_ENTRIES = 100000
+
+
+def hash_array(values):
+    """計算數值陣列的快速內容雜湊 (blake2b)"""
+    values = np.ascontiguousarray(values, dtype=float)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(values.shape).encode())
+    digest.update(memoryview(values).cast("B"))
+    return digest.hexdigest()
+
+
+def _to_json_value(value):
+    """把 numpy 數值轉成 JSON 可儲存的型別 (inf / nan 以字串表示)"""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return {k: _to_json_value(v) for k, v in value.items()}
+    value = float(value)
+    return value if np.isfinite(value) else repr(value)
+
+
+def _from_json_value(value):
+    """_to_json_value 的反向轉換"""
+    if isinstance(value, dict):
+        return {k: _from_json_value(v) for k, v in value.items()}
+    if isinstance(value, str):
+        return float(value)
+    return value
+
+
+class FitCache:
+    """配適結果快取 (記憶體 LRU + 選用的磁碟快取)"""
+
+    def __init__(self, max_entries=DEFAULT_MEMORY_ENTRIES, disk_dir=None, max_disk_entries=DEFAULT_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        # 磁碟快取的檔案數只在建立時列出一次資料夾，之後寫入新檔時累加，超過上限才重新列出並刪除舊檔
+        self._disk_count = len(self._disk_files()) if disk_dir else 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(data_hash, version, distribution, column_name="", options=()):
+        """由數據雜湊、計算器版本、分布名稱、欄位名稱與選項組成快取鍵"""
+        key_text = json.dumps([data_hash, str(version), distribution, column_name, list(options)])
+        return hashlib.blake2b(key_text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key):
+        """取得快取結果 (params, aicc)，沒有時回傳 None"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        result = self._read_disk(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._remember(key, result)
+        return result
+
+    def contains(self, key):
+        """是否有此鍵的快取結果 (不影響 LRU 順序與統計)"""
+        return key in self._entries or bool(self.disk_dir and os.path.exists(self._disk_path(key)))
+
+    def put(self, key, result):
+        """儲存配適結果 (params, aicc)"""
+        self._remember(key, result)
+        self._write_disk(key, result)
+
+    def clear(self):
+        """清除記憶體與磁碟快取"""
+        self._entries.clear()
+        if self.disk_dir:
+            for file_name in self._disk_files():
+                os.remove(os.path.join(self.disk_dir, file_name))
+            self._disk_count = 0
+
+    def _remember(self, key, result):
+        """放入記憶體 LRU，超過上限時移除最久未使用的結果"""
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key + ".json")
+
+    def _disk_files(self):
+        """磁碟快取資料夾中的結果檔名 (資料夾不存在時為空)"""
+        try:
+            return [x for x in os.listdir(self.disk_dir) if x.endswith(".json")]
+        except OSError:
+            return []
+
+    def _read_disk(self, key):
+        """從磁碟讀取結果，不存在或損毀時回傳 None"""
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(self._disk_path(key))  # 以修改時間記錄最近使用
+        except (OSError, ValueError):
+            return None
+        return _from_json_value(entry["params"]), _from_json_value(entry["aicc"])
+
+    def _write_disk(self, key, result):
+        """寫入磁碟 (先寫暫存檔再改名)，寫入失敗時只保留記憶體快取"""
+        if not self.disk_dir:
+            return
+        params, aicc = result
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            is_new = not os.path.exists(self._disk_path(key))
+            temp_path = self._disk_path(key) + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"params": _to_json_value(params), "aicc": _to_json_value(aicc)}, f)
+            os.replace(temp_path, self._disk_path(key))
+            self._disk_count += is_new
+            if self._disk_count > self.max_disk_entries:
+                self._evict_disk()
+        except OSError as e:
+            logger.warning("配適結果快取寫入失敗: %s", e)
+
+    def _evict_disk(self):
+        """
+        磁碟快取超過上限時，一次刪除最久未使用的一批檔案 (降到上限的 90%)
+        重新列出資料夾以更正計數 (其他程序也可能寫入同一個資料夾)
+        """
+        file_names = self._disk_files()
+        self._disk_count = len(file_names)
+        if self._disk_count <= self.max_disk_entries:
+            return
+        paths = sorted((os.path.join(self.disk_dir, x) for x in file_names), key=os.path.getmtime)
+        for path in paths[:len(paths) - int(self.max_disk_entries * 0.9)]:
+            try:
+                os.remove(path)
+                self._disk_count -= 1
+            except OSError:
+                pass
+
+
+_default_fit_cache = None
+
+
+def get_default_fit_cache(disk_dir=DEFAULT_FIT_CACHE_DIR):
+    """取得目前程序共用的配適結果快取 (第一次呼叫時建立)"""
+    global _default_fit_cache
+    if _default_fit_cache is None:
+        _default_fit_cache = FitCache(disk_dir=disk_dir)
+    return _default_fit_cache
@@ -4,6 +4,7 @@ import os
 from modules.utils.path_helper import resource_path
 from modules.utils.version import get_app_title
 from modules.core.file_operations import open_file, ask_and_open_file
+from modules.utils import jmptools
 from modules.utils.constants import (
     DEFAULT_WINDOW_WIDTH, DEFAULT_WINDOW_HEIGHT, DEFAULT_PADDING,
     DEFAULT_LISTBOX_WIDTH, DEFAULT_LISTBOX_HEIGHT, DEFAULT_ENTRY_WIDTH,
@@ -358,9 +359,34 @@ class BoxPlotUI:
             self.file_path_var.set(filepath)
             self.status_var.set(f"JMP file loaded: {os.path.basename(filepath)}")
             
-            # TODO: 這裡可以新增讀取JMP檔案並填充列表框的代碼
-            # 暫時使用測試數據
-            self._load_demo_data()
+            # 只讀取欄位資訊來填充列表框，讀取失敗時使用測試數據
+            if not self._load_jmp_columns(filepath):
+                self._load_demo_data()
+
+    def _load_jmp_columns(self, filepath):
+        """從JMP檔案的欄位資訊 (不讀取資料) 填充列表框，成功時回傳 True"""
+        try:
+            status, message, schema = jmptools.read_schema(filepath)
+        except Exception as e:
+            status, message = -1, str(e)
+        if status != 0:
+            print(f"Unable to read JMP columns: {message}")
+            return False
+        
+        self.y_listbox.delete(0, tk.END)
+        self.x_group_listbox.delete(0, tk.END)
+        self.x_axis_listbox.delete(0, tk.END)
+        
+        for column in schema["columns"]:
+            if column["is_numeric"]:
+                self.y_listbox.insert(tk.END, column["name"])
+            if column["data_type"] != "Row State":
+                self.x_group_listbox.insert(tk.END, column["name"])
+                self.x_axis_listbox.insert(tk.END, column["name"])
+        
+        self.status_var.set(f"JMP file loaded: {os.path.basename(filepath)} "
+                            f"({schema['n_rows']} rows, {len(schema['columns'])} columns)")
+        return True
 
     def _generate_box_plot(self):
         """生成Box Plot圖表"""
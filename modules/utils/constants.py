@@ -44,4 +44,22 @@ MSG_TITLE_NOTICE = "Notice"
 MSG_TITLE_INFO = "提示"
 
 # 訊息內容
-MSG_NO_SCRIPT_TEMPLATE = "{0}工具腳本尚未設置。請先創建{1}檔案。" 
\ No newline at end of file
+MSG_NO_SCRIPT_TEMPLATE = "{0}工具腳本尚未設置。請先創建{1}檔案。"
+
+# AICc 多欄位計算 (Best Fit beta)
+AICC_MAX_WORKERS = None  # 平行計算的程序數，None 表示使用所有 CPU 核心，1 表示不平行 (計算量小時一律不平行，見 PARALLEL_MIN_WORK)
+AICC_SPLIT_FAMILIES = "auto"  # 同一欄位的各分布是否分散到不同程序，"auto" 表示欄位數少於程序數時才分散
+# 啟發式篩選: 較慢的分布先做少量迭代的部分配適，看起來明顯較差時略過完整配適 (顯示為未計算)
+# 部分配適的AICc不是下限，無法證明被略過的分布較差，因此可能漏掉真正的最佳分布；需要可靠結果時請保持 False
+AICC_HEURISTIC_SCREENING = False
+AICC_FIT_CACHE = True  # 使用配適結果快取 (記憶體 + 磁碟)，重複分析未變更的欄位時直接取得結果
+AICC_BINNED = False  # 大型欄位 (20 萬點以上) 以直方圖近似配適需要迭代的分布，最後仍以原始數據精確計算AICc
+AICC_KERNEL_BACKEND = "auto"  # 對數似然的計算方式: "auto" (有安裝 numba 時使用編譯核心)、"numpy" 或 "numba"
+# 增量模式: 同一個資料檔案 (例如每天在後面附加新列的 SPC 資料表) 再次分析時，只合併新增列的統計量並從上次的參數熱啟動
+# 狀態依檔案路徑存在使用者目錄；依序逐欄計算 (不使用程序池與啟發式篩選)，數據被修改 (不只是附加) 的欄位自動改為完整計算
+AICC_INCREMENTAL = False
+AICC_EM_STARTS = 0  # 混合常態的多起點 EM 初始值總數 (例如 32)，0 表示只用兩種固定的初始化策略
+AICC_BOOTSTRAP_REPLICATES = 200  # 排名穩定性 (bootstrap) 每個欄位最多重抽樣次數，0 表示不顯示「排名穩定性」按鈕
+
+# JMP 檔案讀取
+JMP_CACHE_ENABLED = True  # 已解碼的欄位快取到磁碟 (~/.data_analysis_tools/jmp_cache)，False 時每次都重新解碼 JMP 檔案
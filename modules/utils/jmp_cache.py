@@ -0,0 +1,289 @@
+"""
+JMP 讀取快取模組
+把 jmptools 解碼後的資料表以欄為單位存到磁碟 (每欄一個 .npy)，同一個檔案再次開啟時直接載入，不必重新解碼
+文字、日期、時間欄位也存成固定寬度的 bytes / datetime64 / timedelta64 陣列，快取目錄中的檔案一律不以 pickle 載入
+快取以檔案路徑、大小、修改時間與內容雜湊判斷是否有效，總大小超過上限時淘汰最久未使用的檔案
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.utils import jmptools
+
+# 快取無法使用或寫入失敗時的警告只送到 logging (預設不輸出，需要時由程式設定 handler)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# 快取預設位置與大小上限
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".data_analysis_tools", "jmp_cache")
+DEFAULT_MAX_CACHE_BYTES = 2 * 1024 ** 3
+
+# 內容雜湊只讀取檔案開頭與結尾各 1 MiB (加上檔案大小)，讓大型檔案的驗證也只需要幾毫秒
+HASH_BLOCK_BYTES = 1024 ** 2
+
+MANIFEST_NAME = "manifest.json"
+CACHE_FORMAT_VERSION = 2
+
+
+def content_hash(file_path, file_size):
+    """計算檔案的快速內容雜湊 (開頭與結尾區塊 + 檔案大小)"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(file_size).encode())
+    with open(file_path, "rb") as f:
+        digest.update(f.read(HASH_BLOCK_BYTES))
+        if file_size > HASH_BLOCK_BYTES:
+            f.seek(max(file_size - HASH_BLOCK_BYTES, HASH_BLOCK_BYTES))
+            digest.update(f.read(HASH_BLOCK_BYTES))
+    return digest.hexdigest()
+
+
+class JMPCache:
+    """JMP 資料表的磁碟快取 (每個來源檔案一個目錄，每欄一個 .npy 檔，LRU 淘汰)"""
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+
+    def readjmp(self, filename, columns=None, dtype_filter=None):
+        """與 jmptools.readjmp 相同的介面，回傳 (錯誤碼, 錯誤訊息, DataFrame)；已快取的欄位直接從磁碟載入"""
+        if dtype_filter not in (None, "numeric"):
+            raise ValueError('Unknown dtype_filter = ' + str(dtype_filter))
+        file_path = os.path.abspath(filename)
+        try:
+            entry_dir, manifest = self._open_entry(file_path)
+        except (OSError, ValueError) as e:
+            logger.warning("JMP快取無法使用 (%s)，直接讀取檔案", e)
+            return jmptools.readjmp(filename, columns=columns, dtype_filter=dtype_filter)
+        if manifest is not None:
+            return self._read_entry(file_path, entry_dir, manifest, columns, dtype_filter)
+
+        # 沒有快取: 表頭 (schema) 與欄位資料以同一個 JMPReader 讀取，表頭只解析一次
+        try:
+            reader = jmptools.JMPReader(file_path).open()
+        except ValueError as e:
+            return -1, str(e), None
+        with reader:
+            try:
+                manifest = self._new_manifest(file_path, reader.schema())
+            except ValueError as e:
+                return -1, str(e), None
+            os.makedirs(entry_dir, exist_ok=True)
+            return self._read_entry(file_path, entry_dir, manifest, columns, dtype_filter, reader)
+
+    def clear(self):
+        """清除所有快取"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _read_entry(self, file_path, entry_dir, manifest, columns, dtype_filter, reader=None):
+        """
+        從快取目錄載入欄位，尚未快取的欄位從檔案讀取後存入快取，回傳 (錯誤碼, 錯誤訊息, DataFrame)
+        reader: 已開啟的 JMPReader (沒有快取時用來讀取 schema 的同一個)，None 時另外開啟檔案
+        """
+        try:
+            wanted = self._resolve_columns(manifest, columns, dtype_filter)
+        except ValueError as e:
+            return -2, str(e), None
+
+        # 只讀取尚未快取的欄位
+        missing = [name for name in wanted if name not in manifest["columns"]]
+        fresh = {}
+        if missing:
+            if reader is None:
+                status, message, data = jmptools.readjmp(file_path, columns=missing)
+                if status != 0:
+                    return status, message, None
+            else:
+                try:
+                    data = reader.read(missing)
+                except ValueError as e:
+                    return -2, str(e), None
+            fresh = {name: data[name] for name in missing}
+            try:
+                self._store_columns(entry_dir, manifest, fresh)
+            except OSError as e:
+                logger.warning("JMP快取寫入失敗: %s", e)
+
+        series = {}
+        for name in wanted:
+            series[name] = fresh[name] if name in fresh else self._load_column(entry_dir, manifest, name)
+
+        manifest["last_access"] = time.time()
+        try:
+            self._write_manifest(entry_dir, manifest)
+            if missing:
+                self._evict(keep=entry_dir)
+        except OSError as e:
+            logger.warning("JMP快取寫入失敗: %s", e)
+        return 0, "No error", pd.DataFrame(series, copy=False)
+
+    def _entry_dir(self, file_path):
+        """來源檔案對應的快取目錄 (以正規化路徑雜湊命名)"""
+        path_key = hashlib.blake2b(os.path.normcase(file_path).encode("utf-8"), digest_size=12).hexdigest()
+        return os.path.join(self.cache_dir, path_key)
+
+    def _open_entry(self, file_path):
+        """回傳 (快取目錄, manifest)；快取不存在或已失效 (檔案被修改) 時 manifest 為 None"""
+        entry_dir = self._entry_dir(file_path)
+        stat = os.stat(file_path)
+        manifest = self._read_manifest(entry_dir)
+        if manifest is not None:
+            is_valid = (manifest.get("format_version") == CACHE_FORMAT_VERSION and
+                        manifest.get("reader_version") == jmptools.version and
+                        manifest["size"] == stat.st_size and manifest["mtime_ns"] == stat.st_mtime_ns and
+                        manifest["content_hash"] == content_hash(file_path, stat.st_size))
+            if is_valid:
+                return entry_dir, manifest
+            shutil.rmtree(entry_dir, ignore_errors=True)
+        return entry_dir, None
+
+    def _new_manifest(self, file_path, schema):
+        """建立新的 manifest，記錄來源檔案資訊與欄位結構"""
+        stat = os.stat(file_path)
+        return {
+            "format_version": CACHE_FORMAT_VERSION,
+            "reader_version": jmptools.version,
+            "source": file_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "content_hash": content_hash(file_path, stat.st_size),
+            "n_rows": schema["n_rows"],
+            "schema": [{"name": column["name"], "is_numeric": column["is_numeric"]} for column in schema["columns"]],
+            "columns": {},
+            "last_access": time.time(),
+        }
+
+    def _resolve_columns(self, manifest, columns, dtype_filter):
+        """依 columns / dtype_filter 決定要回傳的欄位名稱 (規則與 jmptools.readjmp 相同)"""
+        available = [column["name"] for column in manifest["schema"]
+                     if dtype_filter is None or column["is_numeric"]]
+        if columns is None:
+            return available
+        missing = [name for name in columns if name not in available]
+        if missing:
+            raise ValueError('Column(s) not found in JMP file: ' + ", ".join(missing))
+        return list(columns)
+
+    def _store_columns(self, entry_dir, manifest, series_by_name):
+        """把欄位寫入快取目錄，並記錄在 manifest 中"""
+        for name, series in series_by_name.items():
+            file_stem = "c%04d" % len(manifest["columns"])
+            column_entry = {"kind": "array", "files": [file_stem + ".npy"]}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                column_entry = {"kind": "categorical", "files": [file_stem + ".npy"],
+                                "categories": [str(x) for x in series.cat.categories]}
+                self._save_array(entry_dir, file_stem + ".npy", series.cat.codes.to_numpy())
+            elif isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufcmM":
+                self._save_array(entry_dir, file_stem + ".npy", series.to_numpy())
+            else:  # 文字、日期、時間等 Python 物件欄位
+                kind, array = _object_column_array(series)
+                if kind is None:
+                    continue  # 無法不用 pickle 儲存的欄位不快取，每次從檔案讀取
+                column_entry["kind"] = kind
+                self._save_array(entry_dir, file_stem + ".npy", array)
+            column_entry["bytes"] = sum(os.path.getsize(os.path.join(entry_dir, x)) for x in column_entry["files"])
+            manifest["columns"][name] = column_entry
+
+    def _load_column(self, entry_dir, manifest, name):
+        """從快取目錄載入單一欄位"""
+        column_entry = manifest["columns"][name]
+        array_path = os.path.join(entry_dir, column_entry["files"][0])
+        if column_entry["kind"] == "categorical":
+            codes = np.load(array_path)
+            return pd.Series(pd.Categorical.from_codes(codes, categories=column_entry["categories"]), name=name)
+        if column_entry["kind"] in ("string", "date", "time"):
+            return pd.Series(_object_column_values(column_entry["kind"], np.load(array_path)), name=name)
+        # 數值欄位以 copy-on-write 方式映射，只有用到的頁面才會真的從磁碟讀取
+        return pd.Series(np.load(array_path, mmap_mode="c").view(np.ndarray), name=name, copy=False)
+
+    def _save_array(self, entry_dir, file_name, array):
+        """寫入 .npy 檔 (先寫暫存檔再改名，避免留下不完整的檔案)"""
+        temp_path = os.path.join(entry_dir, file_name + ".tmp")
+        with open(temp_path, "wb") as f:
+            np.save(f, array, allow_pickle=False)
+        os.replace(temp_path, os.path.join(entry_dir, file_name))
+
+    def _read_manifest(self, entry_dir):
+        """讀取 manifest，不存在或損毀時回傳 None"""
+        try:
+            with open(os.path.join(entry_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, entry_dir, manifest):
+        """寫入 manifest (先寫暫存檔再改名)"""
+        temp_path = os.path.join(entry_dir, MANIFEST_NAME + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(temp_path, os.path.join(entry_dir, MANIFEST_NAME))
+
+    def _evict(self, keep=None):
+        """快取總大小超過上限時，從最久未使用的檔案開始刪除 (keep 目錄不會被刪除)"""
+        entries = []
+        for entry_name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, entry_name)
+            manifest = self._read_manifest(entry_dir)
+            if manifest is None:
+                continue
+            entry_bytes = sum(column["bytes"] for column in manifest["columns"].values())
+            entries.append((manifest["last_access"], entry_dir, entry_bytes))
+
+        total_bytes = sum(entry_bytes for _, _, entry_bytes in entries)
+        for _, entry_dir, entry_bytes in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            if entry_dir == keep:
+                continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_bytes -= entry_bytes
+
+
+def _object_column_array(series):
+    """
+    把物件欄位轉成不需要 pickle 的陣列，回傳 (種類, 陣列)；無法轉換時回傳 (None, None)
+    文字: UTF-8 的固定寬度 bytes (S) 陣列；日期: datetime64[D]；時間: 當天經過的 timedelta64[ns] (缺失值為 NaT)
+    """
+    kind = pd.api.types.infer_dtype(series.dropna())
+    if kind == "string" and not series.isna().any():
+        encoded = [x.encode("utf-8") for x in series]
+        if any(x.endswith(b"\0") for x in encoded):
+            return None, None  # 固定寬度陣列會去掉結尾的 NUL
+        return "string", np.array(encoded, dtype="S%d" % max(1, max(map(len, encoded), default=1)))
+    if kind == "date":
+        return "date", pd.to_datetime(series).to_numpy().astype("datetime64[D]")
+    if kind == "time":
+        nanoseconds = [np.timedelta64("NaT") if pd.isna(x) else
+                       np.timedelta64(((x.hour * 60 + x.minute) * 60 + x.second) * 10**6 + x.microsecond, "us")
+                       for x in series]
+        return "time", np.array(nanoseconds, dtype="timedelta64[ns]")
+    return None, None
+
+
+def _object_column_values(kind, array):
+    """_object_column_array 的反向轉換，回傳與 jmptools 相同的物件陣列 (str / datetime.date / datetime.time)"""
+    if kind == "string":
+        # 與 jmptools 相同，每個不同的值只解碼一次
+        unique_strings, inverse = np.unique(array, return_inverse=True)
+        decoded = np.array([x.decode("utf-8") for x in unique_strings], dtype=object)
+        return decoded[inverse.ravel()]
+    if kind == "date":
+        return pd.Series(array.astype("datetime64[ns]")).dt.date.to_numpy()
+    return pd.Series(np.datetime64(0, "ns") + array).dt.time.to_numpy()
+
+
+_default_cache = None
+
+
+def readjmp_cached(filename, columns=None, dtype_filter=None):
+    """使用預設快取讀取 JMP 檔案，介面與 jmptools.readjmp 相同"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = JMPCache()
+    return _default_cache.readjmp(filename, columns=columns, dtype_filter=dtype_filter)
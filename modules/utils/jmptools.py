@@ -25,8 +25,7 @@
 import numpy as np
 import pandas as pd
 import struct
-import datetime
-import math
+import mmap
 
 import os
 
@@ -35,22 +34,39 @@ pd.set_option('expand_frame_repr', False)
 
 # module global variables
 version = 1.0  # reader version
-_data = None  # pandas dataframe that will hold all the JMP file data for module internal use (no JMP formatting info)
-_abs_column_addresses = []  # Every JMP file holds an absolute file offset for where each set of column info is held
-_jmpfile = None   # file object for the JMP file for reading
-_n_rows = 0  # number of rows in the JMP data table
-_n_columns = 0  # number of columns in the JMP data table
+_data = None  # pandas dataframe from the last readjmp call, used by to_csv (no JMP formatting info)
 
 # column_format_type splits into these 4 categories for date/time, time only, date only, duration formatting
 # Internally in the JMP file, the data for such a column will be stored as a double.  But information below
 # is used to figure out from the formatting how I should extract the value.
-_column_format_type_dt_vals = [0x69, 0x6A, 0x73, 0x74, 0x7D, 0x7E, 0x77, 0x78, 0x86, 0x87, 0x7B, 0x7C,
-                               0x80, 0x81, 0x89, 0x8A]
-_column_format_type_t_vals = [0x79, 0x82]
-_column_format_type_d_vals = [0x65, 0x6E, 0x6F, 0x8B, 0x70, 0x71, 0x72, 0x7A, 0x75, 0x76, 0x7F, 0x66, 0x67, 0x88]
-_column_format_type_dur_vals = [0x6C, 0x6D, 0x83, 0x84, 0x85]
+# (frozensets, these are looked up once per column)
+_column_format_type_dt_vals = frozenset([0x69, 0x6A, 0x73, 0x74, 0x7D, 0x7E, 0x77, 0x78, 0x86, 0x87, 0x7B, 0x7C,
+                                         0x80, 0x81, 0x89, 0x8A])
+_column_format_type_t_vals = frozenset([0x79, 0x82])
+_column_format_type_d_vals = frozenset([0x65, 0x6E, 0x6F, 0x8B, 0x70, 0x71, 0x72, 0x7A, 0x75, 0x76, 0x7F, 0x66, 0x67,
+                                        0x88])
+_column_format_type_dur_vals = frozenset([0x6C, 0x6D, 0x83, 0x84, 0x85])
+_column_format_type_all_vals = (_column_format_type_dt_vals | _column_format_type_t_vals |
+                                _column_format_type_d_vals | _column_format_type_dur_vals)
 _column_format_type_bucket = {"datetime": 0, "time": 1, "date": 2, "duration": 3}
 
+# JMP date/time values are seconds since 1/1/1904 12:00:00 AM
+# _jmp_epoch_ns is that epoch in nanoseconds since 1970 (the datetime64[ns] epoch); the limits are the seconds
+# (relative to the JMP epoch for date/time, absolute for duration) that still fit in datetime64[ns]/timedelta64[ns]
+_jmp_epoch_ns = int(np.datetime64("1904-01-01T00:00:00", "ns").astype(np.int64))
+_datetime_limits = ((pd.Timestamp.min.value - _jmp_epoch_ns) // 10**9 + 1,
+                    (pd.Timestamp.max.value - _jmp_epoch_ns) // 10**9 - 1)
+_duration_limits = (pd.Timedelta.min.value // 10**9 + 1, pd.Timedelta.max.value // 10**9 - 1)
+
+# readable names for the column data type and modeling type bytes (used by read_schema)
+_data_type_names = {1: "Numeric", 2: "Char", 3: "Row State", 4: "Large String?", 0xFF: "1-byte Integer",
+                    0xFE: "2-byte Integer", 0xFC: "4-byte Integer"}
+_modeling_type_names = {0: "Continuous", 1: "Ordinal", 2: "Nominal"}
+
+# data types (see _data_type_names) that decode to a plain number
+_numeric_data_types = (1, 0xFF, 0xFE, 0xFC)
+_dtype_filters = (None, "numeric")
+
 
 # for debug work:
 # take a byte array as input and give formatted hex string as output
@@ -81,76 +97,447 @@ def _list_of_byte_array_to_hex(list_of_byte_array):
 
 # ***main routine to call***
 # pass a JMP filename/path this this function
-# return an error code, an error message, and copy of the _data (if no error) as a pandas dataframe
-def readjmp(filename):
-    global _jmpfile
+# return an error code, an error message, and the _data (if no error) as a pandas dataframe
+# columns / dtype_filter / memory_map: see JMPReader
+# this is a thin wrapper around JMPReader; the reader keeps its state per instance, so any number of files can be
+# read at the same time from different threads or processes (only _data, used by to_csv, is shared)
+def readjmp(filename, memory_map=False, columns=None, dtype_filter=None):
     global _data
-    global _abs_column_addresses
+    if dtype_filter not in _dtype_filters:
+        raise ValueError('Unknown dtype_filter = ' + str(dtype_filter))
     _data = None
-    _abs_column_addresses = []
 
-    _jmpfile = open(filename, "rb")
     try:
-        _read_header()
+        reader = JMPReader(filename, memory_map).open()
     except ValueError as e:
         return -1, str(e), None
+    with reader:
+        try:
+            data = reader.read(columns, dtype_filter)
+        except ValueError as e:
+            return -2, str(e), None
+
+    _data = data
+    return 0, "No error", data
+
+
+# pass a JMP filename/path to this function to get the table layout without reading any row data
+# return an error code, an error message, and the schema (if no error) as a dict, see JMPReader.schema
+def read_schema(filename):
     try:
-        _decode_all_columns()
+        with JMPReader(filename) as reader:
+            return 0, "No error", reader.schema()
     except ValueError as e:
-        return -2, str(e), None
-
-    _jmpfile.close()
-    return 0, "No error", _data.copy(deep=True)
-
-
-# helper function: read n_bytes worth of data from the JMP file
-def _read_bytes(n_bytes):
-    global _jmpfile
-    return bytes(_jmpfile.read(n_bytes))
-
-
-# read the JMP header - this is the part before you get to the column definitions that contain the actual data
-# It has a lot of interesting stuff in it (scripts, row state, etc.), but I just read over that to get to the data.
-def _read_header():
-    global _n_rows
-    global _n_columns
-    global _abs_column_addresses
-    temp_data = _read_bytes(8)  # first 8 bytes should be FF FF 00 00 03 00 00 00 for JMP 11 _jmpfile
-    if temp_data != bytearray.fromhex("FF FF 00 00 03 00 00 00"):
-        raise ValueError('Error while reading header - _jmpfile is most likely not a JMP 11 version _jmpfile')
-    _n_rows = struct.unpack("I", _read_bytes(4))[0]  # next 4 bytes are # of rows
-    _n_columns = struct.unpack("I", _read_bytes(4))[0]  # next 4 bytes are # of columns
-    _read_bytes(12)  # unknown what these bytes are
-    _read_bytes(2)  # should be 06 00 (encoding type)
-    n_bytes_to_read = struct.unpack("I", _read_bytes(4))[0]
-    _read_bytes(n_bytes_to_read)  # 'utf-8' string in my example files
-    _read_bytes(2)  # should be 07 00 always?
-    n_bytes_to_read = struct.unpack("I", _read_bytes(4))[0]
-    _read_bytes(n_bytes_to_read)  # likely _jmpfile time stamp
-
-    # read through a large chunk of the remaining header and should arrive
-    # where column structures start to be described
-    # temp_bytes info:
-    # 04 00, 05 00, 0F 00 = unknown
-    # 03 00 = all the scripts in the table
-    # 02 00 = row state color information, most likely
-    # 10 00 = likely more row state information, each row 8 bytes of info
-    # 12 00 = string with version info
-    # FF FF = when I read this, I am at the column info
-    done = False
-    while not done:
-        temp_bytes = _read_bytes(2)  # describe what type of information follows (see above list)
-        n_bytes_to_read = struct.unpack("I", _read_bytes(4))[0]  # number of bytes associated with this section
-        # this is the temp_data associated with this section, but don't need to understand for now
-        _read_bytes(n_bytes_to_read)  # read and discard
-        if temp_bytes == bytearray.fromhex("FF FF"):
-            done = True
-
-    _read_bytes(2)  # should tell # of bytes used to give absolute offsets of column info
-    count = 0
-    while count < _n_columns:
-        _abs_column_addresses.append(_read_bytes(4))  # may need to revisit on extremely large files - won't be 4 bytes?
-        count += 1
+        return -1, str(e), None
+
+
+# pass a JMP filename/path to this function to read the table in chunks of chunk_rows rows (generator of
+# dataframes, see JMPReader.iter_chunks), e.g. for running statistics over tables that don't fit in memory
+# unlike readjmp, errors are raised as ValueError; the file is closed when the generator finishes or is closed
+def iter_chunks(filename, columns=None, chunk_rows=100_000, dtype_filter=None, memory_map=False):
+    with JMPReader(filename, memory_map) as reader:
+        for chunk in reader.iter_chunks(columns, dtype_filter, chunk_rows):
+            yield chunk
+
+
+# reads one JMP 11 file, all state lives on the instance
+# use as a context manager, the header is read on enter and the file is always closed on exit:
+#     with JMPReader(filename) as reader:
+#         df = reader.read(columns=["Thickness"])
+# read()/schema() raise ValueError when the file can't be decoded
+# memory_map=True maps the file into memory instead of reading it: fixed-width columns (numeric, row state) are then
+# numpy views straight into the mapping and are only copied when a column has to be transformed (integer blanks,
+# date/time, list check lookup). The mapping is copy-on-write, so editing the dataframe never touches the file;
+# it is released once the dataframe is garbage collected (on Windows the file stays locked until then).
+class JMPReader:
+    def __init__(self, filename, memory_map=False):
+        self.filename = filename
+        self.memory_map = memory_map
+        self.n_rows = 0  # number of rows in the JMP data table
+        self.n_columns = 0  # number of columns in the JMP data table
+        self._file = None  # file object (or copy-on-write mmap) for the JMP file for reading
+        self._abs_column_addresses = []  # absolute file offset for where each set of column info is held
+        self._column_infos = None  # column descriptors, read on first use
+
+    def __enter__(self):
+        if self._file is None:
+            self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    # open the file and read the header, returns self
+    # the file is closed again if the header can't be read (whatever the exception)
+    def open(self):
+        self._abs_column_addresses = []
+        self._column_infos = None
+        try:
+            self._open_jmpfile(self.filename, self.memory_map)
+            self._read_header()
+        except BaseException:
+            self.close()
+            raise
+        return self
+
+    def close(self):
+        self._close_jmpfile()
+
+    # descriptors of every column in file order (see _read_column_descriptor)
+    def column_infos(self):
+        if self._column_infos is None:
+            self._column_infos = self._read_all_column_descriptors()
+        return self._column_infos
+
+    # read the table as a pandas dataframe
+    # columns = list of column names to read (in that order), None reads every column
+    # dtype_filter="numeric" only keeps columns that decode to plain numbers (no char, row state or date/time columns)
+    # only the header and the column descriptors are read for columns that are not selected, their row data is skipped
+    def read(self, columns=None, dtype_filter=None):
+        return self._decode_all_columns(_select_columns(self.column_infos(), columns, dtype_filter))
+
+    # generator that reads the table chunk_rows rows at a time, yielding one dataframe per chunk
+    # each chunk is indexed by its row numbers in the full table; columns/dtype_filter work like read()
+    # only one chunk of the selected columns is in memory at a time, so tables larger than memory can be processed
+    def iter_chunks(self, columns=None, dtype_filter=None, chunk_rows=100_000):
+        if chunk_rows < 1:
+            raise ValueError('chunk_rows must be at least 1')
+        column_infos = _select_columns(self.column_infos(), columns, dtype_filter)
+        for start_row in range(0, self.n_rows, chunk_rows):
+            yield self._decode_all_columns(column_infos, start_row, min(chunk_rows, self.n_rows - start_row))
+
+    # table layout without reading any row data
+    # only the header and the column descriptors are parsed, so this is fast even for very large files
+    # returns {"n_rows": ..., "columns": [{"name", "data_type", "modeling_type", "format_type", "bytes_per_row",
+    #                                      "is_numeric"}, ...]}
+    # data_type/modeling_type are readable names, is_numeric tells if read(dtype_filter="numeric") would keep it
+    def schema(self):
+        column_infos = self.column_infos()
+        numeric_names = set(x["name"] for x in _select_columns(column_infos, dtype_filter="numeric"))
+        columns = [{"name": x["name"],
+                    "data_type": _data_type_names.get(x["data_type"], "0x%0.2X" % x["data_type"]),
+                    "modeling_type": _modeling_type_names.get(x["modeling_type"], "0x%0.2X" % x["modeling_type"]),
+                    "format_type": x["format_type"],
+                    "bytes_per_row": x["bytes_per_row"],
+                    "is_numeric": x["name"] in numeric_names} for x in column_infos]
+        return {"n_rows": self.n_rows, "columns": columns}
+
+    # helper function: open the JMP file either as a regular file object or as a copy-on-write memory map
+    # both support read/seek/tell, so the header and column descriptor parsing doesn't care which one it gets
+    def _open_jmpfile(self, filename, memory_map):
+        if not memory_map:
+            self._file = open(filename, "rb")
+            return
+        with open(filename, "rb") as f:  # the mmap keeps its own handle, so the file object can be closed right away
+            self._file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    # helper function: close the JMP file
+    # a memory map that still has numpy views into it (columns of a dataframe we returned) can't be closed; dropping the reference is
+    # enough in that case, the mapping goes away together with the last view
+    def _close_jmpfile(self):
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+        except BufferError:
+            pass
+        self._file = None
+
+    # helper function: read n_bytes worth of data from the JMP file
+    # a short read means the file is truncated, raised as ValueError (instead of a struct.error further on)
+    def _read_bytes(self, n_bytes):
+        data = bytes(self._file.read(n_bytes))
+        if len(data) != n_bytes:
+            raise ValueError('Unexpected end of file')
+        return data
+
+    # helper function: move n_bytes forward in the JMP file without reading them (fields we don't need)
+    def _skip_bytes(self, n_bytes):
+        self._file.seek(n_bytes, os.SEEK_CUR)
+
+    # helper function: read n_values fixed-width values of the given numpy dtype from the JMP file in one call
+    # when memory mapped, the result is a zero-copy view into the mapping, otherwise the buffer is a bytearray
+    # either way the returned array is writable (pandas may modify it in place later)
+    def _read_array(self, dtype, n_values):
+        dtype = np.dtype(dtype)
+        if isinstance(self._file, mmap.mmap):
+            offset = self._file.tell()
+            if offset + dtype.itemsize * n_values > len(self._file):
+                raise ValueError('Unexpected end of file while reading column data')
+            self._file.seek(dtype.itemsize * n_values, os.SEEK_CUR)
+            return np.frombuffer(self._file, dtype=dtype, count=n_values, offset=offset)
+        buffer = bytearray(dtype.itemsize * n_values)
+        if self._file.readinto(buffer) != len(buffer):
+            raise ValueError('Unexpected end of file while reading column data')
+        return np.frombuffer(buffer, dtype=dtype)
+
+    # read the JMP header - this is the part before you get to the column definitions that contain the actual data
+    # It has a lot of interesting stuff in it (scripts, row state, etc.), but I just read over that to get to the data.
+    def _read_header(self):
+        temp_data = self._read_bytes(8)  # first 8 bytes should be FF FF 00 00 03 00 00 00 for JMP 11 file
+        if temp_data != bytearray.fromhex("FF FF 00 00 03 00 00 00"):
+            raise ValueError('Error while reading header - file is most likely not a JMP 11 version file')
+        self.n_rows = struct.unpack("I", self._read_bytes(4))[0]  # next 4 bytes are # of rows
+        self.n_columns = struct.unpack("I", self._read_bytes(4))[0]  # next 4 bytes are # of columns
+        self._skip_bytes(12)  # unknown what these bytes are
+        self._skip_bytes(2)  # should be 06 00 (encoding type)
+        n_bytes_to_read = struct.unpack("I", self._read_bytes(4))[0]
+        self._skip_bytes(n_bytes_to_read)  # 'utf-8' string in my example files
+        self._skip_bytes(2)  # should be 07 00 always?
+        n_bytes_to_read = struct.unpack("I", self._read_bytes(4))[0]
+        self._skip_bytes(n_bytes_to_read)  # likely file time stamp
+
+        # read through a large chunk of the remaining header and should arrive
+        # where column structures start to be described
+        # temp_bytes info:
+        # 04 00, 05 00, 0F 00 = unknown
+        # 03 00 = all the scripts in the table
+        # 02 00 = row state color information, most likely
+        # 10 00 = likely more row state information, each row 8 bytes of info
+        # 12 00 = string with version info
+        # FF FF = when I read this, I am at the column info
+        done = False
+        while not done:
+            temp_bytes = self._read_bytes(2)  # describe what type of information follows (see above list)
+            n_bytes_to_read = struct.unpack("I", self._read_bytes(4))[0]  # number of bytes associated with this section
+            # this is the temp_data associated with this section, but don't need to understand for now
+            # seek over it instead of reading it: the row state sections are 8 bytes per row, so reading them would
+            # make read_schema / column_infos scale with the number of rows
+            self._skip_bytes(n_bytes_to_read)
+            if temp_bytes == bytearray.fromhex("FF FF"):
+                done = True
+
+        self._skip_bytes(2)  # should tell # of bytes used to give absolute offsets of column info
+        count = 0
+        while count < self.n_columns:
+            self._abs_column_addresses.append(self._read_bytes(4))  # may need to revisit on extremely large files - won't be 4 bytes?
+            count += 1
+
+    # read the descriptor of every column, using each column offset we figured out above
+    # malformed descriptors (bad lengths, empty list check) are reported as ValueError like every other decode error
+    def _read_all_column_descriptors(self):
+        try:
+            return [self._read_column_descriptor(i) for i in self._abs_column_addresses]
+        except (struct.error, ZeroDivisionError) as e:
+            raise ValueError('Error while reading column descriptors: ' + str(e))
+
+    # read the description of a single column (name, types, list check values, ...) without touching the row data
+    # input is the file address that starts describing the column
+    # returns a dict with the column information, including data_offset = file position where the row data starts
+    def _read_column_descriptor(self, file_address):
+        int_offset = struct.unpack("I", file_address)[0]  # get file position to seek as integer
+        self._file.seek(int_offset)  # seek to start of column name, first byte is the length of the string
+        column_name_length = struct.unpack("B", self._read_bytes(1))[0]  # length of column name
+        column_name = self._read_bytes(column_name_length).decode("utf-8")  # actual column name
+        if column_name_length < 32:
+            self._skip_bytes(31 - column_name_length)
+
+        # see _data_type_names for the meaning of data_type
+        data_type = struct.unpack("B", self._read_bytes(1))[0]  # numeric, char, row state, etc.
+
+        # see _modeling_type_names for the meaning of modeling_type
+        modeling_type = struct.unpack("B", self._read_bytes(1))[0]
+
+        column_format_width = struct.unpack("B", self._read_bytes(1))[0]  # for display purposes in JMP
+        column_format_type = struct.unpack("B", self._read_bytes(1))[0]
+        n_data_bytes_per_row = struct.unpack("H", self._read_bytes(2))[0]  # each row value takes up this many bytes
+        # is_column_locked:
+        self._skip_bytes(2)  # I think this is 2 bytes, but not 100% sure
+        skip_number = struct.unpack("H", self._read_bytes(2))[0]  # to help figure out how to skip to the actual row data
+        self._skip_bytes(12)
+        done = False
+        skip_count = 1
+        list_check = []
+        is_list_check = False
+        while (not done) and (skip_count <= skip_number - 1):
+            skip_count += 1
+            temp_bytes_val = struct.unpack("H", self._read_bytes(2))[0]
+            # 0x06 has to do with column hidden/exclude state, others I haven't delved into
+            if (temp_bytes_val == 0x0C) or (temp_bytes_val == 0x0B) or (temp_bytes_val == 0x09) or \
+                    (temp_bytes_val == 0x13) or (temp_bytes_val == 0x06):
+                field_length = struct.unpack("I", self._read_bytes(4))[0]
+                self._skip_bytes(field_length)
+            # formula field, treat specially - basically read past it, but have to determine how much to read
+            elif temp_bytes_val == 0x07:
+                field_length = struct.unpack("I", self._read_bytes(4))[0]
+                self._skip_bytes(field_length)
+            elif temp_bytes_val == 0x08:  # related to list check - enumerates possible values in terms of byte value
+                num_vals = struct.unpack("I", self._read_bytes(4))[0]
+                self._skip_bytes(num_vals)  # finish reading past the field
+            # range check is stored as 2 doubles (lower, upper of range), followed by 2 bytes
+            # indicating range check rule
+            elif temp_bytes_val == 0x05:  # indicates there is a range check on this column
+                num_vals = struct.unpack("I", self._read_bytes(4))[0]  # next 4 bytes indicate length of bytes to read
+                self._skip_bytes(num_vals)  # finish reading past the field, do nothing with it
+            elif temp_bytes_val == 0x10:  # related to a row-state column
+                num_vals = struct.unpack("I", self._read_bytes(4))[0]  # next 4 bytes indicate length of bytes to read
+                self._skip_bytes(num_vals)  # finish reading past the field, do nothing with it
+            elif temp_bytes_val == 0x01:  # related to notes
+                num_vals = struct.unpack("I", self._read_bytes(4))[0]  # next 4 bytes indicate length of bytes to read
+                self._skip_bytes(num_vals)  # finish reading past the field, do nothing with it
+            # specifically handle list check type attributes on columns
+            elif temp_bytes_val == 0x04:  # List check field - lists out all options and then references them
+                is_list_check = True
+                field_length = struct.unpack("I", self._read_bytes(4))[0]
+                num_list_items = struct.unpack("H", self._read_bytes(2))[0]
+                record_length = (field_length - 2) // num_list_items  # integer, it is used as a byte count
+                if data_type == 1:  # numeric, each is stored as 8 bytes
+                    for i in range(num_list_items):
+                        list_check.append(struct.unpack("d", self._read_bytes(8))[0])
+                elif (data_type == 2) or (data_type == 4):  # char
+                    for i in range(num_list_items):
+                        if record_length - 1 < 256:  # this should normally be the case
+                            str_length = struct.unpack("B", self._read_bytes(1))[0]
+                            list_check.append(self._read_bytes(str_length))
+                            # read out any excess bytes that aren't part of the string
+                            self._skip_bytes(record_length - str_length - 1)
+                        else:  # there are strings >=256 bytes, JMP actually has a bug and does not handle this!
+                            self._skip_bytes(1)  # this string length is not correct - read & ignore
+                            list_check.append(self._read_bytes(record_length - 1).partition(b'\x00')[0])
+            elif temp_bytes_val == 0x0F:  # given column name is actually >255 bytes, so get correct column long name
+                                          # overwrite value read above
+                column_name_length = struct.unpack("I", self._read_bytes(4))[0]
+                column_name = self._read_bytes(column_name_length).decode("utf-8")
+            else:
+                # didn't plan for this, raise an exception
+                raise ValueError('Unhandled column field type = ' + "0x%0.2X" % temp_bytes_val)
+
+        return {"name": column_name, "data_type": data_type, "modeling_type": modeling_type,
+                "format_width": column_format_width, "format_type": column_format_type,
+                "bytes_per_row": n_data_bytes_per_row, "is_list_check": is_list_check, "list_check": list_check,
+                "data_offset": self._file.tell()}
+
+    # decode all columns
+    # go through the selected column descriptors, and then go and decode the data for every column
+    # (only rows start_row to start_row + n_rows if given) then put it all together into a final dataframe
+    def _decode_all_columns(self, column_infos, start_row=0, n_rows=None):
+        columns = {}
+        for column_info in column_infos:
+            pd_series = self._decode_column_data(column_info, start_row, n_rows)[0]
+            columns[pd_series.name] = pd_series  # JMP column names are unique within a table
+
+        # construct the final pandas dataframe, copy=False keeps each column's array as-is (no consolidation copy)
+        data = pd.DataFrame(columns, copy=False)
+        if start_row:
+            data.index = pd.RangeIndex(start_row, start_row + len(data))  # row numbers of the full table
+        return data
+
+    # decode the row data of a single column
+    # input is the column information from _read_column_descriptor, and the range of rows to decode
+    # (default is every row) - JMP stores the data column by column, so a row range is one contiguous block
+    def _decode_column_data(self, column_info, start_row=0, n_rows=None):
+        column_name = column_info["name"]
+        data_type = column_info["data_type"]
+        column_format_type = column_info["format_type"]
+        n_data_bytes_per_row = column_info["bytes_per_row"]
+        is_list_check = column_info["is_list_check"]
+        list_check = column_info["list_check"]
+        if n_rows is None:
+            n_rows = self.n_rows - start_row
+        # list check columns store a 1-byte index per row, everything else is bytes_per_row wide
+        row_stride = 1 if is_list_check else n_data_bytes_per_row
+        self._file.seek(column_info["data_offset"] + start_row * row_stride)
+
+        # time to read the actual data for every row!
+        # fixed-width columns are pulled in with one bulk read per column and decoded with numpy, instead of
+        # one read + struct.unpack per row
+        row_values = []
+        dt_formatting = None  # None means it's not date/time, which is the default
+        if data_type == 1:  # numeric, actually I just assume it is stored as 8-byte double
+            if not is_list_check:
+                row_values = self._read_array("<f8", n_rows)
+            else:  # handle list check case - each row is a 1-byte index into list_check, FF means the row is empty
+                row_values = _lookup_list_check(self._read_array("u1", n_rows), list_check)
+            if _is_datetime_column(column_format_type):  # handle date/time, time, date columns
+                dt_formatting = _datetime_bucket(column_format_type)
+                row_values = _doubles_to_datetime(column_format_type, row_values, column_name)
+        elif (data_type == 2) or (data_type == 4):  # chars
+            if not is_list_check:
+                # every row is a fixed-width field, so read the whole column as an (n_rows x width) byte matrix
+                raw_bytes = self._read_array("u1", n_rows * n_data_bytes_per_row).reshape(n_rows, n_data_bytes_per_row)
+                # different formatting of strings - lead byte gives length of string 0x0100 is max you can have
+                # here - 0xFF lead byte then 255 character string = 0x0100 field length
+                if n_data_bytes_per_row <= 0x0100:
+                    string_bytes = raw_bytes[:, 1:].copy()
+                    # blank out excess characters that are in the buffer after the string, if present
+                    string_bytes[np.arange(n_data_bytes_per_row - 1) >= raw_bytes[:, :1]] = 0
+                # takes long form where there is no byte before saying how long the string is, and instead string
+                # is null terminated and buffered bytes up to full length of field are there
+                else:
+                    # blank out everything from the null terminator on
+                    string_bytes = raw_bytes.copy()
+                    string_bytes[np.logical_or.accumulate(string_bytes == 0, axis=1)] = 0
+                row_values = _decode_fixed_width_strings(string_bytes)
+            else:  # this is a list check column, so has bytes refering to item in list, returned as a categorical
+                row_values = _list_check_to_categorical(self._read_array("u1", n_rows), list_check)
+        # row state column, should be 2 bytes per row, but don't check
+        # for this purpose, I will just decode to 2-byte integer - not sure what else to do at this point,
+        # could ultimately break out as some sort of string saying what the state actually is
+        elif data_type == 0x03:
+            row_values = self._read_array("<u2", n_rows)
+        # 1-byte signed integer, interestingly JMP does not use traditional range for 8-bit signed integer...
+        # -126-127 is the range, with -127 representing "blank"
+        elif data_type == 0xFF:
+            row_values = _integers_to_float(self._read_array("<i1", n_rows), -127)
+        elif data_type == 0xFE:  # 2-byte signed integer,-32767 represents blank entry
+            row_values = _integers_to_float(self._read_array("<i2", n_rows), -32767)
+        elif data_type == 0xFC:  # 4-byte signed integer, -2147483647 represents blank entry
+            row_values = _integers_to_float(self._read_array("<i4", n_rows), -2147483647)
+
+        # create pandas series with appropriate dtype if a date/datetime/time/duration
+        if dt_formatting == _column_format_type_bucket["time"]:
+            pd_series = [pd.Series(row_values, name=column_name, dtype=np.dtype('datetime64[ns]')).dt.time]
+        elif dt_formatting == _column_format_type_bucket["date"]:
+            pd_series = [pd.Series(row_values, name=column_name, dtype=np.dtype('datetime64[ns]')).dt.date]
+        elif dt_formatting == _column_format_type_bucket["duration"]:
+            pd_series = [pd.Series(row_values, name=column_name, dtype=np.dtype('timedelta64[ns]'))]
+        elif dt_formatting == _column_format_type_bucket["datetime"]:
+            pd_series = [pd.Series(row_values, name=column_name, dtype=np.dtype('datetime64[ns]'))]
+        else:
+            pd_series = [pd.Series(row_values, name=column_name, copy=False)]
+
+        return pd_series  # return the column as a pandas series
+
+
+# helper function: widen a JMP integer column to float64 so that the "blank" sentinel can be stored as NaN
+def _integers_to_float(int_values, blank_value):
+    float_values = int_values.astype(np.float64)
+    float_values[int_values == blank_value] = np.nan
+    return float_values
+
+
+# helper function: map 1-byte list check indices to their numeric list values, 0xFF (or any index past the end
+# of the list) means the row is empty and becomes NaN
+def _lookup_list_check(list_indices, list_check):
+    lookup_table = np.full(256, np.nan)
+    list_values = list_check[:0xFF]
+    lookup_table[:len(list_values)] = list_values
+    return lookup_table[list_indices]
+
+
+# helper function: decode an (n_rows x width) matrix of null padded utf-8 bytes into an array of python strings
+# the rows are viewed as numpy S{width} strings (which drops the trailing nulls) and every distinct value is only
+# decoded once, ID-like columns with few distinct values then share their string objects
+def _decode_fixed_width_strings(string_bytes):
+    n_rows, width = string_bytes.shape
+    if width == 0:
+        return np.full(n_rows, "", dtype=object)
+    fixed_width_strings = np.ascontiguousarray(string_bytes).view("S%d" % width).ravel()
+    unique_strings, inverse = np.unique(fixed_width_strings, return_inverse=True)
+    decoded = np.array([x.decode("utf-8") for x in unique_strings], dtype=object)
+    return decoded[inverse.ravel()]
+
+
+# helper function: turn 1-byte list check indices of a char column into a pandas Categorical
+# the categories are the list check values in list order; 0xFF (or any index past the end of the list) means
+# the row is empty and becomes a missing value
+def _list_check_to_categorical(list_indices, list_check):
+    categories = list(dict.fromkeys(x.decode("utf-8") for x in list_check[:0xFF]))  # unique, in list order
+    code_table = np.full(256, -1, dtype=np.int16)
+    for list_index, value in enumerate(list_check[:0xFF]):
+        code_table[list_index] = categories.index(value.decode("utf-8"))
+    return pd.Categorical.from_codes(code_table[list_indices], categories=categories)
 
 
 # export _data (pandas dataframe) to CSV format
@@ -160,225 +547,68 @@ def to_csv(file_name):
     _data.to_csv(file_name, index=False, encoding='utf_8_sig')
 
 
-# decode all columns
-# go through each column offset we figured out above, and then go and decode the data for every column
-# then concatenate it all together into a final dataframe (_data)
-def _decode_all_columns():
-    global _data
-    global _abs_column_addresses
-    df_all = []
-    for idx, i in enumerate(_abs_column_addresses):
-        pd_series = _decode_column(i)
-        df_all.append(pd.concat(pd_series, axis=1))
+# given the column descriptors, return the ones to decode
+# columns = list of names (returned in that order), dtype_filter = see JMPReader.read
+def _select_columns(column_infos, columns=None, dtype_filter=None):
+    if dtype_filter not in _dtype_filters:
+        raise ValueError('Unknown dtype_filter = ' + str(dtype_filter))
+    if dtype_filter == "numeric":
+        column_infos = [x for x in column_infos if x["data_type"] in _numeric_data_types and
+                        not _is_datetime_column(x["format_type"])]
+    if columns is None:
+        return column_infos
 
-    # construct a concatenated final pandas dataframe
-    _data = pd.concat(df_all, axis=1)
+    infos_by_name = {x["name"]: x for x in column_infos}
+    missing = [name for name in columns if name not in infos_by_name]
+    if missing:
+        raise ValueError('Column(s) not found in JMP file: ' + ", ".join(missing))
+    return [infos_by_name[name] for name in columns]
 
 
 # - JMP stores date/time as a double, which is # of seconds since 1/1/1904 12:00:00 AM
-# - have to handle blank entries specially - these show up as double value nan, which
-# - is not handled well in python datetime functions
-# - also handles duration
-def _double_to_datetime(column_type, double_value):
-    if math.isnan(double_value):  # special case where it's a nan
-        dt_value = float('nan')
-    # date/time of some type:
-    elif column_type in _column_format_type_t_vals + _column_format_type_d_vals + \
-            _column_format_type_dt_vals:
-        dt_value = datetime.datetime(1904, 1, 1, 0, 0, 0) + datetime.timedelta(seconds=double_value)
-    else:  # it's a duration
-        dt_value = datetime.timedelta(seconds=double_value)
+# - converts a whole column of such doubles at once to datetime64[ns] (or timedelta64[ns] for a duration)
+# - blank entries show up as double value nan and become NaT
+# - values are rounded to the microsecond, like datetime.timedelta(seconds=...) does
+def _doubles_to_datetime(column_type, double_values, column_name=""):
+    is_duration = column_type in _column_format_type_dur_vals
+    lower_limit, upper_limit = _duration_limits if is_duration else _datetime_limits
+    if np.any((double_values < lower_limit) | (double_values > upper_limit)):
+        raise ValueError('Date/time value out of range in column ' + column_name)
+
+    is_blank = np.isnan(double_values)
+    # whole seconds and the fraction separately, so large values don't lose the microseconds to float rounding
+    whole_seconds = np.floor(np.where(is_blank, 0.0, double_values))
+    fraction = np.where(is_blank, 0.0, double_values) - whole_seconds
+    microseconds = whole_seconds.astype(np.int64) * 1000000 + np.round(fraction * 1e6).astype(np.int64)
+    if is_duration:
+        nanoseconds = microseconds * 1000
+    else:
+        nanoseconds = microseconds * 1000 + _jmp_epoch_ns
+    nanoseconds[is_blank] = np.iinfo(np.int64).min  # NaT
+    return nanoseconds.view("timedelta64[ns]" if is_duration else "datetime64[ns]")
+
 
+# given the byte in file related to the column format, return which date/time bucket (date, time, datetime,
+# duration) the column belongs to
+def _datetime_bucket(column_type):
     if column_type in _column_format_type_t_vals:
-        return_type = _column_format_type_bucket["time"]
+        return _column_format_type_bucket["time"]
     elif column_type in _column_format_type_d_vals:
-        return_type = _column_format_type_bucket["date"]
+        return _column_format_type_bucket["date"]
     elif column_type in _column_format_type_dur_vals:
-        return_type = _column_format_type_bucket["duration"]
+        return _column_format_type_bucket["duration"]
     else:
-        return_type = _column_format_type_bucket["datetime"]  # full date/time formatting or NaN
-
-    return dt_value, return_type  # return datetime/nan, and then what type (date, time, datetime, duration)
+        return _column_format_type_bucket["datetime"]  # full date/time formatting or NaN
 
 
 # given the byte in file related to the column format, return if column is a date/time/duration column
 def _is_datetime_column(column_format):
-    if column_format in _column_format_type_dt_vals + _column_format_type_t_vals + \
-            _column_format_type_d_vals + _column_format_type_dur_vals:
+    if column_format in _column_format_type_all_vals:
         return True  # it is a datetime column
     else:
         return False  # it is not a datetime column
 
 
-# decode a single column
-# input is the file address that starts describing the column
-def _decode_column(file_address):
-    global _jmpfile
-    int_offset = struct.unpack("I", file_address)[0]  # get _jmpfile position to seek as integer
-    _jmpfile.seek(int_offset)  # seek to start of column name, first byte is the length of the string
-    column_name_length = struct.unpack("B", _read_bytes(1))[0]  # length of column name
-    column_name = _read_bytes(column_name_length).decode("utf-8")  # actual column name
-    if column_name_length < 32:
-        _read_bytes(31 - column_name_length)
-
-    # data_type_dict = {1: "Numeric", 2: "Char", 3: "Row State", 4: "Large String?", 0xFF: "1-byte Integer",
-    # 0xFE: "2-byte Integer", 0xFC: "4-byte Integer"}
-    data_type = struct.unpack("B", _read_bytes(1))[0]  # numeric, char, row state, etc.
-
-    # modeling_type_dict = {0: "Continuous", 1: "Ordinal", 2: "Nominal"}
-    _read_bytes(1)  # modeling_type - read, but don't actually need to use
-
-    # print column_name +" ["+data_type_dict[data_type]+", "+modeling_type_dict[modeling_type]+"]"
-    # column_format_width:
-    _read_bytes(1)  # for display purposes in JMP...don't need
-    column_format_type = struct.unpack("B", _read_bytes(1))[0]
-    n_data_bytes_per_row = struct.unpack("H", _read_bytes(2))[0]  # each row value takes up this many bytes
-    # is_column_locked:
-    _read_bytes(2)  # I think this is 2 bytes, but not 100% sure
-    skip_number = struct.unpack("H", _read_bytes(2))[0]  # to help figure out how to skip to the actual row data
-    _read_bytes(12)
-    done = False
-    skip_count = 1
-    list_check = []
-    is_list_check = False
-    while (not done) and (skip_count <= skip_number - 1):
-        skip_count += 1
-        temp_bytes_val = struct.unpack("H", _read_bytes(2))[0]
-        # 0x06 has to do with column hidden/exclude state, others I haven't delved into
-        if (temp_bytes_val == 0x0C) or (temp_bytes_val == 0x0B) or (temp_bytes_val == 0x09) or \
-                (temp_bytes_val == 0x13) or (temp_bytes_val == 0x06):
-            field_length = struct.unpack("I", _read_bytes(4))[0]
-            _read_bytes(field_length)
-        # formula field, treat specially - basically read past it, but have to determine how much to read
-        elif temp_bytes_val == 0x07:
-            field_length = struct.unpack("I", _read_bytes(4))[0]
-            _read_bytes(field_length)
-        elif temp_bytes_val == 0x08:  # related to list check - enumerates possible values in terms of byte value
-            num_vals = struct.unpack("I", _read_bytes(4))[0]
-            _read_bytes(num_vals)  # finish reading past the field
-        # range check is stored as 2 doubles (lower, upper of range), followed by 2 bytes
-        # indicating range check rule
-        elif temp_bytes_val == 0x05:  # indicates there is a range check on this column
-            num_vals = struct.unpack("I", _read_bytes(4))[0]  # next 4 bytes indicate length of bytes to read
-            _read_bytes(num_vals)  # finish reading past the field, do nothing with it
-        elif temp_bytes_val == 0x10:  # related to a row-state column
-            num_vals = struct.unpack("I", _read_bytes(4))[0]  # next 4 bytes indicate length of bytes to read
-            _read_bytes(num_vals)  # finish reading past the field, do nothing with it
-        elif temp_bytes_val == 0x01:  # related to notes
-            num_vals = struct.unpack("I", _read_bytes(4))[0]  # next 4 bytes indicate length of bytes to read
-            _read_bytes(num_vals)  # finish reading past the field, do nothing with it
-        # specifically handle list check type attributes on columns
-        elif temp_bytes_val == 0x04:  # List check field - lists out all options and then references them
-            is_list_check = True
-            field_length = struct.unpack("I", _read_bytes(4))[0]
-            num_list_items = struct.unpack("H", _read_bytes(2))[0]
-            record_length = (field_length - 2) / num_list_items
-            if data_type == 1:  # numeric, each is stored as 8 bytes
-                for i in range(num_list_items):
-                    list_check.append(struct.unpack("d", _read_bytes(8))[0])
-            elif (data_type == 2) or (data_type == 4):  # char
-                for i in range(num_list_items):
-                    if record_length - 1 < 256:  # this should normally be the case
-                        str_length = struct.unpack("B", _read_bytes(1))[0]
-                        list_check.append(_read_bytes(str_length))
-                        # read out any excess bytes that aren't part of the string
-                        _read_bytes(record_length - str_length - 1)
-                    else:  # there are strings >=256 bytes, JMP actually has a bug and does not handle this!
-                        _read_bytes(1)  # this string length is not correct - read & ignore
-                        list_check.append(_read_bytes(record_length - 1).partition('\x00')[0].decode("utf-8"))
-        elif temp_bytes_val == 0x0F:  # given column name is actually >255 bytes, so get correct column long name
-                                      # overwrite value read above
-            column_name_length = struct.unpack("I", _read_bytes(4))[0]
-            column_name = _read_bytes(column_name_length).decode("utf-8")
-        else:
-            # didn't plan for this, raise an exception
-            raise ValueError('Unhandled column field type = ' + "0x%0.2X" % temp_bytes_val)
-
-    # time to read the actual data for every row!
-    row_values = []
-    dt_formatting = None  # None means it's not date/time, which is the default
-    if data_type == 1:  # numeric, actually I just assume it is stored as 8-byte double
-        if not is_list_check:
-            for i in range(_n_rows):
-                # handle date/time, time, date columns
-                if _is_datetime_column(column_format_type):
-                    double_value = struct.unpack("d", _read_bytes(n_data_bytes_per_row))[0]
-                    dt_value, dt_formatting = _double_to_datetime(column_format_type, double_value)
-
-                    row_values.append(dt_value)
-                else:  # just treat as a number
-                    row_values.append(struct.unpack("d", _read_bytes(n_data_bytes_per_row))[0])
-        else:  # handle list check case
-            for i in range(_n_rows):
-                list_index = struct.unpack("B", _read_bytes(1))[0]
-                if list_index != 0xFF:  # FF means the row is empty
-                    if _is_datetime_column(column_format_type):  # handle datetime
-                        dt_value, dt_formatting = _double_to_datetime(column_format_type, list_check[list_index])
-                        row_values.append(dt_value)
-                    else:  # treat as number
-                        row_values.append(list_check[list_index])
-                else:
-                    row_values.append(float('nan'))
-    elif (data_type == 2) or (data_type == 4):  # chars
-        if not is_list_check:
-            for i in range(_n_rows):
-                # different formatting of strings - lead byte gives length of string 0x0100 is max you can have
-                # here - 0xFF lead byte then 255 character string = 0x0100 field length
-                if n_data_bytes_per_row <= 0x0100:
-                    n_chars = struct.unpack("B", _read_bytes(1))[0]
-                    row_values.append(_read_bytes(n_chars).decode("utf-8"))
-                    # read excess characters that are in the buffer after the string, if present
-                    _read_bytes(n_data_bytes_per_row - n_chars - 1)
-                # takes long form where there is no byte before saying how long the string is, and instead string
-                # is null terminated and buffered bytes up to full length of field are there
-                else:
-                    # read and then get rid of the null terminated string and excess bytes
-                    row_values.append(_read_bytes(n_data_bytes_per_row).partition('\x00')[0].decode("utf-8"))
-        else:  # this is a list check column, so has bytes refering to item in list
-            for i in range(_n_rows):
-                list_index = struct.unpack("B", _read_bytes(1))[0]
-                if list_index != 0xFF:  # FF means the row is empty
-                    row_values.append(list_check[list_index].decode("utf-8"))
-                else:
-                    row_values.append("")
-    # row state column, should be 2 bytes per row, but don't check
-    # for this purpose, I will just decode to 2-byte integer - not sure what else to do at this point,
-    # could ultimately break out as some sort of string saying what the state actually is
-    elif data_type == 0x03:
-        for i in range(_n_rows):
-            row_values.append(struct.unpack("H", _read_bytes(n_data_bytes_per_row))[0])
-    # 1-byte signed integer, interestingly JMP does not use traditional range for 8-bit signed integer...
-    # -126-127 is the range, with -127 representing "blank"
-    elif data_type == 0xFF:
-        for i in range(_n_rows):
-            row_values.append(struct.unpack("b", _read_bytes(n_data_bytes_per_row))[0])
-            if row_values[i] == -127:
-                row_values[i] = ""
-    elif data_type == 0xFE:  # 2-byte signed integer,-32767 represents blank entry
-        for i in range(_n_rows):
-            row_values.append(struct.unpack("h", _read_bytes(n_data_bytes_per_row))[0])
-            if row_values[i] == -32767:
-                row_values[i] = ""
-    elif data_type == 0xFC:  # 4-byte signed integer, -2147483647 represents blank entry
-        for i in range(_n_rows):
-            row_values.append(struct.unpack("i", _read_bytes(n_data_bytes_per_row))[0])
-            if row_values[i] == -2147483647:
-                row_values[i] = ""
-
-    # create pandas series with appropriate dtype if a date/datetime/time/duration
-    if dt_formatting == _column_format_type_bucket["time"]:
-        pd_series = [pd.Series(row_values, name=column_name, dtype=np.dtype('datetime64[ns]')).dt.time]
-    elif dt_formatting == _column_format_type_bucket["date"]:
-        pd_series = [pd.Series(row_values, name=column_name, dtype=np.dtype('datetime64[ns]')).dt.date]
-    elif dt_formatting == _column_format_type_bucket["duration"]:
-        pd_series = [pd.Series(row_values, name=column_name, dtype=np.dtype('timedelta64[ns]'))]
-    elif dt_formatting == _column_format_type_bucket["datetime"]:
-        pd_series = [pd.Series(row_values, name=column_name, dtype=np.dtype('datetime64[ns]'))]
-    else:
-        pd_series = [pd.Series(row_values, name=column_name)]
-
-    return pd_series  # return the column as a pandas series
-
 if __name__ == "__main__":
     '''
 